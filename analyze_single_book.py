@@ -17,6 +17,7 @@ import argparse
 import json
 from pathlib import Path
 from toc_taxonomy_analyzer import TocTaxonomyAnalyzer, TaxonomyAnalysisError
+from filter_toc_screenshots import find_screenshots
 
 def parse_arguments():
     """Parse command line arguments."""
@@ -87,9 +88,9 @@ def analyze_single_book(toc_dir: str, output_dir: str = "taxonomies", max_depth:
         return False
     
     # Check for TOC images
-    screenshots = list(toc_path.glob("*.png"))
+    screenshots = find_screenshots(toc_path)
     if not screenshots:
-        print(f"❌ No PNG screenshots found in: {toc_dir}")
+        print(f"❌ No screenshots found in: {toc_dir}")
         return False
     
     print(f"📁 Analyzing: {toc_path.name}")
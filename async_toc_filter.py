@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Asyncio TOC Screenshot Filter
+=============================
+
+Runs TOC classification on the async OpenAI client instead of thread pools.
+TOCScreenshotFilter nests a page pool (max_workers) inside a book pool of 3,
+so at most about a dozen requests are in flight, each holding a blocking
+thread. AsyncTOCScreenshotFilter schedules every page of every book as a task
+on one event loop, bounded by a single semaphore, so hundreds of requests can
+be in flight without hundreds of threads.
+
+Results have the same structure as TOCScreenshotFilter's, and the filter
+shares its rate limiter, classification cache, report and organize methods,
+so it can be used wherever TOCScreenshotFilter is.
+
+Requests in flight are limited by an AdaptiveConcurrencyController, which
+raises the limit up to max_concurrency while latency and error rates are
+healthy, halves it on 429 responses and waits out their Retry-After; its state
+is in the batch summary under 'concurrency'. The controller sets the request
+rate, so there is no requests-per-minute cap unless max_calls_per_minute gives
+the account's ceiling.
+
+Usage:
+    filter_tool = AsyncTOCScreenshotFilter(max_concurrency=128, max_calls_per_minute=500)
+    results = filter_tool.filter_batch_directories("screenshots")
+
+    # Inside a running event loop:
+    results = await filter_tool.filter_batch_directories_async("screenshots")
+"""
+
+import os
+import time
+import asyncio
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from openai import AsyncOpenAI
+
+from filter_toc_screenshots import (
+    TOCScreenshotFilter, TOCFilterError, TOC_CLASSIFICATION_PROMPT, find_screenshots
+)
+from rate_limiter import RateLimiter, SharedRateLimiter, estimate_tokens
+from concurrency_controller import AdaptiveConcurrencyController, is_rate_limit_error, retry_after_seconds
+
+
+class AsyncTOCScreenshotFilter(TOCScreenshotFilter):
+    """
+    TOC filter whose requests run as asyncio tasks bounded by one semaphore across all books.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o-mini",
+                 max_concurrency: int = 64, max_calls_per_minute: Optional[int] = None,
+                 max_tokens_per_minute: Optional[int] = None, rate_limiter: Optional[RateLimiter] = None,
+                 shared_rate_limit_db: Optional[str] = None,
+                 classification_cache_file: Optional[str] = ".cache/toc_classifications.sqlite3",
+                 concurrency_controller: Optional[AdaptiveConcurrencyController] = None,
+                 pages_per_request: int = 1):
+        """
+        Initialize the async TOC filter.
+
+        Args:
+            api_key: OpenAI API key (will try to get from environment if not provided)
+            model: OpenAI model to use (default: gpt-4o-mini)
+            max_concurrency: Upper bound of requests in flight across all books
+            max_calls_per_minute: Requests-per-minute ceiling of the API account (None: no fixed
+                cap; the concurrency controller sets the rate from 429s and Retry-After)
+            max_tokens_per_minute: Maximum tokens per minute (None: only calls are limited)
+            rate_limiter: Limiter shared with other clients of the same API account
+            shared_rate_limit_db: SQLite file through which all processes on this host
+                share the limits (default: $OPENAI_RATE_LIMIT_DB; unset: per process)
+            classification_cache_file: SQLite file caching classifications (None disables the cache)
+            concurrency_controller: Adaptive limit on requests in flight (default: AIMD between
+                1 and max_concurrency, starting at 8)
+            pages_per_request: Maximum pages classified in one request (1: one request per page)
+        """
+        if max_concurrency < 1:
+            raise TOCFilterError(f"max_concurrency must be at least 1, got {max_concurrency}")
+
+        # Kept for the async client, which is created per event loop (see create_async_client)
+        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        super().__init__(api_key=self.api_key, model=model, max_workers=max_concurrency,
+                         max_calls_per_minute=max_calls_per_minute, max_tokens_per_minute=max_tokens_per_minute,
+                         rate_limiter=rate_limiter, shared_rate_limit_db=shared_rate_limit_db,
+                         classification_cache_file=classification_cache_file,
+                         concurrency_controller=concurrency_controller or AdaptiveConcurrencyController(
+                             initial_concurrency=min(8, max_concurrency), max_concurrency=max_concurrency),
+                         pages_per_request=pages_per_request)
+
+    def create_async_client(self) -> AsyncOpenAI:
+        """
+        Create the async OpenAI client for one event loop run.
+
+        The client's connection pool is bound to the loop it was first used on, so
+        every asyncio.run gets its own client. Its built-in retries are off, so 429s
+        reach the concurrency controller.
+        """
+        return AsyncOpenAI(api_key=self.api_key, max_retries=0)
+
+    async def _wait_for_rate_limit(self, tokens: int) -> float:
+        """
+        Reserve a start time with the rate limiter and sleep until it without blocking the loop.
+
+        Returns:
+            Seconds waited
+        """
+        if isinstance(self.rate_limiter, SharedRateLimiter):
+            # Reservations in the shared database may wait for other processes' write locks
+            delay = await asyncio.to_thread(self.rate_limiter.reserve, tokens)
+        else:
+            delay = self.rate_limiter.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    async def _create_completion_async(self, client: AsyncOpenAI, request: Dict[str, Any],
+                                       estimated_tokens: int) -> Any:
+        """
+        Make a chat completion call within the rate limits and the adaptive concurrency limit.
+
+        The concurrency slot is taken before the rate limiter reserves a start time, so
+        only requests about to be sent hold reservations; the wait for that start time
+        is not counted as latency. A 429 answer lowers the limit and pauses new requests for its Retry-After;
+        the call is then retried, up to MAX_RATE_LIMIT_RETRIES times.
+
+        Args:
+            client: Async OpenAI client of the running event loop
+            request: Keyword arguments for client.chat.completions.create
+            estimated_tokens: Tokens reserved with the rate limiter
+
+        Returns:
+            The API response
+        """
+        controller = self.concurrency_controller
+        attempt = 0
+        while True:
+            started = await controller.acquire_async()
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            try:
+                started += await self._wait_for_rate_limit(estimated_tokens)
+                response = await client.chat.completions.create(**request)
+                controller.on_success(started)
+                return response
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    controller.on_error(started)
+                    raise
+                controller.on_rate_limited(started, retry_after_seconds(e))
+                if attempt >= self.MAX_RATE_LIMIT_RETRIES:
+                    raise
+                attempt += 1
+                self.logger.warning(f"⏳ Rate limited (429), retry {attempt}/{self.MAX_RATE_LIMIT_RETRIES} "
+                                    f"at concurrency {int(controller.limit)}")
+            finally:
+                self.in_flight -= 1
+                controller.release()
+
+    async def analyze_screenshot_async(self, client: AsyncOpenAI, semaphore: asyncio.Semaphore,
+                                       image_path: str) -> Dict[str, Any]:
+        """
+        Analyze a single screenshot on the async client (see analyze_screenshot).
+
+        Args:
+            client: Async OpenAI client of the running event loop
+            semaphore: Semaphore bounding the requests in flight
+            image_path: Path to the screenshot to analyze
+
+        Returns:
+            Dict with analysis results including is_toc, confidence, and reasoning
+            (cached: True if the result came from the cache)
+        """
+        async with semaphore:
+            try:
+                # Hashing and image encoding are file and CPU work, kept off the event loop
+                image_sha256, cached = await asyncio.to_thread(self._cached_result, image_path)
+                if cached is not None:
+                    return cached
+
+                self.logger.info(f"Analyzing screenshot: {image_path}")
+                base64_image = await asyncio.to_thread(self.encode_image, image_path)
+
+                estimated_tokens = estimate_tokens(TOC_CLASSIFICATION_PROMPT, images=1, max_output_tokens=500)
+                response = await self._create_completion_async(
+                    client, self.classification_request(base64_image), estimated_tokens
+                )
+                usage = getattr(response, 'usage', None)
+                self.rate_limiter.record_usage(estimated_tokens, getattr(usage, 'total_tokens', None))
+
+                result = self.parse_classification(response.choices[0].message.content)
+                self._cache_result(image_path, image_sha256, result)
+                return result
+
+            except Exception as e:
+                self.logger.error(f"Failed to analyze screenshot {image_path}: {e}")
+                return self.failed_result(e)
+
+    async def analyze_screenshot_batch_async(self, client: AsyncOpenAI, semaphore: asyncio.Semaphore,
+                                             image_paths: List[str],
+                                             image_sha256s: Optional[List[Optional[str]]] = None) -> List[Dict[str, Any]]:
+        """
+        Classify several screenshots in one request on the async client (see analyze_screenshot_batch).
+
+        Args:
+            client: Async OpenAI client of the running event loop
+            semaphore: Semaphore bounding the requests in flight
+            image_paths: Screenshots to classify, labeled "Page 1", "Page 2", ... in order
+            image_sha256s: SHA-256 of each screenshot for caching (None: not cached)
+
+        Returns:
+            One analysis result per screenshot, in order
+        """
+        image_sha256s = image_sha256s or [None] * len(image_paths)
+        async with semaphore:
+            self.logger.info(f"Analyzing {len(image_paths)} screenshots in one request")
+            results, encoded = await asyncio.to_thread(self._encode_batch, image_paths)
+            if not encoded:
+                return results
+
+            sent = [image_paths[position] for position, _ in encoded]
+            estimated_tokens = await asyncio.to_thread(self._batch_estimated_tokens, sent)
+            try:
+                request = self.batch_classification_request([base64_image for _, base64_image in encoded])
+                response = await self._create_completion_async(client, request, estimated_tokens)
+            except Exception as e:
+                outcome = self._batch_failed(image_paths, results, encoded, e)
+            else:
+                outcome = self._batch_answered(image_paths, image_sha256s, results, encoded, response, estimated_tokens)
+        if outcome is not None:
+            return outcome
+
+        # Split outside the semaphore, so the halves never wait for the slot this batch held
+        half = self._split_batch(len(image_paths))
+        first, second = await asyncio.gather(
+            self.analyze_screenshot_batch_async(client, semaphore, image_paths[:half], image_sha256s[:half]),
+            self.analyze_screenshot_batch_async(client, semaphore, image_paths[half:], image_sha256s[half:])
+        )
+        return first + second
+
+    async def _analyze_batched_async(self, client: AsyncOpenAI, semaphore: asyncio.Semaphore,
+                                     screenshots: List[Path]) -> List[Dict[str, Any]]:
+        """
+        Classify a book's screenshots with multi-page requests as concurrent tasks.
+
+        Args:
+            client: Async OpenAI client of the running event loop
+            semaphore: Semaphore shared by all books of the run
+            screenshots: Screenshots of one book in page order
+
+        Returns:
+            Analysis results with filename and page_number added
+        """
+        analysis_results, batches = await asyncio.to_thread(self._plan_book_batches, screenshots)
+        batch_results = await asyncio.gather(*(
+            self.analyze_screenshot_batch_async(client, semaphore, [str(screenshots[i]) for i in batch], image_sha256s)
+            for batch, image_sha256s in batches
+        ))
+        for (batch, _), results in zip(batches, batch_results):
+            for i, result in zip(batch, results):
+                analysis_results[i] = result
+        return self._label_results(screenshots, analysis_results)
+
+    async def _filter_directory_async(self, client: AsyncOpenAI, semaphore: asyncio.Semaphore,
+                                      isbn_dir: str, confidence_threshold: float) -> Dict[str, Any]:
+        """
+        Analyze all screenshots of one book directory as concurrent tasks.
+
+        Args:
+            client: Async OpenAI client of the running event loop
+            semaphore: Semaphore shared by all books of the run
+            isbn_dir: Path to the ISBN directory containing screenshots
+            confidence_threshold: Minimum confidence score to consider a page as TOC
+
+        Returns:
+            Dict with filtering results and TOC pages identified (as filter_isbn_directory)
+        """
+        isbn_path = Path(isbn_dir)
+        if not isbn_path.exists():
+            raise TOCFilterError(f"ISBN directory not found: {isbn_dir}")
+
+        isbn = isbn_path.name
+        screenshots = find_screenshots(isbn_path)
+        if not screenshots:
+            self.logger.warning(f"No screenshots found in {isbn_dir}")
+            return {
+                'isbn': isbn,
+                'total_screenshots': 0,
+                'toc_pages': [],
+                'non_toc_pages': [],
+                'analysis_results': []
+            }
+
+        self.logger.info(f"Found {len(screenshots)} screenshots to analyze for ISBN: {isbn}")
+        if self.pages_per_request > 1:
+            analysis_results = await self._analyze_batched_async(client, semaphore, screenshots)
+            return self.summarize_book(isbn, analysis_results, confidence_threshold)
+
+        results = await asyncio.gather(*(
+            self.analyze_screenshot_async(client, semaphore, str(screenshot)) for screenshot in screenshots
+        ))
+
+        analysis_results = []
+        for page_number, (screenshot, result) in enumerate(zip(screenshots, results), 1):
+            result['filename'] = screenshot.name
+            result['page_number'] = page_number
+            analysis_results.append(result)
+
+        return self.summarize_book(isbn, analysis_results, confidence_threshold)
+
+    async def filter_isbn_directory_async(self, isbn_dir: str, confidence_threshold: float = 0.7) -> Dict[str, Any]:
+        """
+        Filter all screenshots in an ISBN directory with up to max_concurrency requests in flight.
+
+        Args:
+            isbn_dir: Path to the ISBN directory containing screenshots
+            confidence_threshold: Minimum confidence score to consider a page as TOC
+
+        Returns:
+            Dict with filtering results and TOC pages identified
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self.create_async_client() as client:
+            return await self._filter_directory_async(client, semaphore, isbn_dir, confidence_threshold)
+
+    async def filter_batch_directories_async(self, screenshots_dir: str = "screenshots",
+                                             confidence_threshold: float = 0.7) -> Dict[str, Any]:
+        """
+        Filter screenshots in all ISBN directories on one event loop.
+
+        All pages of all books share one semaphore, so a book with few pages never
+        leaves request slots idle while other books wait.
+
+        Args:
+            screenshots_dir: Base screenshots directory containing ISBN subdirectories
+            confidence_threshold: Minimum confidence score to consider a page as TOC
+
+        Returns:
+            Dict with results for all ISBNs processed (as filter_batch_directories)
+        """
+        isbn_dirs = self.find_isbn_directories(screenshots_dir)
+        if not isbn_dirs:
+            self.logger.warning(f"No ISBN directories found in {screenshots_dir}")
+            return {'processed_isbns': {}, 'summary': {}}
+
+        self.logger.info(f"Processing {len(isbn_dirs)} books with up to {self.max_concurrency} requests in flight")
+        start_time = time.time()
+        requests_before = self.batch_stats['requests']
+        self.peak_in_flight = 0
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self.create_async_client() as client:
+            outcomes = await asyncio.gather(*(
+                self._filter_directory_async(client, semaphore, str(isbn_dir), confidence_threshold)
+                for isbn_dir in isbn_dirs
+            ), return_exceptions=True)
+
+        batch_results = {}
+        for isbn_dir, outcome in zip(isbn_dirs, outcomes):
+            if isinstance(outcome, Exception):
+                self.logger.error(f"Failed to process {isbn_dir.name}: {outcome}")
+                batch_results[isbn_dir.name] = {
+                    'error': str(outcome),
+                    'isbn': isbn_dir.name,
+                    'total_screenshots': 0,
+                    'toc_pages': [],
+                    'non_toc_pages': []
+                }
+            else:
+                batch_results[isbn_dir.name] = outcome
+                self.logger.info(f"✅ Completed processing: {isbn_dir.name}")
+
+        api_requests = self.batch_stats['requests'] - requests_before if self.pages_per_request > 1 else None
+        summary = self.summarize_batch(batch_results, confidence_threshold, time.time() - start_time, api_requests)
+        summary['parallel_processing'] = True
+        summary['engine'] = 'asyncio'
+        summary['max_concurrency'] = self.max_concurrency
+        summary['peak_in_flight'] = self.peak_in_flight
+
+        return {
+            'processed_isbns': batch_results,
+            'summary': summary
+        }
+
+    def filter_isbn_directory(self, isbn_dir: str, confidence_threshold: float = 0.7) -> Dict[str, Any]:
+        """
+        Filter one ISBN directory (runs filter_isbn_directory_async in a new event loop).
+
+        Args:
+            isbn_dir: Path to the ISBN directory containing screenshots
+            confidence_threshold: Minimum confidence score to consider a page as TOC
+
+        Returns:
+            Dict with filtering results and TOC pages identified
+        """
+        return asyncio.run(self.filter_isbn_directory_async(isbn_dir, confidence_threshold))
+
+    def filter_batch_directories(self, screenshots_dir: str = "screenshots",
+                                 confidence_threshold: float = 0.7,
+                                 parallel_books: bool = True) -> Dict[str, Any]:
+        """
+        Filter all ISBN directories (runs filter_batch_directories_async in a new event loop).
+
+        Args:
+            screenshots_dir: Base screenshots directory containing ISBN subdirectories
+            confidence_threshold: Minimum confidence score to consider a page as TOC
+            parallel_books: Ignored; books always share the request slots
+
+        Returns:
+            Dict with results for all ISBNs processed
+        """
+        return asyncio.run(self.filter_batch_directories_async(screenshots_dir, confidence_threshold))
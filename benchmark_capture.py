@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Capture Benchmark against the Local Livebook Stand-in
+=====================================================
+
+Measures LivebookScreenshotTool throughput without network access by running
+it against livebook_fixture_server.LivebookFixtureServer.
+
+Reports for screenshot_all_pages (one book) and screenshot_book_batch (several books):
+- Pages per minute
+- Time to first screenshot (from the call until the first page file is written)
+- Wait overhead (seconds spent waiting for pages to settle, and their share of wall time)
+- Time by phase (driver setup, page load, navigation, settle, capture, write, ...)
+
+A browser is started once before measuring; if Chrome/ChromeDriver cannot be
+launched, or a benchmarked capture fails, the script exits with status 1
+instead of reporting zero throughput.
+
+Usage:
+    python benchmark_capture.py
+    python benchmark_capture.py --books 6 --pool-size 3 --pages 15 --render-delay 1.0
+    python benchmark_capture.py --json reports/capture_benchmark.json
+"""
+
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from livebook_fixture_server import LivebookFixtureServer
+from livebook_screenshot_tool import LivebookScreenshotTool, LivebookScreenshotError, timing_histogram
+
+
+def _page_metrics(pages: List[Dict[str, Any]], elapsed: float, first_page_at: float) -> Dict[str, Any]:
+    """Compute throughput and wait metrics from captured page records."""
+    wait_seconds = sum(page.get('settle_seconds', 0.0) for page in pages)
+    return {
+        'pages': len(pages),
+        'elapsed_seconds': round(elapsed, 2),
+        'pages_per_minute': round(len(pages) / elapsed * 60, 1) if elapsed > 0 else 0.0,
+        'time_to_first_screenshot': round(first_page_at, 2) if first_page_at is not None else None,
+        'wait_seconds': round(wait_seconds, 2),
+        'wait_share': round(wait_seconds / elapsed, 3) if elapsed > 0 else 0.0,
+        'wait_saved_seconds': round(sum(page.get('wait_saved_seconds', 0.0) for page in pages), 2)
+    }
+
+
+def check_browser(tool_options: Dict[str, Any]) -> Optional[str]:
+    """
+    Launch and close one browser with the benchmark options.
+
+    Args:
+        tool_options: Keyword arguments for LivebookScreenshotTool
+
+    Returns:
+        The launch error, or None if the browser started
+    """
+    try:
+        with LivebookScreenshotTool(**tool_options) as tool:
+            tool._setup_driver()
+    except LivebookScreenshotError as e:
+        return str(e)
+    return None
+
+
+def benchmark_single_book(server: LivebookFixtureServer, tool_options: Dict[str, Any],
+                          output_dir: Path, max_pages: int) -> Dict[str, Any]:
+    """
+    Benchmark screenshot_all_pages on one stand-in book, including browser launch.
+
+    Args:
+        server: Running fixture server
+        tool_options: Keyword arguments for LivebookScreenshotTool
+        output_dir: Directory receiving the screenshots
+        max_pages: Maximum pages to capture
+
+    Returns:
+        Dict with the benchmark metrics
+    """
+    first_page = {}
+    start = time.time()
+
+    def on_page(page: Dict[str, Any]) -> None:
+        first_page.setdefault('at', time.time() - start)
+
+    with LivebookScreenshotTool(**tool_options) as tool:
+        results = tool.screenshot_all_pages(
+            url=server.book_url('978-0-00-000001-0'),
+            base_filename='benchmark',
+            max_pages=max_pages,
+            output_dir=str(output_dir / 'single_book'),
+            page_callback=on_page
+        )
+    elapsed = time.time() - start
+
+    metrics = _page_metrics(results.get('captured_pages', []), elapsed, first_page.get('at'))
+    metrics['phases'] = timing_histogram(results.get('timings', {}).get('spans', []))
+    metrics['success'] = results['success']
+    if not results['success']:
+        metrics['error'] = results.get('error')
+    return metrics
+
+
+def benchmark_book_batch(server: LivebookFixtureServer, tool_options: Dict[str, Any],
+                         output_dir: Path, books: int, max_pages: int, pool_size: int) -> Dict[str, Any]:
+    """
+    Benchmark screenshot_book_batch on several stand-in books.
+
+    Args:
+        server: Running fixture server
+        tool_options: Keyword arguments for LivebookScreenshotTool
+        output_dir: Directory receiving the book directories
+        books: Number of books in the batch
+        max_pages: Maximum pages per book
+        pool_size: Parallel browser sessions
+
+    Returns:
+        Dict with the benchmark metrics
+    """
+    book_list = [
+        {'isbn': f'978-0-00-{i:06d}-0', 'name': f'Benchmark Buch {i}', 'subject': 'Benchmark', 'grade': '5'}
+        for i in range(1, books + 1)
+    ]
+    first_page = {}
+    start = time.time()
+
+    def on_page(book_dir: str, page: Dict[str, Any]) -> None:
+        first_page.setdefault('at', time.time() - start)
+
+    with LivebookScreenshotTool(**tool_options) as tool:
+        results = tool.screenshot_book_batch(
+            book_list=book_list,
+            base_url_template=server.url_template,
+            max_pages=max_pages,
+            pool_size=pool_size,
+            output_root=str(output_dir / 'batch'),
+            resume=False,
+            page_callback=on_page
+        )
+    elapsed = time.time() - start
+
+    pages = [page for result in results.values() for page in result.get('captured_pages', [])]
+    metrics = _page_metrics(pages, elapsed, first_page.get('at'))
+    metrics['books'] = books
+    metrics['successful_books'] = results.summary['successful_books']
+    metrics['pool_size'] = results.summary['pool_size']
+    metrics['phases'] = results.summary['timing_histogram']
+    metrics['success'] = metrics['successful_books'] == books
+    if not metrics['success']:
+        metrics['error'] = next((r.get('error') for r in results.values() if not r.get('success')), None)
+    return metrics
+
+
+def print_report(name: str, metrics: Dict[str, Any]) -> None:
+    """Print one benchmark result."""
+    print(f"\n📊 {name}")
+    print("-" * 50)
+    if 'books' in metrics:
+        print(f"   📚 Books: {metrics['successful_books']}/{metrics['books']} with {metrics['pool_size']} browser(s)")
+    print(f"   📄 Pages: {metrics['pages']} in {metrics['elapsed_seconds']:.1f}s")
+    print(f"   🚀 Pages/minute: {metrics['pages_per_minute']:.1f}")
+    ttfs = metrics['time_to_first_screenshot']
+    print(f"   ⏱️ Time to first screenshot: {f'{ttfs:.2f}s' if ttfs is not None else 'n/a'}")
+    print(f"   ⏳ Wait overhead: {metrics['wait_seconds']:.1f}s ({metrics['wait_share']:.0%} of wall time), "
+          f"{metrics['wait_saved_seconds']:.1f}s saved vs. fixed delays")
+    if metrics.get('phases'):
+        print("   🧭 Time by phase:")
+        for phase, stats in metrics['phases'].items():
+            print(f"      • {phase}: {stats['total_seconds']:.2f}s over {stats['count']} spans "
+                  f"(p50 {stats['p50_seconds']:.2f}s, p90 {stats['p90_seconds']:.2f}s)")
+    if metrics.get('error'):
+        print(f"   ❌ Error: {metrics['error']}")
+
+
+def main() -> int:
+    """Run the capture benchmarks and return the exit status."""
+    parser = argparse.ArgumentParser(description="Benchmark LivebookScreenshotTool against a local Livebook stand-in")
+    parser.add_argument('--pages', type=int, default=12, help='Pages per stand-in book (default: 12)')
+    parser.add_argument('--max-pages', type=int, default=10, help='Max pages captured per book (default: 10)')
+    parser.add_argument('--books', type=int, default=4, help='Books in the batch benchmark (default: 4)')
+    parser.add_argument('--pool-size', type=int, default=2, help='Browsers for the batch benchmark (default: 2)')
+    parser.add_argument('--render-delay', type=float, default=0.5, help='Viewer render delay in seconds')
+    parser.add_argument('--page-turn-delay', type=float, default=0.3, help='Page turn render delay in seconds')
+    parser.add_argument('--image-delay', type=float, default=0.2, help='Page image response delay in seconds')
+    parser.add_argument('--capture-format', default='png', choices=sorted(LivebookScreenshotTool.CAPTURE_EXTENSIONS))
+    parser.add_argument('--visible', action='store_true', help='Show the browser instead of running headless')
+    parser.add_argument('--skip-batch', action='store_true', help='Only benchmark screenshot_all_pages')
+    parser.add_argument('--output-dir', help='Keep screenshots here (default: temporary directory, removed afterwards)')
+    parser.add_argument('--json', dest='json_file', help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    output_dir = Path(args.output_dir) if args.output_dir else Path(tempfile.mkdtemp(prefix='livebook_benchmark_'))
+    tool_options = {
+        'headless': not args.visible,
+        'capture_format': args.capture_format,
+        # Benchmarks start cold every time and must not touch the real navigation cache
+        'navigation_cache_file': str(output_dir / 'navigation_strategies.json')
+    }
+
+    print("⏱️ Livebook Capture Benchmark")
+    print("=" * 50)
+
+    launch_error = check_browser(tool_options)
+    if launch_error:
+        if not args.output_dir:
+            shutil.rmtree(output_dir, ignore_errors=True)
+        print(f"❌ Could not start Chrome, nothing to measure: {launch_error}")
+        print("   Install Chrome and set CHROMEDRIVER_PATH to a matching ChromeDriver")
+        return 1
+
+    report: Dict[str, Any] = {}
+    try:
+        with LivebookFixtureServer(pages=args.pages, render_delay=args.render_delay,
+                                   page_turn_delay=args.page_turn_delay, image_delay=args.image_delay) as server:
+            print(f"📚 Stand-in server: {server.base_url} ({args.pages} pages per book)")
+            report['fixture'] = server.settings()
+
+            report['screenshot_all_pages'] = benchmark_single_book(server, tool_options, output_dir, args.max_pages)
+            print_report("screenshot_all_pages (1 book, incl. browser launch)", report['screenshot_all_pages'])
+
+            if not args.skip_batch:
+                report['screenshot_book_batch'] = benchmark_book_batch(
+                    server, tool_options, output_dir, args.books, args.max_pages, args.pool_size
+                )
+                print_report("screenshot_book_batch", report['screenshot_book_batch'])
+    finally:
+        if not args.output_dir:
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+    if args.json_file:
+        json_path = Path(args.json_file)
+        json_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results saved: {json_path}")
+
+    failed = [name for name, metrics in report.items() if name != 'fixture' and not metrics['success']]
+    if failed:
+        print(f"\n❌ Captures failed in: {', '.join(failed)} - the numbers above are not comparable")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
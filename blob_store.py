@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Screenshot Store
+==================================
+
+Stores every distinct screenshot once, keyed by the SHA-256 of its bytes, in a
+hidden .blobs directory next to the book directories (screenshots/.blobs by
+default). Book directories, the toc_pages/non_toc_pages folders and the tocs/
+export only hold links to the stored files, so identical pages of different
+books or editions share their bytes, and organizing or exporting pages costs no
+copy I/O.
+
+Features:
+- Blobs named <sha256><extension> in two-character fan-out directories
+- Atomic writes (temp file + rename), safe for parallel capture workers
+- Links placed as hardlinks, falling back to symlinks and finally to copies
+- prune() removes blobs no book directory links to any more
+
+Screenshots below an output root are read-only: a hardlinked page and its blob
+are the same inode, so rewriting a page in place (e.g. re-encoding it) changes
+the bytes of every book sharing that blob. To change a page, write the new
+content to a temporary file and rename it over the page (or call
+BlobStore.store), which replaces the link instead of the shared file.
+"""
+
+import os
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+
+BLOB_DIR_NAME = ".blobs"
+
+
+def file_sha256(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """Return the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def link_file(source: Path, target: Path) -> str:
+    """
+    Make target refer to the same content as source without copying, if possible.
+
+    Hardlinks and symlinks share the file with source: the target must not be
+    modified in place afterwards (see the module docstring).
+
+    Args:
+        source: Existing file (symlinks are resolved first)
+        target: Path to create; an existing file there is replaced
+
+    Returns:
+        How the file was placed: "hardlink", "symlink" or "copy"
+    """
+    source = Path(source).resolve()
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if target.is_symlink() or target.exists():
+        target.unlink()
+
+    try:
+        os.link(source, target)
+        return "hardlink"
+    except OSError:
+        pass
+    try:
+        # Relative, so the link survives moving the whole screenshots tree
+        target.symlink_to(os.path.relpath(source, target.parent))
+        return "symlink"
+    except OSError:
+        shutil.copy2(source, target)
+        return "copy"
+
+
+def move_file(source: Path, target: Path) -> None:
+    """Move a file or link to a new path, re-pointing relative symlinks at the same file."""
+    source = Path(source)
+    target = Path(target)
+    if source.is_symlink():
+        link_file(source, target)
+        source.unlink()
+    else:
+        source.rename(target)
+
+
+class BlobStore:
+    """
+    Content-addressed store for screenshot files below one output root.
+
+    Blobs are immutable: a digest that is already stored is never written again,
+    so storing a page captured twice (or by another edition) only adds a link.
+    Neither the blobs nor the files linked to them may be modified in place.
+    """
+
+    def __init__(self, root: str = f"screenshots/{BLOB_DIR_NAME}"):
+        """
+        Initialize the store.
+
+        Args:
+            root: Directory holding the blobs (created on first write)
+        """
+        self.root = Path(root)
+        self.lock = threading.Lock()
+        self.stats: Dict[str, int] = {'stored': 0, 'deduplicated': 0, 'bytes_stored': 0, 'bytes_deduplicated': 0}
+
+    @classmethod
+    def for_output_root(cls, output_root: str) -> 'BlobStore':
+        """Return the store used for the book directories below an output root."""
+        return cls(str(Path(output_root) / BLOB_DIR_NAME))
+
+    def path_for(self, digest: str, extension: str = ".png") -> Path:
+        """Path of the blob with a given SHA-256 digest."""
+        return self.root / digest[:2] / f"{digest}{extension}"
+
+    def contains(self, digest: str, extension: str = ".png") -> bool:
+        """Check whether a blob is stored."""
+        return self.path_for(digest, extension).exists()
+
+    def _count(self, stored: bool, size: int) -> None:
+        """Update the write statistics."""
+        with self.lock:
+            if stored:
+                self.stats['stored'] += 1
+                self.stats['bytes_stored'] += size
+            else:
+                self.stats['deduplicated'] += 1
+                self.stats['bytes_deduplicated'] += size
+
+    def put_bytes(self, data: bytes, extension: str = ".png", digest: Optional[str] = None) -> Path:
+        """
+        Store content unless a blob with the same digest exists.
+
+        Args:
+            data: File content
+            extension: File extension of the blob (e.g. ".png", ".jpg")
+            digest: SHA-256 hex digest of data, if already known
+
+        Returns:
+            Path of the blob
+        """
+        digest = digest or hashlib.sha256(data).hexdigest()
+        blob_path = self.path_for(digest, extension)
+        if blob_path.exists():
+            self._count(False, len(data))
+            return blob_path
+
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = blob_path.with_name(f"{blob_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, blob_path)
+        self._count(True, len(data))
+        return blob_path
+
+    def put_file(self, path: Path, digest: Optional[str] = None) -> Path:
+        """
+        Store an existing file's content (linked into the store where possible).
+
+        Args:
+            path: File to store
+            digest: SHA-256 hex digest of the file, if already known
+
+        Returns:
+            Path of the blob
+        """
+        path = Path(path)
+        digest = digest or file_sha256(path)
+        blob_path = self.path_for(digest, path.suffix.lower())
+        size = path.stat().st_size
+        if blob_path.exists():
+            self._count(False, size)
+            return blob_path
+
+        tmp_path = blob_path.with_name(f"{blob_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        link_file(path, tmp_path)
+        if tmp_path.is_symlink():
+            # The store must hold the bytes themselves, not a link back into a book directory
+            tmp_path.unlink()
+            shutil.copy2(path.resolve(), tmp_path)
+        os.replace(tmp_path, blob_path)
+        self._count(True, size)
+        return blob_path
+
+    def store(self, data: bytes, target: Path, digest: Optional[str] = None) -> str:
+        """
+        Store content and place it at a path in a book directory.
+
+        Args:
+            data: File content
+            target: Path the file should appear at (its suffix is the blob extension)
+            digest: SHA-256 hex digest of data, if already known
+
+        Returns:
+            How the file was placed: "hardlink", "symlink" or "copy"
+        """
+        target = Path(target)
+        return link_file(self.put_bytes(data, target.suffix.lower(), digest), target)
+
+    def usage(self) -> Dict[str, int]:
+        """
+        Measure the store on disk.
+
+        Returns:
+            Dict with the number of blobs and their total size in bytes
+        """
+        blobs = [path for path in self.root.glob("*/*") if path.is_file() and not path.name.endswith('.tmp')]
+        return {'blobs': len(blobs), 'bytes': sum(path.stat().st_size for path in blobs)}
+
+    def prune(self) -> Dict[str, int]:
+        """
+        Remove blobs no longer linked from any book directory.
+
+        A blob whose link count is 1 has no hardlink left outside the store (its
+        pages were deleted or replaced); blobs that a symlink below the output
+        root still points to are kept. Must not run while a capture is writing
+        to the same output root: a new blob has a link count of 1 until it is
+        linked into its book directory.
+
+        Returns:
+            Dict with the number of blobs removed and the bytes freed
+        """
+        removed = {'blobs_removed': 0, 'bytes_freed': 0}
+        if not self.root.exists():
+            return removed
+
+        # Symlinked pages do not raise the link count of their blob
+        output_root = self.root.parent
+        symlinked = {
+            path.resolve() for path in output_root.rglob("*")
+            if path.is_symlink() and self.root.resolve() in path.resolve().parents
+        }
+
+        for blob in self.root.glob("*/*"):
+            if not blob.is_file() or blob.name.endswith('.tmp'):
+                continue
+            info = blob.stat()
+            if info.st_nlink > 1 or blob.resolve() in symlinked:
+                continue
+            blob.unlink()
+            removed['blobs_removed'] += 1
+            removed['bytes_freed'] += info.st_size
+        return removed
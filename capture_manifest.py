@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Capture Manifest for Resumable Book Batches
+===========================================
+
+Keeps a record of the capture progress of every book below an output root
+(screenshots/capture_manifest.json by default), so an interrupted batch can be
+rerun without recapturing finished work.
+
+Features:
+- Per-book status (in_progress, completed, failed, skipped), page count and attempts
+- Books sharing the pages of an identical ISBN or edition (shared_from)
+- Per-page file hash, frame fingerprint and capture timestamp
+- Atomic writes after every page, so the manifest survives crashes
+- Thread-safe for pooled capture workers
+"""
+
+import os
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class CaptureManifest:
+    """
+    Persistent record of captured books and pages for one output root.
+
+    A book is identified by its directory name below the output root. Reruns
+    skip completed books and resume in-progress or failed books after their
+    last recorded page.
+    """
+
+    VERSION = 1
+
+    # Page record fields kept in the manifest
+    PAGE_FIELDS = ('page_number', 'filename', 'file_size', 'sha256', 'frame_hash', 'captured_at')
+
+    def __init__(self, output_root: str = "screenshots", filename: str = "capture_manifest.json"):
+        """
+        Load (or start) the manifest for an output root.
+
+        Args:
+            output_root: Directory holding the per-book screenshot directories
+            filename: Manifest file name inside the output root
+        """
+        self.output_root = Path(output_root)
+        self.path = self.output_root / filename
+        self.lock = threading.RLock()
+        self.data = self._load()
+
+    def _load(self) -> Dict[str, Any]:
+        """Read the manifest file, starting fresh if it is missing or unreadable."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict) and isinstance(data.get('books'), dict):
+                return data
+        except (OSError, ValueError):
+            pass
+        return {'version': self.VERSION, 'books': {}}
+
+    def _save(self) -> None:
+        """Write the manifest atomically (temp file + rename)."""
+        self.output_root.mkdir(parents=True, exist_ok=True)
+        self.data['updated_at'] = datetime.now().isoformat()
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def get(self, book_key: str) -> Optional[Dict[str, Any]]:
+        """Return the manifest entry of a book, or None if it was never captured."""
+        with self.lock:
+            return self.data['books'].get(book_key)
+
+    def resume_point(self, book_key: str) -> Tuple[Optional[str], int, List[Dict[str, Any]]]:
+        """
+        Determine where a rerun should pick up a book.
+
+        Args:
+            book_key: Book directory name
+
+        Returns:
+            Tuple of (status, next page number to capture, pages already captured).
+            A completed book whose directory disappeared reports no status, so it
+            is captured again from page 1.
+        """
+        with self.lock:
+            entry = self.data['books'].get(book_key)
+            if not entry:
+                return None, 1, []
+            if entry['status'] == 'completed' and not (self.output_root / book_key).is_dir():
+                return None, 1, []
+            pages = sorted(entry.get('pages', []), key=lambda page: page['page_number'])
+            next_page = pages[-1]['page_number'] + 1 if pages else 1
+            return entry['status'], next_page, [dict(page) for page in pages]
+
+    def start_book(self, book_key: str, isbn: str, url: str, restart: bool = False) -> None:
+        """
+        Mark a book as in progress.
+
+        Args:
+            book_key: Book directory name
+            isbn: Book ISBN
+            url: Livebook URL being captured
+            restart: Discard previously recorded pages (full recapture)
+        """
+        with self.lock:
+            entry = self.data['books'].setdefault(book_key, {'pages': [], 'attempts': 0})
+            if restart:
+                entry['pages'] = []
+            entry.update({
+                'isbn': isbn,
+                'url': url,
+                'status': 'in_progress',
+                'started_at': datetime.now().isoformat(),
+                'attempts': entry.get('attempts', 0) + 1
+            })
+            entry.pop('error', None)
+            self._save()
+
+    def record_page(self, book_key: str, page_record: Dict[str, Any]) -> None:
+        """
+        Record a captured page and persist the manifest immediately.
+
+        Args:
+            book_key: Book directory name
+            page_record: Page record from screenshot_all_pages
+        """
+        with self.lock:
+            entry = self.data['books'][book_key]
+            page = {field: page_record.get(field) for field in self.PAGE_FIELDS}
+            entry['pages'] = [p for p in entry['pages'] if p['page_number'] != page['page_number']]
+            entry['pages'].append(page)
+            entry['page_count'] = len(entry['pages'])
+            self._save()
+
+    def complete_book(self, book_key: str) -> None:
+        """Mark a book as completely captured."""
+        with self.lock:
+            entry = self.data['books'][book_key]
+            entry['status'] = 'completed'
+            entry['page_count'] = len(entry['pages'])
+            entry['completed_at'] = datetime.now().isoformat()
+            self._save()
+
+    def share_book(self, book_key: str, isbn: str, url: str, source_key: str,
+                   pages: List[Dict[str, Any]]) -> None:
+        """
+        Record a book whose pages were copied from another captured book.
+        
+        Args:
+            book_key: Book directory name
+            isbn: Book ISBN
+            url: Livebook URL of the book (not captured)
+            source_key: Directory name of the book the pages come from
+            pages: Page records of the shared pages
+        """
+        with self.lock:
+            entry = self.data['books'].setdefault(book_key, {'pages': [], 'attempts': 0})
+            entry.update({
+                'isbn': isbn,
+                'url': url,
+                'status': 'completed',
+                'shared_from': source_key,
+                'pages': [{field: page.get(field) for field in self.PAGE_FIELDS} for page in pages],
+                'page_count': len(pages),
+                'completed_at': datetime.now().isoformat()
+            })
+            entry.pop('error', None)
+            self._save()
+
+    def fail_book(self, book_key: str, error: str) -> None:
+        """Mark a book as failed, keeping the pages captured so far for the next run."""
+        with self.lock:
+            entry = self.data['books'][book_key]
+            entry['status'] = 'failed'
+            entry['error'] = error
+            entry['page_count'] = len(entry['pages'])
+            entry['failed_at'] = datetime.now().isoformat()
+            self._save()
+
+    def skip_book(self, book_key: str, isbn: str, url: str, reason: str) -> None:
+        """Mark a book as skipped (e.g. by an open circuit breaker) so the next run captures it."""
+        with self.lock:
+            entry = self.data['books'].setdefault(book_key, {'pages': [], 'attempts': 0})
+            entry.update({
+                'isbn': isbn,
+                'url': url,
+                'status': 'skipped',
+                'error': reason,
+                'page_count': len(entry['pages']),
+                'skipped_at': datetime.now().isoformat()
+            })
+            self._save()
+
+    def summary(self) -> Dict[str, int]:
+        """Count books per status."""
+        with self.lock:
+            counts: Dict[str, int] = {}
+            for entry in self.data['books'].values():
+                counts[entry['status']] = counts.get(entry['status'], 0) + 1
+            return counts
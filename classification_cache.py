@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Persistent Cache for Screenshot Classifications
+===============================================
+
+Remembers the parsed result of every screenshot classification in a local
+SQLite file (.cache/toc_classifications.sqlite3 by default), so re-filtering
+after a crash, a threshold change or a rerun of the workflow only pays for
+screenshots that were never classified.
+
+A cache entry is keyed by:
+- SHA-256 of the image file bytes (renamed or shared pages hit the same entry)
+- Model name
+- Prompt version (bumped whenever the classification prompt changes)
+- Image encoding parameters (resize width, JPEG quality, detail level)
+"""
+
+import json
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class ClassificationCache:
+    """
+    SQLite-backed store of classification results, safe to share between threads.
+    """
+
+    def __init__(self, cache_file: str = ".cache/toc_classifications.sqlite3"):
+        """
+        Open (or create) the cache.
+
+        Args:
+            cache_file: SQLite file holding the cached results
+        """
+        self.path = Path(cache_file)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(str(self.path), timeout=30.0, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS classifications ("
+                "key TEXT PRIMARY KEY, image_sha256 TEXT NOT NULL, model TEXT NOT NULL, "
+                "prompt_version TEXT NOT NULL, encoding TEXT NOT NULL, result TEXT NOT NULL, "
+                "created_at TEXT NOT NULL)"
+            )
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0}
+
+    @staticmethod
+    def make_key(image_sha256: str, model: str, prompt_version: str, encoding: str) -> str:
+        """Combine the image hash and the request parameters into one cache key."""
+        return hashlib.sha256(f"{image_sha256}|{model}|{prompt_version}|{encoding}".encode('utf-8')).hexdigest()
+
+    def get(self, image_sha256: str, model: str, prompt_version: str, encoding: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a classification.
+
+        Args:
+            image_sha256: SHA-256 hex digest of the image file
+            model: Model that classified the image
+            prompt_version: Version of the classification prompt
+            encoding: Image encoding parameters
+
+        Returns:
+            The cached result, or None on a miss
+        """
+        key = self.make_key(image_sha256, model, prompt_version, encoding)
+        with self.lock:
+            row = self.connection.execute("SELECT result FROM classifications WHERE key = ?", (key,)).fetchone()
+            self.stats['hits' if row else 'misses'] += 1
+        return json.loads(row[0]) if row else None
+
+    def put(self, image_sha256: str, model: str, prompt_version: str, encoding: str,
+            result: Dict[str, Any]) -> None:
+        """
+        Store a classification.
+
+        Args:
+            image_sha256: SHA-256 hex digest of the image file
+            model: Model that classified the image
+            prompt_version: Version of the classification prompt
+            encoding: Image encoding parameters
+            result: Parsed classification result (JSON-serializable)
+        """
+        key = self.make_key(image_sha256, model, prompt_version, encoding)
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO classifications VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, image_sha256, model, prompt_version, encoding,
+                 json.dumps(result, ensure_ascii=False), datetime.now().isoformat())
+            )
+            self.stats['stores'] += 1
+
+    def summary(self) -> Dict[str, Any]:
+        """Return lookups, hit rate and the number of cached classifications."""
+        with self.lock:
+            entries = self.connection.execute("SELECT COUNT(*) FROM classifications").fetchone()[0]
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else 0.0,
+                'entries': entries,
+                'cache_file': str(self.path)
+            }
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self.lock:
+            self.connection.close()
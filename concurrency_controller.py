@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Adaptive Concurrency for API Calls
+==================================
+
+AIMD (additive increase, multiplicative decrease) controller for the number of
+OpenAI requests in flight, in the style of TCP congestion control:
+
+- Each successful request raises the limit by increase_step / limit, i.e. by
+  about increase_step per round of limit requests, while latency stays within
+  latency_tolerance times the best latency seen, the recent error rate stays
+  below error_rate_threshold, and all slots are in use (a limit that does not
+  hold requests back, e.g. because callers wait on a rate limiter, is not raised)
+- A 429 response (or an error rate above the threshold) multiplies the limit by
+  decrease_factor, at most once per round: requests started before the last
+  decrease do not decrease it again
+- A Retry-After header pauses all new requests until it has passed
+
+The limit replaces a fixed worker count typed in up front; max_concurrency is
+only its upper bound. Requests wait for a slot with acquire() from threads or
+acquire_async() from asyncio tasks, and must call release() afterwards.
+
+Usage:
+    controller = AdaptiveConcurrencyController(initial_concurrency=8, max_concurrency=256)
+    started = controller.acquire()
+    try:
+        response = client.chat.completions.create(...)
+        controller.on_success(started)
+    except openai.RateLimitError as e:
+        controller.on_rate_limited(started, retry_after_seconds(e))
+    finally:
+        controller.release()
+"""
+
+import time
+import asyncio
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Check whether an API error is a 429 (openai.RateLimitError and other HTTP client errors)."""
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status == 429
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Read the wait an API error asks for from its response headers.
+
+    Args:
+        error: Exception with an HTTP response (e.g. openai.RateLimitError)
+
+    Returns:
+        Seconds from retry-after-ms or Retry-After (delta seconds or HTTP date), or None
+    """
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000)
+        except ValueError:
+            pass
+
+    retry_after = headers.get('retry-after')
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveConcurrencyController:
+    """
+    AIMD limit on concurrent requests, shared by threads and asyncio tasks.
+    """
+
+    def __init__(self, initial_concurrency: int = 8, min_concurrency: int = 1, max_concurrency: int = 256,
+                 increase_step: float = 1.0, decrease_factor: float = 0.5, latency_tolerance: float = 2.0,
+                 error_rate_threshold: float = 0.1, window: int = 50, default_retry_after: float = 5.0):
+        """
+        Initialize the controller.
+
+        Args:
+            initial_concurrency: Limit to start with
+            min_concurrency: Lowest limit backoff may reach
+            max_concurrency: Highest limit additive increase may reach
+            increase_step: Limit increase per round of successful requests
+            decrease_factor: Factor applied to the limit on a 429 or an error rate breach
+            latency_tolerance: Latency (EWMA) above this multiple of the best latency stops increases
+            error_rate_threshold: Share of failed requests among the last `window` that triggers backoff
+            window: Number of recent outcomes the error rate is computed over
+            default_retry_after: Pause after a 429 without a Retry-After header, in seconds
+        """
+        if not 1 <= min_concurrency <= max_concurrency:
+            raise ValueError(f"Need 1 <= min_concurrency <= max_concurrency, got {min_concurrency}, {max_concurrency}")
+        if not 0 < decrease_factor < 1:
+            raise ValueError(f"decrease_factor must be between 0 and 1, got {decrease_factor}")
+
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.error_rate_threshold = error_rate_threshold
+        self.default_retry_after = default_retry_after
+
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        self.async_waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+
+        self.limit = float(max(min_concurrency, min(max_concurrency, initial_concurrency)))
+        self.in_flight = 0
+        self.backoff_until = 0.0
+        self.last_decrease_at = 0.0
+        self.latency_ewma: Optional[float] = None
+        self.min_latency: Optional[float] = None
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.started_at = time.monotonic()
+        self.limit_history: List[Dict[str, Any]] = []
+        self.stats = {
+            'successes': 0, 'rate_limited': 0, 'errors': 0, 'increases': 0, 'decreases': 0,
+            'retry_after_seconds': 0.0, 'peak_in_flight': 0,
+            'lowest_limit': int(self.limit), 'highest_limit': int(self.limit)
+        }
+
+    # Slots
+
+    def _can_start(self, now: float) -> bool:
+        """Check (under the lock) whether another request may start."""
+        return now >= self.backoff_until and self.in_flight < int(self.limit)
+
+    def _start(self) -> float:
+        """Take a slot (under the lock) and return the start time used to match outcomes to decreases."""
+        now = time.monotonic()
+        self.in_flight += 1
+        self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self.in_flight)
+        return now
+
+    def _notify(self) -> None:
+        """Wake waiting threads and as many waiting tasks as there are free slots (under the lock)."""
+        self.condition.notify_all()
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self.async_waiters:
+            loop, future = self.async_waiters.popleft()
+            if not future.done():
+                loop.call_soon_threadsafe(self._wake, future)
+                free -= 1
+
+    @staticmethod
+    def _wake(future: asyncio.Future) -> None:
+        """Resolve a waiter's future on its own event loop."""
+        if not future.done():
+            future.set_result(None)
+
+    def acquire(self) -> float:
+        """
+        Wait (blocking the thread) until a request may start and take a slot.
+
+        Returns:
+            Start time to pass to on_success, on_rate_limited or on_error
+        """
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                if self._can_start(now):
+                    return self._start()
+                timeout = self.backoff_until - now if now < self.backoff_until else None
+                self.condition.wait(timeout)
+
+    async def acquire_async(self) -> float:
+        """
+        Wait (without blocking the event loop) until a request may start and take a slot.
+
+        Returns:
+            Start time to pass to on_success, on_rate_limited or on_error
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if self._can_start(now):
+                    return self._start()
+                backoff = self.backoff_until - now
+                future = None
+                if backoff <= 0:
+                    future = loop.create_future()
+                    self.async_waiters.append((loop, future))
+            if future is None:
+                await asyncio.sleep(backoff)
+                continue
+            try:
+                await future
+            except asyncio.CancelledError:
+                with self.lock:
+                    # Pass a wake-up this task can no longer use on to the next waiter
+                    if future.done() and not future.cancelled():
+                        self._notify()
+                raise
+
+    def release(self) -> None:
+        """Give back the slot taken by acquire or acquire_async."""
+        with self.lock:
+            self.in_flight -= 1
+            self._notify()
+
+    # Feedback
+
+    def on_success(self, started: float) -> None:
+        """
+        Record a successful request and raise the limit while latency and errors are
+        healthy and the limit is in full use. Call before release().
+
+        Args:
+            started: Start time returned by acquire (plus any time spent waiting afterwards,
+                e.g. on a rate limiter, so latency covers the API call only)
+        """
+        latency = time.monotonic() - started
+        with self.lock:
+            self.stats['successes'] += 1
+            self.outcomes.append(True)
+            self.min_latency = latency if self.min_latency is None else min(self.min_latency, latency)
+            self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+
+            latency_healthy = self.latency_ewma <= self.latency_tolerance * self.min_latency
+            # This request still holds its slot, so a saturated limit shows as in_flight >= limit
+            saturated = self.in_flight >= int(self.limit)
+            if (latency_healthy and saturated and self._error_rate() < self.error_rate_threshold
+                    and self.limit < self.max_concurrency):
+                previous = int(self.limit)
+                self.limit = min(float(self.max_concurrency), self.limit + self.increase_step / self.limit)
+                if int(self.limit) > previous:
+                    self.stats['increases'] += 1
+                    self.stats['highest_limit'] = max(self.stats['highest_limit'], int(self.limit))
+                    self._record_limit('increase')
+                    self._notify()
+
+    def on_rate_limited(self, started: float, retry_after: Optional[float] = None) -> None:
+        """
+        Record a 429: back off multiplicatively and pause new requests for Retry-After.
+
+        Args:
+            started: Start time returned by acquire
+            retry_after: Seconds the API asked to wait (None: default_retry_after)
+        """
+        wait = self.default_retry_after if retry_after is None else retry_after
+        with self.lock:
+            now = time.monotonic()
+            self.stats['rate_limited'] += 1
+            self.outcomes.append(False)
+            if now + wait > self.backoff_until:
+                self.stats['retry_after_seconds'] += now + wait - max(now, self.backoff_until)
+                self.backoff_until = now + wait
+            self._decrease(started, 'rate_limited')
+
+    def on_error(self, started: float) -> None:
+        """
+        Record a failed request (other than a 429); back off if the recent error rate is too high.
+
+        Args:
+            started: Start time returned by acquire
+        """
+        with self.lock:
+            self.stats['errors'] += 1
+            self.outcomes.append(False)
+            if self._error_rate() >= self.error_rate_threshold:
+                self._decrease(started, 'error_rate')
+
+    def _decrease(self, started: float, reason: str) -> None:
+        """Multiply the limit by decrease_factor, once per round (under the lock)."""
+        if started < self.last_decrease_at:
+            # Already in flight when the limit was last lowered: same congestion event
+            return
+        self.last_decrease_at = time.monotonic()
+        self.limit = max(float(self.min_concurrency), self.limit * self.decrease_factor)
+        self.stats['decreases'] += 1
+        self.stats['lowest_limit'] = min(self.stats['lowest_limit'], int(self.limit))
+        self._record_limit(reason)
+
+    def _error_rate(self) -> float:
+        """Share of failures among the recent outcomes (under the lock)."""
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def _record_limit(self, reason: str) -> None:
+        """Append a limit change to the history (under the lock; the last 100 changes are kept)."""
+        self.limit_history.append({
+            'elapsed_seconds': round(time.monotonic() - self.started_at, 2),
+            'limit': int(self.limit),
+            'reason': reason
+        })
+        del self.limit_history[:-100]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the current limit, latency, error rate and adjustment counts."""
+        with self.lock:
+            return {
+                'limit': int(self.limit),
+                'min_concurrency': self.min_concurrency,
+                'max_concurrency': self.max_concurrency,
+                'in_flight': self.in_flight,
+                'latency_ewma_seconds': round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+                'min_latency_seconds': round(self.min_latency, 3) if self.min_latency is not None else None,
+                'error_rate': round(self._error_rate(), 3),
+                'backoff_remaining_seconds': round(max(0.0, self.backoff_until - time.monotonic()), 2),
+                **self.stats,
+                'retry_after_seconds': round(self.stats['retry_after_seconds'], 2),
+                'limit_history': list(self.limit_history)
+            }
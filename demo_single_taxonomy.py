@@ -12,6 +12,7 @@ import json
 import argparse
 from pathlib import Path
 from toc_taxonomy_analyzer import TocTaxonomyAnalyzer, TaxonomyAnalysisError
+from filter_toc_screenshots import find_screenshots
 
 def demo_single_analysis(tocs_dir_path: str = "tocs"):
     """Demonstrate taxonomy analysis with a single TOC directory."""
@@ -95,7 +96,7 @@ def demo_single_analysis(tocs_dir_path: str = "tocs"):
         print()
         
         # Check images in directory
-        screenshots = list(selected_dir.glob("*.png"))
+        screenshots = find_screenshots(selected_dir)
         print(f"📸 Found {len(screenshots)} TOC screenshots:")
         for screenshot in screenshots:
             size_mb = screenshot.stat().st_size / (1024 * 1024)
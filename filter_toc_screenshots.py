@@ -17,16 +17,28 @@ Features:
 """
 
 import os
+import re
 import json
 import base64
+import sqlite3
 import logging
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from collections import Counter
+from datetime import datetime
 import time
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from queue import Queue
 
+from blob_store import move_file, file_sha256
+from rate_limiter import (
+    RateLimiter, SharedRateLimiter, DEFAULT_MAX_CALLS_PER_MINUTE, create_rate_limiter, estimate_tokens, image_tokens
+)
+from classification_cache import ClassificationCache
+from concurrency_controller import AdaptiveConcurrencyController, is_rate_limit_error, retry_after_seconds
+from openai_batch import BatchAPIError, BatchJob, BatchRunner, OpenAIBatchTransport
+
 # Load environment variables from .env file
 try:
     from dotenv import load_dotenv
@@ -49,36 +61,140 @@ except ImportError:
     exit(1)
 
 
-class RateLimiter:
-    """Rate limiter to control API calls per minute."""
+# Image formats the screenshot tool can produce (png by default, jpeg/webp via DevTools capture)
+SCREENSHOT_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+# MIME types for embedding screenshots as data URLs
+IMAGE_MIME_TYPES = {
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.webp': 'image/webp'
+}
+
+
+# Prompt for classifying one screenshot (bump TOCScreenshotFilter.PROMPT_VERSION when changing it)
+TOC_CLASSIFICATION_PROMPT = """
+            You are an expert at analyzing educational book screenshots to identify table of contents (TOC) pages.
+            
+            Please analyze this screenshot and determine if it contains a table of contents or index.
+            
+            Look for these TOC indicators:
+            - Chapter listings with page numbers
+            - Organized hierarchical content structure
+            - "Inhaltsverzeichnis", "Inhalt", "Contents", "Index" headings
+            - Sequential chapter/section numbering
+            - Lists of topics with corresponding page numbers
+            - Structured layout typical of a table of contents
+            
+            NOT table of contents:
+            - Regular book content/text pages
+            - Exercise pages
+            - Images or diagrams without TOC structure
+            - Individual chapters or lessons
+            - Navigation elements that aren't content listings
+            
+            Respond with a JSON object containing:
+            {
+                "is_toc": boolean (true if this is a table of contents),
+                "confidence": float (0.0-1.0, how confident you are),
+                "reasoning": string (explanation of your decision),
+                "toc_elements_found": array of strings (specific TOC elements you identified),
+                "language": string (detected language of the content)
+            }
+            """
+
+
+def find_screenshots(directory: Path) -> List[Path]:
+    """
+    List the screenshot images directly inside a directory, sorted by name.
     
-    def __init__(self, max_calls_per_minute: int = 30):
-        self.max_calls = max_calls_per_minute
-        self.calls = Queue()
-        self.lock = threading.Lock()
+    Args:
+        directory: Directory to search (subdirectories are not included)
+        
+    Returns:
+        Sorted list of image paths in any supported screenshot format
+    """
+    return sorted(
+        (path for path in Path(directory).iterdir()
+         if path.is_file() and path.suffix.lower() in SCREENSHOT_EXTENSIONS),
+        key=lambda path: path.name
+    )
+
+
+# TOC headings and lines ending in a page number, for classifying DOM text layers
+TOC_HEADING_PATTERN = re.compile(r'\b(inhaltsverzeichnis|inhalt|contents)\b', re.IGNORECASE)
+PAGE_REFERENCE_PATTERN = re.compile(r'(^|[\s.])\d{1,3}$')
+
+
+def classify_text_layer(image_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Classify a screenshot as TOC or not from its text-layer sidecar JSON, without an API call.
     
-    def wait_if_needed(self):
-        """Wait if necessary to respect rate limits."""
-        with self.lock:
-            current_time = time.time()
-            
-            # Remove calls older than 1 minute
-            while not self.calls.empty():
-                if current_time - self.calls.queue[0] > 60:
-                    self.calls.get()
-                else:
-                    break
-            
-            # If we're at the limit, wait
-            if self.calls.qsize() >= self.max_calls:
-                sleep_time = 60 - (current_time - self.calls.queue[0])
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
-                    # Remove the old call
-                    self.calls.get()
-            
-            # Record this call
-            self.calls.put(current_time)
+    Uses the text saved by LivebookScreenshotTool(extract_text_layer=True): a TOC
+    heading near the top and a high share of lines ending in page numbers.
+    
+    Args:
+        image_path: Path to the screenshot (the sidecar is the same path with .json)
+        
+    Returns:
+        Dict with is_toc, confidence and reasoning (like analyze_screenshot), or None if
+        the page has no usable text layer (e.g. pages rendered to a canvas)
+    """
+    sidecar = Path(image_path).with_suffix('.json')
+    try:
+        with open(sidecar, 'r', encoding='utf-8') as f:
+            text = json.load(f).get('text', '')
+    except (OSError, ValueError):
+        return None
+    
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if sum(len(line) for line in lines) < 20:
+        return None
+    
+    has_heading = bool(TOC_HEADING_PATTERN.search(' '.join(lines[:10])))
+    page_references = sum(1 for line in lines if PAGE_REFERENCE_PATTERN.search(line))
+    ratio = page_references / len(lines)
+    
+    is_toc = (has_heading and ratio >= 0.2) or (page_references >= 5 and ratio >= 0.4)
+    confidence = min(0.95, 0.5 + ratio / 2 + (0.2 if has_heading else 0.0))
+    
+    return {
+        'is_toc': is_toc,
+        'confidence': round(confidence if is_toc else 1.0 - confidence / 2, 2),
+        'reasoning': f"Text layer: {'TOC heading, ' if has_heading else ''}"
+                     f"{page_references}/{len(lines)} lines end in a page number",
+        'source': 'text_layer'
+    }
+
+
+def share_book_results(book_results: Dict[str, Any], source_name: str, target_name: str) -> Dict[str, Any]:
+    """
+    Reuse the filter results of a book for a book that shares its pages.
+    
+    LivebookScreenshotTool captures identical ISBNs and aliased editions once and
+    copies the pages to the other book directories, renaming them from the source
+    directory name to the target directory name. This maps the results the same way,
+    so the shared book is organized and reported without analyzing its pages again.
+    
+    Args:
+        book_results: filter_isbn_directory results of the source book
+        source_name: Directory name of the source book
+        target_name: Directory name of the book sharing the pages
+        
+    Returns:
+        Results for the target book, with shared_from set to the source directory name
+    """
+    def rename(page: Dict[str, Any]) -> Dict[str, Any]:
+        return dict(page, filename=page['filename'].replace(source_name, target_name, 1))
+    
+    shared = dict(book_results)
+    shared['isbn'] = target_name
+    shared['shared_from'] = source_name
+    for key in ('toc_pages', 'non_toc_pages', 'analysis_results'):
+        if key in book_results:
+            shared[key] = [rename(page) for page in book_results[key]]
+    return shared
 
 
 class TOCFilterError(Exception):
@@ -86,13 +202,70 @@ class TOCFilterError(Exception):
     pass
 
 
+# Prompt for classifying several screenshots in one request (bump BATCH_PROMPT_VERSION when changing it)
+TOC_BATCH_CLASSIFICATION_PROMPT = """
+            You are an expert at analyzing educational book screenshots to identify table of contents (TOC) pages.
+            
+            The following images are consecutive pages of one book, each preceded by its label "Page <index>".
+            Analyze every page separately and determine if it contains a table of contents or index.
+            
+            Look for these TOC indicators:
+            - Chapter listings with page numbers
+            - Organized hierarchical content structure
+            - "Inhaltsverzeichnis", "Inhalt", "Contents", "Index" headings
+            - Sequential chapter/section numbering
+            - Lists of topics with corresponding page numbers
+            - Structured layout typical of a table of contents
+            
+            NOT table of contents:
+            - Regular book content/text pages
+            - Exercise pages
+            - Images or diagrams without TOC structure
+            - Individual chapters or lessons
+            - Navigation elements that aren't content listings
+            
+            Respond with a JSON array containing exactly one object per page, in page order:
+            [
+                {
+                    "index": integer (the page label),
+                    "is_toc": boolean (true if this page is a table of contents),
+                    "confidence": float (0.0-1.0, how confident you are),
+                    "reasoning": string (explanation of your decision),
+                    "toc_elements_found": array of strings (specific TOC elements you identified),
+                    "language": string (detected language of the content)
+                }
+            ]
+            """
+
 class TOCScreenshotFilter:
     """
     AI-powered filter to identify table of contents screenshots with parallel processing.
     """
     
+    # Version of TOC_CLASSIFICATION_PROMPT and its answer format (part of the cache key)
+    PROMPT_VERSION = "toc-v1"
+    
+    # How screenshots are prepared for the API (part of the cache key)
+    MAX_IMAGE_WIDTH = 2048
+    JPEG_QUALITY = 85
+    IMAGE_DETAIL = "high"
+    
+    # Retries of a request answered with 429 when a concurrency controller is used
+    MAX_RATE_LIMIT_RETRIES = 5
+    
+    # Multi-page requests (pages_per_request > 1): prompt version and per-request budgets
+    BATCH_PROMPT_VERSION = "toc-batch-v1"
+    MAX_BATCH_IMAGE_TOKENS = 40000
+    MAX_BATCH_REQUEST_BYTES = 20 * 1024 * 1024
+    BATCH_OUTPUT_TOKENS_PER_PAGE = 200
+    
     def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o-mini", 
-                 max_workers: int = 4, max_calls_per_minute: int = 30):
+                 max_workers: int = 4, max_calls_per_minute: Optional[int] = None,
+                 max_tokens_per_minute: Optional[int] = None, rate_limiter: Optional[RateLimiter] = None,
+                 shared_rate_limit_db: Optional[str] = None,
+                 classification_cache_file: Optional[str] = ".cache/toc_classifications.sqlite3",
+                 concurrency_controller: Optional[AdaptiveConcurrencyController] = None,
+                 pages_per_request: int = 1):
         """
         Initialize the TOC filter.
         
@@ -100,16 +273,43 @@ class TOCScreenshotFilter:
             api_key: OpenAI API key (will try to get from environment if not provided)
             model: OpenAI model to use (default: gpt-4o-mini)
             max_workers: Maximum number of parallel workers for processing
-            max_calls_per_minute: Maximum API calls per minute to respect rate limits
+            max_calls_per_minute: Maximum API calls per minute to respect rate limits (None:
+                30 without a concurrency controller; with one no fixed cap, so its AIMD limit
+                and Retry-After set the rate - pass the account's RPM here as a ceiling)
+            max_tokens_per_minute: Maximum tokens per minute (None: only calls are limited)
+            rate_limiter: Limiter shared with other clients of the same API account
+                (e.g. a TocTaxonomyAnalyzer); overrides the two limits above
+            shared_rate_limit_db: SQLite file through which all processes on this host
+                share the limits (default: $OPENAI_RATE_LIMIT_DB; unset: per process)
+            classification_cache_file: SQLite file caching classifications by image hash,
+                model, prompt version and encoding (None disables the cache)
+            concurrency_controller: Adaptive limit on requests in flight (below max_workers) that
+                backs off on 429s and honors Retry-After; rate-limited requests are retried
+                instead of being recorded as non-TOC pages (None: no adaptive limit)
+            pages_per_request: Maximum pages classified in one request (1: one request per
+                page); batches are also bounded by MAX_BATCH_IMAGE_TOKENS and
+                MAX_BATCH_REQUEST_BYTES, and shrink when the model rejects or miscounts them
         """
+        if pages_per_request < 1:
+            raise TOCFilterError(f"pages_per_request must be at least 1, got {pages_per_request}")
         self.model = model
+        self.pages_per_request = pages_per_request
+        self.batch_size = pages_per_request
+        self.batch_stats = {'requests': 0, 'pages': 0, 'splits': 0}
+        self.batch_lock = threading.Lock()
+        self.concurrency_controller = concurrency_controller
+        self.cache = ClassificationCache(classification_cache_file) if classification_cache_file else None
         self.max_workers = max_workers
-        self.rate_limiter = RateLimiter(max_calls_per_minute)
+        if max_calls_per_minute is None and concurrency_controller is None:
+            max_calls_per_minute = DEFAULT_MAX_CALLS_PER_MINUTE
+        self.rate_limiter = rate_limiter or create_rate_limiter(max_calls_per_minute, max_tokens_per_minute,
+                                                                shared_db=shared_rate_limit_db)
         self.setup_logging()
         
-        # Initialize OpenAI client
+        # Initialize OpenAI client (429s must reach the controller instead of the client's own retries)
+        client_options = {'max_retries': 0} if concurrency_controller else {}
         if api_key:
-            self.client = OpenAI(api_key=api_key)
+            self.client = OpenAI(api_key=api_key, **client_options)
         else:
             # Try to get from environment
             api_key = os.getenv('OPENAI_API_KEY')
@@ -118,9 +318,12 @@ class TOCScreenshotFilter:
                     "OpenAI API key not found. Set OPENAI_API_KEY environment variable "
                     "or pass api_key parameter."
                 )
-            self.client = OpenAI(api_key=api_key)
+            self.client = OpenAI(api_key=api_key, **client_options)
         
-        self.logger.info(f"Initialized TOC filter with model: {model}, max_workers: {max_workers}, rate_limit: {max_calls_per_minute}/min")
+        shared = " (shared across processes)" if isinstance(self.rate_limiter, SharedRateLimiter) else ""
+        rate_limit = f"{self.rate_limiter.max_calls}/min" if self.rate_limiter.max_calls else "adaptive"
+        self.logger.info(f"Initialized TOC filter with model: {model}, max_workers: {max_workers}, "
+                         f"rate_limit: {rate_limit}{shared}")
     
     def setup_logging(self):
         """Setup logging for the filter."""
@@ -135,6 +338,11 @@ class TOCScreenshotFilter:
             handler.setFormatter(formatter)
             self.logger.addHandler(handler)
     
+    @property
+    def image_encoding(self) -> str:
+        """Encoding parameters of the images sent to the API, as used in cache keys."""
+        return f"w{self.MAX_IMAGE_WIDTH}-jpeg{self.JPEG_QUALITY}-{self.IMAGE_DETAIL}"
+    
     def encode_image(self, image_path: str) -> str:
         """
         Encode image to base64 for OpenAI API.
@@ -148,11 +356,16 @@ class TOCScreenshotFilter:
         try:
             # Optimize image size for API (reduce if too large)
             with Image.open(image_path) as img:
+                # JPEG captures that already fit are sent as-is, without decoding or re-encoding
+                if img.format == 'JPEG' and img.width <= self.MAX_IMAGE_WIDTH:
+                    with open(image_path, 'rb') as image_file:
+                        return base64.b64encode(image_file.read()).decode('utf-8')
+                
                 # Resize if image is too large (max 2048px width)
-                if img.width > 2048:
-                    ratio = 2048 / img.width
+                if img.width > self.MAX_IMAGE_WIDTH:
+                    ratio = self.MAX_IMAGE_WIDTH / img.width
                     new_height = int(img.height * ratio)
-                    img = img.resize((2048, new_height), Image.Resampling.LANCZOS)
+                    img = img.resize((self.MAX_IMAGE_WIDTH, new_height), Image.Resampling.LANCZOS)
                 
                 # Convert to RGB if necessary
                 if img.mode != 'RGB':
@@ -161,7 +374,7 @@ class TOCScreenshotFilter:
                 # Save to temporary bytes
                 import io
                 buffer = io.BytesIO()
-                img.save(buffer, format='JPEG', quality=85)
+                img.save(buffer, format='JPEG', quality=self.JPEG_QUALITY)
                 image_bytes = buffer.getvalue()
             
             return base64.b64encode(image_bytes).decode('utf-8')
@@ -173,14 +386,20 @@ class TOCScreenshotFilter:
         """
         Analyze a single screenshot to determine if it contains TOC content.
         
+        Results are looked up in (and stored to) the classification cache first, so a
+        screenshot already classified with the same model, prompt and encoding costs
+        no API call.
+        
         Args:
             image_path: Path to the screenshot to analyze
             
         Returns:
             Dict with analysis results including is_toc, confidence, and reasoning
+            (cached: True if the result came from the cache)
         """
-        # Apply rate limiting
-        self.rate_limiter.wait_if_needed()
+        image_sha256, cached = self._cached_result(image_path)
+        if cached is not None:
+            return cached
         
         self.logger.info(f"Analyzing screenshot: {image_path}")
         
@@ -188,104 +407,484 @@ class TOCScreenshotFilter:
             # Encode image
             base64_image = self.encode_image(image_path)
             
-            # Prepare the prompt
-            prompt = """
-            You are an expert at analyzing educational book screenshots to identify table of contents (TOC) pages.
+            # Make API call (rate limited and, with a controller, concurrency limited)
+            estimated_tokens = estimate_tokens(TOC_CLASSIFICATION_PROMPT, images=1, max_output_tokens=500)
+            response = self._create_completion(self.classification_request(base64_image), estimated_tokens)
+            usage = getattr(response, 'usage', None)
+            self.rate_limiter.record_usage(estimated_tokens, getattr(usage, 'total_tokens', None))
             
-            Please analyze this screenshot and determine if it contains a table of contents or index.
+            result = self.parse_classification(response.choices[0].message.content)
+            self._cache_result(image_path, image_sha256, result)
+            return result
+                
+        except Exception as e:
+            self.logger.error(f"Failed to analyze screenshot {image_path}: {e}")
+            return self.failed_result(e)
+    
+    def _create_completion(self, request: Dict[str, Any], estimated_tokens: int) -> Any:
+        """
+        Make a chat completion call within the rate limits.
+        
+        With a concurrency controller, the call waits for a slot, reports its outcome,
+        and is retried after the Retry-After pause when the API answers 429.
+        
+        Args:
+            request: Keyword arguments for client.chat.completions.create
+            estimated_tokens: Tokens reserved with the rate limiter
             
-            Look for these TOC indicators:
-            - Chapter listings with page numbers
-            - Organized hierarchical content structure
-            - "Inhaltsverzeichnis", "Inhalt", "Contents", "Index" headings
-            - Sequential chapter/section numbering
-            - Lists of topics with corresponding page numbers
-            - Structured layout typical of a table of contents
+        Returns:
+            The API response
+        """
+        controller = self.concurrency_controller
+        if not controller:
+            # Waits outside the limiter's lock, so workers don't queue behind each other
+            self.rate_limiter.acquire(estimated_tokens)
+            return self.client.chat.completions.create(**request)
+        
+        attempt = 0
+        while True:
+            # Slot first, so no reservation is spent while a Retry-After pause holds the slots
+            started = controller.acquire()
+            try:
+                # Latency measured from here covers the API call only
+                started += self.rate_limiter.acquire(estimated_tokens)
+                response = self.client.chat.completions.create(**request)
+                controller.on_success(started)
+                return response
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    controller.on_error(started)
+                    raise
+                controller.on_rate_limited(started, retry_after_seconds(e))
+                if attempt >= self.MAX_RATE_LIMIT_RETRIES:
+                    raise
+                attempt += 1
+                self.logger.warning(f"⏳ Rate limited (429), retry {attempt}/{self.MAX_RATE_LIMIT_RETRIES} "
+                                    f"at concurrency {int(controller.limit)}")
+            finally:
+                controller.release()
+    
+    def _cached_result(self, image_path: str,
+                       prompt_version: Optional[str] = None) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Look up a screenshot in the classification cache.
+        
+        Args:
+            image_path: Path to the screenshot
+            prompt_version: Prompt the result must come from (default: PROMPT_VERSION)
+        
+        Returns:
+            Tuple of (image SHA-256 or None, cached result marked cached=True or None)
+        """
+        if not self.cache:
+            return None, None
+        try:
+            image_sha256 = file_sha256(Path(image_path))
+            cached = self.cache.get(image_sha256, self.model, prompt_version or self.PROMPT_VERSION,
+                                    self.image_encoding)
+        except (OSError, sqlite3.Error) as e:
+            self.logger.warning(f"Classification cache unavailable for {image_path}: {e}")
+            return None, None
+        if cached is None:
+            return image_sha256, None
+        self.logger.info(f"Cached analysis: {image_path} (TOC={cached['is_toc']})")
+        return image_sha256, dict(cached, cached=True)
+    
+    def classification_request(self, base64_image: str) -> Dict[str, Any]:
+        """
+        Build the chat completion parameters for classifying one screenshot.
+        
+        Args:
+            base64_image: JPEG image from encode_image
             
-            NOT table of contents:
-            - Regular book content/text pages
-            - Exercise pages
-            - Images or diagrams without TOC structure
-            - Individual chapters or lessons
-            - Navigation elements that aren't content listings
+        Returns:
+            Keyword arguments for client.chat.completions.create
+        """
+        return {
+            'model': self.model,
+            'messages': [
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": TOC_CLASSIFICATION_PROMPT},
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:image/jpeg;base64,{base64_image}",
+                                "detail": self.IMAGE_DETAIL
+                            }
+                        }
+                    ]
+                }
+            ],
+            'max_tokens': 500,
+            'temperature': 0.1  # Low temperature for consistent analysis
+        }
+    
+    def _cache_result(self, image_path: str, image_sha256: Optional[str], result: Dict[str, Any],
+                      prompt_version: Optional[str] = None) -> None:
+        """Store a classification in the cache (only well-formed answers; fallbacks are retried next run)."""
+        if not self.cache or not image_sha256 or 'raw_response' in result or 'error' in result:
+            return
+        try:
+            self.cache.put(image_sha256, self.model, prompt_version or self.PROMPT_VERSION, self.image_encoding, result)
+        except sqlite3.Error as e:
+            self.logger.warning(f"Could not cache analysis of {image_path}: {e}")
+    
+    def failed_result(self, error: Exception) -> Dict[str, Any]:
+        """Result recorded for a screenshot whose analysis failed."""
+        return {
+            'is_toc': False,
+            'confidence': 0.0,
+            'reasoning': f"Analysis failed: {str(error)}",
+            'error': str(error)
+        }
+    
+    def parse_classification(self, content: str) -> Dict[str, Any]:
+        """
+        Parse the model's answer to TOC_CLASSIFICATION_PROMPT.
+        
+        Args:
+            content: Message content returned by the model
             
-            Respond with a JSON object containing:
-            {
-                "is_toc": boolean (true if this is a table of contents),
-                "confidence": float (0.0-1.0, how confident you are),
-                "reasoning": string (explanation of your decision),
-                "toc_elements_found": array of strings (specific TOC elements you identified),
-                "language": string (detected language of the content)
+        Returns:
+            Dict with is_toc, confidence and reasoning; a keyword-based fallback
+            (with raw_response) if the answer is not the expected JSON
+        """
+        try:
+            # Try to parse as JSON
+            if content.startswith('```json'):
+                content = content.replace('```json', '').replace('```', '').strip()
+            elif content.startswith('```'):
+                content = content.replace('```', '').strip()
+            
+            result = json.loads(content)
+            
+            # Validate required fields
+            required_fields = ['is_toc', 'confidence', 'reasoning']
+            for field in required_fields:
+                if field not in result:
+                    raise ValueError(f"Missing required field: {field}")
+            
+            self.logger.info(f"Analysis complete: TOC={result['is_toc']}, Confidence={result['confidence']:.2f}")
+            return result
+            
+        except (json.JSONDecodeError, ValueError) as e:
+            self.logger.warning(f"Failed to parse AI response as JSON: {e}")
+            # Fallback: analyze text response
+            is_toc = any(keyword in content.lower() for keyword in [
+                'table of contents', 'is a toc', 'contains toc', 'inhaltsverzeichnis'
+            ])
+            
+            return {
+                'is_toc': is_toc,
+                'confidence': 0.5,
+                'reasoning': f"Fallback analysis based on keywords in: {content[:200]}...",
+                'toc_elements_found': [],
+                'language': 'unknown',
+                'raw_response': content
             }
-            """
+    
+    def batch_classification_request(self, base64_images: List[str]) -> Dict[str, Any]:
+        """
+        Build the chat completion parameters for classifying several screenshots at once.
+        
+        Args:
+            base64_images: JPEG images from encode_image, labeled "Page 1", "Page 2", ... in order
             
-            # Make API call
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}",
-                                    "detail": "high"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=500,
-                temperature=0.1  # Low temperature for consistent analysis
-            )
+        Returns:
+            Keyword arguments for client.chat.completions.create
+        """
+        content = [{"type": "text", "text": TOC_BATCH_CLASSIFICATION_PROMPT}]
+        for index, base64_image in enumerate(base64_images, 1):
+            content.append({"type": "text", "text": f"Page {index}"})
+            content.append({
+                "type": "image_url",
+                "image_url": {
+                    "url": f"data:image/jpeg;base64,{base64_image}",
+                    "detail": self.IMAGE_DETAIL
+                }
+            })
+        return {
+            'model': self.model,
+            'messages': [{"role": "user", "content": content}],
+            'max_tokens': 100 + self.BATCH_OUTPUT_TOKENS_PER_PAGE * len(base64_images),
+            'temperature': 0.1
+        }
+    
+    def parse_batch_classification(self, content: str, page_count: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Parse the model's answer to TOC_BATCH_CLASSIFICATION_PROMPT.
+        
+        Args:
+            content: Message content returned by the model
+            page_count: Number of pages sent
             
-            # Parse response
-            content = response.choices[0].message.content
+        Returns:
+            One result per page in the order sent, or None if the answer is not a
+            well-formed array with exactly one verdict for each page
+        """
+        content = content.strip()
+        if content.startswith('```'):
+            content = re.sub(r'^```(?:json)?|```$', '', content).strip()
+        try:
+            verdicts = json.loads(content)
+        except json.JSONDecodeError as e:
+            self.logger.warning(f"Failed to parse batch response as JSON: {e}")
+            return None
+        if isinstance(verdicts, dict):
+            # Some answers wrap the array, e.g. {"pages": [...]}
+            verdicts = next((value for value in verdicts.values() if isinstance(value, list)), None)
+        if not isinstance(verdicts, list) or len(verdicts) != page_count:
+            self.logger.warning(f"Batch response has {len(verdicts) if isinstance(verdicts, list) else 'no'} "
+                                f"verdicts for {page_count} pages")
+            return None
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * page_count
+        for position, verdict in enumerate(verdicts):
+            if not isinstance(verdict, dict) or not all(field in verdict for field in ('is_toc', 'confidence', 'reasoning')):
+                self.logger.warning(f"Batch response verdict {position + 1} is incomplete")
+                return None
+            index = verdict.pop('index', position + 1)
+            if not isinstance(index, int) or not 1 <= index <= page_count or results[index - 1] is not None:
+                index = position + 1
+            if results[index - 1] is not None:
+                return None
+            results[index - 1] = verdict
+        return results
+    
+    def _page_cost(self, image_path: str) -> Tuple[int, int]:
+        """
+        Estimate what one page adds to a multi-page request, from the image header only.
+        
+        Returns:
+            Tuple of (input tokens, base64 payload bytes)
+        """
+        try:
+            with Image.open(image_path) as img:
+                width, height = img.size
+        except OSError:
+            width = height = 0
+        if width > self.MAX_IMAGE_WIDTH:
+            width, height = self.MAX_IMAGE_WIDTH, int(height * self.MAX_IMAGE_WIDTH / width)
+        size = Path(image_path).stat().st_size if Path(image_path).exists() else 0
+        return image_tokens(width, height, self.IMAGE_DETAIL), size * 4 // 3
+    
+    def plan_batches(self, image_paths: List[str]) -> List[List[int]]:
+        """
+        Group consecutive pages into multi-page requests.
+        
+        A request holds at most batch_size pages (pages_per_request, lowered when the
+        model rejects or miscounts a batch) and stays within MAX_BATCH_IMAGE_TOKENS
+        and MAX_BATCH_REQUEST_BYTES.
+        
+        Args:
+            image_paths: Screenshots to classify
             
+        Returns:
+            Lists of indexes into image_paths, one list per request
+        """
+        batches: List[List[int]] = []
+        current: List[int] = []
+        tokens = payload = 0
+        for index, image_path in enumerate(image_paths):
+            page_tokens, page_bytes = self._page_cost(image_path)
+            if current and (len(current) >= self.batch_size
+                            or tokens + page_tokens > self.MAX_BATCH_IMAGE_TOKENS
+                            or payload + page_bytes > self.MAX_BATCH_REQUEST_BYTES):
+                batches.append(current)
+                current, tokens, payload = [], 0, 0
+            current.append(index)
+            tokens += page_tokens
+            payload += page_bytes
+        if current:
+            batches.append(current)
+        return batches
+    
+    def _encode_batch(self, image_paths: List[str]) -> Tuple[List[Optional[Dict[str, Any]]], List[Tuple[int, str]]]:
+        """
+        Encode the pages of a multi-page request.
+        
+        Returns:
+            Tuple of (results with failed entries for pages that could not be encoded,
+            (position, base64 image) of the pages to send)
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(image_paths)
+        encoded = []
+        for position, image_path in enumerate(image_paths):
             try:
-                # Try to parse as JSON
-                if content.startswith('```json'):
-                    content = content.replace('```json', '').replace('```', '').strip()
-                elif content.startswith('```'):
-                    content = content.replace('```', '').strip()
-                
-                result = json.loads(content)
-                
-                # Validate required fields
-                required_fields = ['is_toc', 'confidence', 'reasoning']
-                for field in required_fields:
-                    if field not in result:
-                        raise ValueError(f"Missing required field: {field}")
-                
-                self.logger.info(f"Analysis complete: TOC={result['is_toc']}, Confidence={result['confidence']:.2f}")
-                return result
-                
-            except (json.JSONDecodeError, ValueError) as e:
-                self.logger.warning(f"Failed to parse AI response as JSON: {e}")
-                # Fallback: analyze text response
-                is_toc = any(keyword in content.lower() for keyword in [
-                    'table of contents', 'is a toc', 'contains toc', 'inhaltsverzeichnis'
-                ])
-                
-                return {
-                    'is_toc': is_toc,
-                    'confidence': 0.5,
-                    'reasoning': f"Fallback analysis based on keywords in: {content[:200]}...",
-                    'toc_elements_found': [],
-                    'language': 'unknown',
-                    'raw_response': content
-                }
-                
+                encoded.append((position, self.encode_image(image_path)))
+            except TOCFilterError as e:
+                self.logger.error(f"Failed to analyze screenshot {image_path}: {e}")
+                results[position] = self.failed_result(e)
+        return results, encoded
+    
+    def _batch_estimated_tokens(self, image_paths: List[str]) -> int:
+        """Estimate the tokens of a multi-page request for the rate limiter."""
+        return (estimate_tokens(TOC_BATCH_CLASSIFICATION_PROMPT,
+                                max_output_tokens=100 + self.BATCH_OUTPUT_TOKENS_PER_PAGE * len(image_paths))
+                + sum(self._page_cost(image_path)[0] for image_path in image_paths))
+    
+    def _batch_failed(self, image_paths: List[str], results: List[Optional[Dict[str, Any]]],
+                      encoded: List[Tuple[int, str]], error: Exception) -> Optional[List[Dict[str, Any]]]:
+        """
+        Handle a failed multi-page request.
+        
+        Returns:
+            None if the batch should be split and retried (the request was rejected as
+            too large or invalid), otherwise failed results for its pages
+        """
+        status = getattr(error, 'status_code', None)
+        if len(encoded) > 1 and status in (400, 413):
+            self.logger.warning(f"Batch of {len(encoded)} pages rejected ({status}): {error}")
+            return None
+        for position, _ in encoded:
+            self.logger.error(f"Failed to analyze screenshot {image_paths[position]}: {error}")
+            results[position] = self.failed_result(error)
+        return results
+    
+    def _batch_answered(self, image_paths: List[str], image_sha256s: List[Optional[str]],
+                        results: List[Optional[Dict[str, Any]]], encoded: List[Tuple[int, str]],
+                        response: Any, estimated_tokens: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Map a multi-page answer back to its pages and cache the verdicts.
+        
+        Returns:
+            Results for all pages, or None if the batch should be split and retried
+            (the answer did not hold exactly one verdict per page)
+        """
+        usage = getattr(response, 'usage', None)
+        self.rate_limiter.record_usage(estimated_tokens, getattr(usage, 'total_tokens', None))
+        with self.batch_lock:
+            self.batch_stats['requests'] += 1
+            self.batch_stats['pages'] += len(encoded)
+        
+        content = response.choices[0].message.content
+        verdicts = self.parse_batch_classification(content, len(encoded))
+        if verdicts is None:
+            if len(encoded) > 1:
+                return None
+            # A single page can still get the keyword fallback of the one-page format
+            verdicts = [self.parse_classification(content)]
+        
+        for (position, _), verdict in zip(encoded, verdicts):
+            verdict['batched_pages'] = len(encoded)
+            self._cache_result(image_paths[position], image_sha256s[position], verdict, self.BATCH_PROMPT_VERSION)
+            results[position] = verdict
+        return results
+    
+    def _split_batch(self, batch_size: int) -> int:
+        """Lower the batch size after a rejected or miscounted batch and return the size of its first half."""
+        half = max(1, batch_size // 2)
+        with self.batch_lock:
+            self.batch_stats['splits'] += 1
+            if self.batch_size > half:
+                self.batch_size = half
+                self.logger.warning(f"📉 Pages per request lowered to {half}")
+        return half
+    
+    def analyze_screenshot_batch(self, image_paths: List[str],
+                                 image_sha256s: Optional[List[Optional[str]]] = None) -> List[Dict[str, Any]]:
+        """
+        Classify several screenshots in one request (split in halves if the model rejects
+        or miscounts them).
+        
+        Args:
+            image_paths: Screenshots to classify, labeled "Page 1", "Page 2", ... in order
+            image_sha256s: SHA-256 of each screenshot for caching (None: not cached)
+            
+        Returns:
+            One analysis result per screenshot, in order (batched_pages: pages in the request)
+        """
+        image_sha256s = image_sha256s or [None] * len(image_paths)
+        self.logger.info(f"Analyzing {len(image_paths)} screenshots in one request")
+        
+        results, encoded = self._encode_batch(image_paths)
+        if not encoded:
+            return results
+        
+        sent = [image_paths[position] for position, _ in encoded]
+        estimated_tokens = self._batch_estimated_tokens(sent)
+        try:
+            request = self.batch_classification_request([base64_image for _, base64_image in encoded])
+            response = self._create_completion(request, estimated_tokens)
         except Exception as e:
-            self.logger.error(f"Failed to analyze screenshot {image_path}: {e}")
-            return {
-                'is_toc': False,
-                'confidence': 0.0,
-                'reasoning': f"Analysis failed: {str(e)}",
-                'error': str(e)
+            outcome = self._batch_failed(image_paths, results, encoded, e)
+        else:
+            outcome = self._batch_answered(image_paths, image_sha256s, results, encoded, response, estimated_tokens)
+        if outcome is not None:
+            return outcome
+        
+        half = self._split_batch(len(image_paths))
+        return (self.analyze_screenshot_batch(image_paths[:half], image_sha256s[:half])
+                + self.analyze_screenshot_batch(image_paths[half:], image_sha256s[half:]))
+    
+    def _plan_book_batches(self, screenshots: List[Path]) -> Tuple[List[Optional[Dict[str, Any]]],
+                                                                   List[Tuple[List[int], List[Optional[str]]]]]:
+        """
+        Look up a book's screenshots in the cache and group the uncached ones into requests.
+        
+        Args:
+            screenshots: Screenshots of one book in page order
+            
+        Returns:
+            Tuple of (results with cached entries filled in, one (page indexes, SHA-256s)
+            pair per multi-page request)
+        """
+        analysis_results: List[Optional[Dict[str, Any]]] = [None] * len(screenshots)
+        pending, pending_sha256s = [], []
+        for i, screenshot in enumerate(screenshots):
+            image_sha256, cached = self._cached_result(str(screenshot), self.BATCH_PROMPT_VERSION)
+            if cached is not None:
+                analysis_results[i] = cached
+            else:
+                pending.append(i)
+                pending_sha256s.append(image_sha256)
+        
+        batches = [([pending[j] for j in batch], [pending_sha256s[j] for j in batch])
+                   for batch in self.plan_batches([str(screenshots[i]) for i in pending])]
+        self.logger.info(f"Classifying {len(pending)} uncached screenshots in {len(batches)} requests")
+        return analysis_results, batches
+    
+    @staticmethod
+    def _label_results(screenshots: List[Path], analysis_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Add filename and page_number to a book's analysis results (in page order)."""
+        for page_number, (screenshot, result) in enumerate(zip(screenshots, analysis_results), 1):
+            result['filename'] = screenshot.name
+            result['page_number'] = page_number
+        return analysis_results
+    
+    def _analyze_batched(self, screenshots: List[Path]) -> List[Dict[str, Any]]:
+        """
+        Classify a book's screenshots with multi-page requests, in parallel.
+        
+        Cached pages are looked up first, so only uncached pages fill the requests.
+        
+        Args:
+            screenshots: Screenshots of one book in page order
+            
+        Returns:
+            Analysis results with filename and page_number added
+        """
+        analysis_results, batches = self._plan_book_batches(screenshots)
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            future_to_batch = {
+                executor.submit(self.analyze_screenshot_batch,
+                                [str(screenshots[i]) for i in batch], image_sha256s): batch
+                for batch, image_sha256s in batches
             }
+            for future in as_completed(future_to_batch):
+                batch = future_to_batch[future]
+                try:
+                    batch_results = future.result()
+                except Exception as e:
+                    self.logger.error(f"Failed to process batch of {len(batch)} screenshots: {e}")
+                    batch_results = [self.failed_result(e) for _ in batch]
+                for i, result in zip(batch, batch_results):
+                    analysis_results[i] = result
+        
+        return self._label_results(screenshots, analysis_results)
     
     def filter_isbn_directory(self, isbn_dir: str, confidence_threshold: float = 0.7) -> Dict[str, Any]:
         """
@@ -305,8 +904,8 @@ class TOCScreenshotFilter:
         isbn = isbn_path.name
         self.logger.info(f"Filtering screenshots for ISBN: {isbn}")
         
-        # Find all PNG screenshots
-        screenshots = list(isbn_path.glob("*.png"))
+        # Find all screenshots (already sorted by page number via filename)
+        screenshots = find_screenshots(isbn_path)
         if not screenshots:
             self.logger.warning(f"No screenshots found in {isbn_dir}")
             return {
@@ -317,14 +916,12 @@ class TOCScreenshotFilter:
                 'analysis_results': []
             }
         
-        # Sort screenshots by page number
-        screenshots.sort(key=lambda x: x.name)
-        
         self.logger.info(f"Found {len(screenshots)} screenshots to analyze with {self.max_workers} workers")
         
+        if self.pages_per_request > 1:
+            return self.summarize_book(isbn, self._analyze_batched(screenshots), confidence_threshold)
+        
         analysis_results = []
-        toc_pages = []
-        non_toc_pages = []
         
         # Process screenshots in parallel
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
@@ -342,27 +939,7 @@ class TOCScreenshotFilter:
                     result = future.result()
                     result['filename'] = screenshot.name
                     result['page_number'] = page_number
-                    
                     analysis_results.append(result)
-                    
-                    # Categorize based on confidence threshold
-                    if result.get('is_toc', False) and result.get('confidence', 0) >= confidence_threshold:
-                        toc_pages.append({
-                            'filename': screenshot.name,
-                            'confidence': result['confidence'],
-                            'reasoning': result['reasoning'],
-                            'page_number': page_number
-                        })
-                        self.logger.info(f"✅ TOC page found: {screenshot.name} (confidence: {result['confidence']:.2f})")
-                    else:
-                        non_toc_pages.append({
-                            'filename': screenshot.name,
-                            'is_toc': result.get('is_toc', False),
-                            'confidence': result.get('confidence', 0),
-                            'reasoning': result['reasoning'],
-                            'page_number': page_number
-                        })
-                        self.logger.info(f"❌ Non-TOC page: {screenshot.name} (confidence: {result.get('confidence', 0):.2f})")
                         
                 except Exception as e:
                     self.logger.error(f"Failed to process {screenshot.name}: {e}")
@@ -376,21 +953,66 @@ class TOCScreenshotFilter:
                         'error': str(e)
                     })
         
+        return self.summarize_book(isbn, analysis_results, confidence_threshold)
+    
+    def summarize_book(self, isbn: str, analysis_results: List[Dict[str, Any]],
+                       confidence_threshold: float = 0.7) -> Dict[str, Any]:
+        """
+        Split a book's page analyses into TOC and non-TOC pages.
+        
+        Args:
+            isbn: Book directory name the pages belong to
+            analysis_results: analyze_screenshot results with filename and page_number added
+            confidence_threshold: Minimum confidence score to consider a page as TOC
+            
+        Returns:
+            Dict with filtering results and TOC pages identified (as filter_isbn_directory)
+        """
+        toc_pages = []
+        non_toc_pages = []
+        
+        for result in analysis_results:
+            # Categorize based on confidence threshold
+            if result.get('is_toc', False) and result.get('confidence', 0) >= confidence_threshold:
+                toc_pages.append({
+                    'filename': result['filename'],
+                    'confidence': result['confidence'],
+                    'reasoning': result['reasoning'],
+                    'page_number': result['page_number']
+                })
+                self.logger.info(f"✅ TOC page found: {result['filename']} (confidence: {result['confidence']:.2f})")
+            else:
+                non_toc_pages.append({
+                    'filename': result['filename'],
+                    'is_toc': result.get('is_toc', False),
+                    'confidence': result.get('confidence', 0),
+                    'reasoning': result['reasoning'],
+                    'page_number': result['page_number']
+                })
+                self.logger.info(f"❌ Non-TOC page: {result['filename']} (confidence: {result.get('confidence', 0):.2f})")
+        
         # Sort results by page number
-        analysis_results.sort(key=lambda x: x['page_number'])
+        analysis_results = sorted(analysis_results, key=lambda x: x['page_number'])
         toc_pages.sort(key=lambda x: x['page_number'])
         non_toc_pages.sort(key=lambda x: x['page_number'])
         
+        cache_hits = sum(1 for result in analysis_results if result.get('cached'))
         result_summary = {
             'isbn': isbn,
-            'total_screenshots': len(screenshots),
+            'total_screenshots': len(analysis_results),
             'toc_pages': toc_pages,
             'non_toc_pages': non_toc_pages,
             'analysis_results': analysis_results,
-            'confidence_threshold': confidence_threshold
+            'confidence_threshold': confidence_threshold,
+            'cache': {
+                'hits': cache_hits,
+                'misses': len(analysis_results) - cache_hits,
+                'hit_rate': round(cache_hits / len(analysis_results), 3) if analysis_results else 0.0
+            }
         }
         
-        self.logger.info(f"Filtering complete for {isbn}: {len(toc_pages)} TOC pages, {len(non_toc_pages)} non-TOC pages")
+        self.logger.info(f"Filtering complete for {isbn}: {len(toc_pages)} TOC pages, {len(non_toc_pages)} non-TOC pages"
+                         f"{f' ({cache_hits} from cache)' if cache_hits else ''}")
         
         return result_summary
     
@@ -408,14 +1030,7 @@ class TOCScreenshotFilter:
         Returns:
             Dict with results for all ISBNs processed
         """
-        screenshots_path = Path(screenshots_dir)
-        if not screenshots_path.exists():
-            raise TOCFilterError(f"Screenshots directory not found: {screenshots_dir}")
-        
-        # Find all ISBN directories (directories that look like ISBNs)
-        isbn_dirs = [d for d in screenshots_path.iterdir() 
-                    if d.is_dir() and any(c.isdigit() for c in d.name)]
-        
+        isbn_dirs = self.find_isbn_directories(screenshots_dir)
         if not isbn_dirs:
             self.logger.warning(f"No ISBN directories found in {screenshots_dir}")
             return {'processed_isbns': {}, 'summary': {}}
@@ -424,6 +1039,7 @@ class TOCScreenshotFilter:
         
         batch_results = {}
         start_time = time.time()
+        requests_before = self.batch_stats['requests']
         
         if parallel_books and len(isbn_dirs) > 1:
             # Process books in parallel (more aggressive parallelism)
@@ -473,37 +1089,295 @@ class TOCScreenshotFilter:
         processing_time = time.time() - start_time
         
         # Generate summary
+        api_requests = self.batch_stats['requests'] - requests_before if self.pages_per_request > 1 else None
+        summary = self.summarize_batch(batch_results, confidence_threshold, processing_time, api_requests)
+        summary['parallel_processing'] = parallel_books
+        
+        return {
+            'processed_isbns': batch_results,
+            'summary': summary
+        }
+    
+    def find_isbn_directories(self, screenshots_dir: str = "screenshots") -> List[Path]:
+        """
+        Find the book directories below a screenshots directory.
+        
+        Args:
+            screenshots_dir: Base screenshots directory containing ISBN subdirectories
+            
+        Returns:
+            Directories that look like ISBNs (hidden directories such as the blob store are skipped)
+        """
+        screenshots_path = Path(screenshots_dir)
+        if not screenshots_path.exists():
+            raise TOCFilterError(f"Screenshots directory not found: {screenshots_dir}")
+        
+        return [d for d in screenshots_path.iterdir() 
+                if d.is_dir() and not d.name.startswith('.') and any(c.isdigit() for c in d.name)]
+    
+    def write_classification_batch(self, screenshots_dir: str = "screenshots",
+                                   batch_dir: str = "batches") -> BatchJob:
+        """
+        Write the classification requests of all uncached screenshots to Batch API JSONL files.
+        
+        Requests use the same prompt, image encoding and grouping (pages_per_request) as
+        the online modes. Cached pages and pages that cannot be encoded get their
+        result in the job manifest instead of a request.
+        
+        Args:
+            screenshots_dir: Base screenshots directory containing ISBN subdirectories
+            batch_dir: Directory for the request files and the job manifest
+            
+        Returns:
+            The job, ready for BatchRunner.submit
+        """
+        isbn_dirs = self.find_isbn_directories(screenshots_dir)
+        batched = self.pages_per_request > 1
+        prompt_version = self.BATCH_PROMPT_VERSION if batched else self.PROMPT_VERSION
+        context: Dict[str, Any] = {
+            'kind': 'toc_classification',
+            'model': self.model,
+            'prompt_version': prompt_version,
+            'image_encoding': self.image_encoding,
+            'pages_per_request': self.pages_per_request,
+            'screenshots_dir': screenshots_dir,
+            'books': {}
+        }
+        
+        def requests() -> Iterator[Dict[str, Any]]:
+            # Filled in while the requests are written, so only one request's images are in memory
+            counter = 0
+            for isbn_dir in isbn_dirs:
+                screenshots = find_screenshots(isbn_dir)
+                pages = [{'filename': screenshot.name, 'page_number': i} for i, screenshot in enumerate(screenshots, 1)]
+                context['books'][isbn_dir.name] = pages
+                
+                uncached = []
+                for page, screenshot in zip(pages, screenshots):
+                    page['sha256'], cached = self._cached_result(str(screenshot), prompt_version)
+                    if cached is not None:
+                        page['result'] = cached
+                    else:
+                        uncached.append((page, str(screenshot)))
+                
+                groups = self.plan_batches([path for _, path in uncached]) if batched else [[i] for i in range(len(uncached))]
+                for group in groups:
+                    encoded = []
+                    for i in group:
+                        page, path = uncached[i]
+                        try:
+                            encoded.append((page, self.encode_image(path)))
+                        except TOCFilterError as e:
+                            self.logger.error(f"Failed to analyze screenshot {path}: {e}")
+                            page['result'] = self.failed_result(e)
+                    if not encoded:
+                        continue
+                    
+                    counter += 1
+                    custom_id = f"toc-{counter:06d}"
+                    for position, (page, _) in enumerate(encoded):
+                        page['custom_id'] = custom_id
+                        page['position'] = position
+                    images = [base64_image for _, base64_image in encoded]
+                    body = self.batch_classification_request(images) if batched else self.classification_request(images[0])
+                    yield {'custom_id': custom_id, 'body': body}
+        
+        job = BatchJob.create(requests(), name="toc_classification", batch_dir=batch_dir, context=context)
+        self.logger.info(f"📝 Batch job written: {job.manifest['request_count']} requests for "
+                         f"{len(context['books'])} books → {job.manifest_path}")
+        return job
+    
+    def _batch_api_verdicts(self, output: Optional[Dict[str, Any]], page_count: int,
+                            batched: bool) -> List[Dict[str, Any]]:
+        """
+        Turn one Batch API result into a verdict per page of its request.
+        
+        Args:
+            output: Result from BatchRunner (content or error), None if missing
+            page_count: Pages in the request
+            batched: Whether the request used the multi-page prompt
+            
+        Returns:
+            One analysis result per page, in request order
+        """
+        if output is None or 'error' in output:
+            error = BatchAPIError(output['error'] if output else "No result for request")
+            return [self.failed_result(error) for _ in range(page_count)]
+        
+        content = output['content']
+        if not batched:
+            return [self.parse_classification(content)]
+        verdicts = self.parse_batch_classification(content, page_count)
+        if verdicts is not None:
+            return verdicts
+        if page_count == 1:
+            return [self.parse_classification(content)]
+        error = BatchAPIError(f"Answer did not hold one verdict for each of {page_count} pages")
+        return [self.failed_result(error) for _ in range(page_count)]
+    
+    def ingest_classification_batch(self, job: BatchJob, results: Dict[str, Dict[str, Any]],
+                                    confidence_threshold: float = 0.7) -> Dict[str, Any]:
+        """
+        Map Batch API results back to books and pages, and cache the verdicts.
+        
+        Args:
+            job: Job written by write_classification_batch
+            results: Results by custom_id from BatchRunner.collect
+            confidence_threshold: Minimum confidence score to consider a page as TOC
+            
+        Returns:
+            Dict with results for all ISBNs processed (as filter_batch_directories)
+        """
+        context = job.context
+        if context.get('kind') != 'toc_classification':
+            raise TOCFilterError(f"Not a TOC classification job: {job.manifest_path}")
+        if (context['model'], context['image_encoding']) != (self.model, self.image_encoding):
+            raise TOCFilterError(f"Job was written for {context['model']} ({context['image_encoding']}), "
+                                 f"filter uses {self.model} ({self.image_encoding})")
+        
+        batched = context['pages_per_request'] > 1
+        request_pages = Counter(page['custom_id'] for pages in context['books'].values()
+                                for page in pages if 'custom_id' in page)
+        verdicts: Dict[str, List[Dict[str, Any]]] = {}
+        
+        batch_results = {}
+        for isbn, pages in context['books'].items():
+            analysis_results = []
+            for page in pages:
+                result = page.get('result')
+                if result is None:
+                    custom_id = page['custom_id']
+                    if custom_id not in verdicts:
+                        verdicts[custom_id] = self._batch_api_verdicts(results.get(custom_id),
+                                                                       request_pages[custom_id], batched)
+                    result = dict(verdicts[custom_id][page['position']])
+                    if batched:
+                        result['batched_pages'] = request_pages[custom_id]
+                    self._cache_result(page['filename'], page.get('sha256'), result, context['prompt_version'])
+                analysis_results.append(dict(result, filename=page['filename'], page_number=page['page_number']))
+            batch_results[isbn] = self.summarize_book(isbn, analysis_results, confidence_threshold)
+        
+        processing_time = (datetime.now() - datetime.fromisoformat(job.manifest['created_at'])).total_seconds()
+        summary = self.summarize_batch(batch_results, confidence_threshold, processing_time,
+                                       api_requests=job.manifest['request_count'])
+        summary['engine'] = 'batch_api'
+        summary['batch_api'] = job.summary(results)
+        
+        return {
+            'processed_isbns': batch_results,
+            'summary': summary
+        }
+    
+    def collect_classification_batch(self, manifest_path: str, confidence_threshold: float = 0.7,
+                                     transport: Optional[Any] = None, poll_interval: float = 60.0) -> Dict[str, Any]:
+        """
+        Wait for a submitted classification job (e.g. from an earlier process) and ingest it.
+        
+        Args:
+            manifest_path: Manifest of the job
+            confidence_threshold: Minimum confidence score to consider a page as TOC
+            transport: Batch transport (default: the OpenAI Batch API with this filter's client)
+            poll_interval: Seconds between status checks
+            
+        Returns:
+            Dict with results for all ISBNs processed (as filter_batch_directories)
+        """
+        job = BatchJob(manifest_path)
+        runner = BatchRunner(transport or OpenAIBatchTransport(self.client), poll_interval=poll_interval)
+        return self.ingest_classification_batch(job, runner.collect(job), confidence_threshold)
+    
+    def filter_batch_directories_offline(self, screenshots_dir: str = "screenshots",
+                                         confidence_threshold: float = 0.7, transport: Optional[Any] = None,
+                                         batch_dir: str = "batches", poll_interval: float = 60.0) -> Dict[str, Any]:
+        """
+        Filter all ISBN directories through the Batch API: write, submit, poll and ingest.
+        
+        For runs without interactive latency needs (e.g. nightly catalog rebuilds):
+        lower cost per call and no per-minute limits, with results within 24 hours.
+        
+        Args:
+            screenshots_dir: Base screenshots directory containing ISBN subdirectories
+            confidence_threshold: Minimum confidence score to consider a page as TOC
+            transport: Batch transport (default: the OpenAI Batch API with this filter's client;
+                openai_batch.ReplayBatchTransport for offline tests)
+            batch_dir: Directory for request files, manifest and downloaded output
+            poll_interval: Seconds between status checks
+            
+        Returns:
+            Dict with results for all ISBNs processed (as filter_batch_directories)
+        """
+        job = self.write_classification_batch(screenshots_dir, batch_dir)
+        results: Dict[str, Dict[str, Any]] = {}
+        if job.manifest['request_count']:
+            runner = BatchRunner(transport or OpenAIBatchTransport(self.client), poll_interval=poll_interval)
+            results = runner.run(job)
+        else:
+            self.logger.info("All screenshots are cached - nothing to submit")
+        return self.ingest_classification_batch(job, results, confidence_threshold)
+    
+    def summarize_batch(self, batch_results: Dict[str, Dict[str, Any]], confidence_threshold: float,
+                        processing_time: float, api_requests: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Build the summary of a multi-book filtering run.
+        
+        Args:
+            batch_results: Per-book results keyed by book directory name
+            confidence_threshold: Minimum confidence score used for TOC pages
+            processing_time: Wall time of the run in seconds
+            api_requests: Requests sent to the API (default: one per uncached screenshot;
+                runs with several pages per request pass their request count)
+            
+        Returns:
+            Dict with book, screenshot and TOC page totals
+        """
         total_books = len(batch_results)
-        total_screenshots = sum(r.get('total_screenshots', 0) for r in batch_results.values())
+        # Books sharing another book's pages reuse its analysis (see share_book_results)
+        total_screenshots = sum(r.get('total_screenshots', 0) for r in batch_results.values() if not r.get('shared_from'))
+        total_shared = sum(r.get('total_screenshots', 0) for r in batch_results.values() if r.get('shared_from'))
+        cache_hits = sum(r.get('cache', {}).get('hits', 0) for r in batch_results.values() if not r.get('shared_from'))
         total_toc_pages = sum(len(r.get('toc_pages', [])) for r in batch_results.values())
         total_non_toc_pages = sum(len(r.get('non_toc_pages', [])) for r in batch_results.values())
         
-        summary = {
+        self.logger.info(f"Batch filtering complete: {total_toc_pages} TOC pages found from {total_screenshots} screenshots across {total_books} books in {processing_time:.1f}s")
+        
+        return {
             'total_books_processed': total_books,
             'total_screenshots_analyzed': total_screenshots,
+            'total_shared_screenshots': total_shared,
+            'cache_hits': cache_hits,
+            'api_calls': total_screenshots - cache_hits if api_requests is None else api_requests,
+            'cache_hit_rate': round(cache_hits / total_screenshots, 3) if total_screenshots else 0.0,
             'total_toc_pages_found': total_toc_pages,
             'total_non_toc_pages': total_non_toc_pages,
             'confidence_threshold': confidence_threshold,
             'processing_time_seconds': round(processing_time, 2),
-            'parallel_processing': parallel_books,
-            'max_workers': self.max_workers
-        }
-        
-        self.logger.info(f"Batch filtering complete: {total_toc_pages} TOC pages found from {total_screenshots} screenshots across {total_books} books in {processing_time:.1f}s")
-        
-        return {
-            'processed_isbns': batch_results,
-            'summary': summary
+            'max_workers': self.max_workers,
+            'rate_limiter': self.rate_limiter.snapshot(),
+            'concurrency': self.concurrency_controller.snapshot() if self.concurrency_controller else None,
+            'batching': self.batching_summary() if self.pages_per_request > 1 else None,
+            'classification_cache': self.cache.summary() if self.cache else None
         }
     
+    def batching_summary(self) -> Dict[str, Any]:
+        """Return the configured and current pages per request and the multi-page requests made."""
+        with self.batch_lock:
+            return {
+                'pages_per_request': self.pages_per_request,
+                'current_batch_size': self.batch_size,
+                **self.batch_stats,
+                'pages_per_api_request': round(self.batch_stats['pages'] / self.batch_stats['requests'], 2)
+                                         if self.batch_stats['requests'] else 0.0
+            }
+    
     def organize_filtered_results(self, batch_results: Dict[str, Any], 
-                                 organize_files: bool = True) -> None:
+                                 organize_files: bool = True, screenshots_dir: str = "screenshots") -> None:
         """
         Organize filtered results by moving TOC screenshots to separate directories.
         
         Args:
             batch_results: Results from filter_batch_directories
             organize_files: If True, actually move files; if False, just report what would be moved
+            screenshots_dir: Base screenshots directory containing the book directories
         """
         if 'processed_isbns' not in batch_results:
             raise TOCFilterError("Invalid batch results format")
@@ -512,7 +1386,7 @@ class TOCScreenshotFilter:
             if 'error' in results:
                 continue
             
-            isbn_dir = Path("screenshots") / isbn
+            isbn_dir = Path(screenshots_dir) / isbn
             toc_dir = isbn_dir / "toc_pages"
             non_toc_dir = isbn_dir / "non_toc_pages"
             
@@ -527,7 +1401,7 @@ class TOCScreenshotFilter:
                 target = toc_dir / toc_page['filename']
                 
                 if organize_files and source.exists():
-                    source.rename(target)
+                    self._move_screenshot(source, target)
                     self.logger.info(f"Moved TOC page: {toc_page['filename']} -> toc_pages/")
                 else:
                     self.logger.info(f"Would move TOC page: {toc_page['filename']} -> toc_pages/")
@@ -538,11 +1412,18 @@ class TOCScreenshotFilter:
                 target = non_toc_dir / non_toc_page['filename']
                 
                 if organize_files and source.exists():
-                    source.rename(target)
+                    self._move_screenshot(source, target)
                     self.logger.info(f"Moved non-TOC page: {non_toc_page['filename']} -> non_toc_pages/")
                 else:
                     self.logger.info(f"Would move non-TOC page: {non_toc_page['filename']} -> non_toc_pages/")
     
+    def _move_screenshot(self, source: Path, target: Path) -> None:
+        """Move a screenshot (file or blob store link) together with its text-layer sidecar JSON, if one exists."""
+        move_file(source, target)
+        sidecar = source.with_suffix('.json')
+        if sidecar.exists():
+            sidecar.rename(target.with_suffix('.json'))
+    
     def save_analysis_report(self, batch_results: Dict[str, Any], 
                            output_file: str = "reports/toc_analysis_report.json") -> None:
         """
@@ -566,6 +1447,204 @@ class TOCScreenshotFilter:
             self.logger.error(f"Failed to save analysis report: {e}")
 
 
+class TOCFilterStream:
+    """
+    Classifies screenshots while they are still being captured.
+    
+    Pages are submitted to a bounded queue as soon as they are written and
+    consumed by the filter's worker threads. Once every page of a book is
+    classified, the book is summarized and handed to the book callback (for
+    example to organize its files), while capture of later books continues.
+    """
+    
+    def __init__(self, toc_filter: TOCScreenshotFilter, confidence_threshold: float = 0.7,
+                 queue_size: int = 32, book_callback=None):
+        """
+        Initialize the stream.
+        
+        Args:
+            toc_filter: Filter used to analyze pages (its max_workers sets the worker count)
+            confidence_threshold: Minimum confidence score to consider a page as TOC
+            queue_size: Maximum number of pages waiting for analysis; submitting blocks
+                when the queue is full, so capture never runs far ahead of filtering
+            book_callback: Called as book_callback(book_dir, book_results) once a book
+                is fully classified
+        """
+        self.toc_filter = toc_filter
+        self.logger = toc_filter.logger
+        self.confidence_threshold = confidence_threshold
+        self.book_callback = book_callback
+        self.queue = Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.books: Dict[str, Dict[str, Any]] = {}
+        self.book_results: Dict[str, Dict[str, Any]] = {}
+        self.shared_books: Dict[str, List[str]] = {}
+        self.workers: List[threading.Thread] = []
+        self.start_time = None
+    
+    def start(self) -> 'TOCFilterStream':
+        """Start the worker threads."""
+        self.start_time = time.time()
+        for i in range(self.toc_filter.max_workers):
+            worker = threading.Thread(target=self._worker, name=f"toc-filter-{i}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+        return self
+    
+    def _book_state(self, book_dir: str) -> Dict[str, Any]:
+        """Return the tracking state of a book (caller holds the lock)."""
+        return self.books.setdefault(str(book_dir), {'submitted': set(), 'results': [], 'expected': None})
+    
+    def submit_page(self, book_dir: str, image_path: str, page_number: int) -> None:
+        """
+        Queue a captured page for analysis (blocks while the queue is full).
+        
+        Args:
+            book_dir: Directory of the book the page belongs to
+            image_path: Path of the screenshot
+            page_number: Page number within the book
+        """
+        with self.lock:
+            state = self._book_state(book_dir)
+            if page_number in state['submitted']:
+                return
+            state['submitted'].add(page_number)
+        self.queue.put((str(book_dir), str(image_path), page_number))
+    
+    def finish_book(self, book_dir: str, captured_pages: Optional[List[Dict[str, Any]]] = None) -> None:
+        """
+        Declare that no more pages of a book will be submitted.
+        
+        Pages in captured_pages that were not streamed (e.g. captured by an earlier,
+        resumed run) are submitted now if their files still exist.
+        
+        Args:
+            book_dir: Directory of the book
+            captured_pages: Page records (page_number, filename) of the whole book
+        """
+        for page in captured_pages or []:
+            if os.path.exists(page['filename']):
+                self.submit_page(book_dir, page['filename'], page['page_number'])
+        
+        with self.lock:
+            state = self._book_state(book_dir)
+            state['expected'] = len(state['submitted'])
+        self._complete_if_done(str(book_dir))
+    
+    def share_book(self, book_dir: str, source_dir: str) -> None:
+        """
+        Declare a book whose pages are copies of another book's pages.
+        
+        The book is not analyzed: once the source book is classified, its results are
+        mapped to this book (see share_book_results) and passed to the book callback.
+        
+        Args:
+            book_dir: Directory of the book sharing the pages
+            source_dir: Directory of the captured book
+        """
+        with self.lock:
+            self.shared_books.setdefault(str(source_dir), []).append(str(book_dir))
+            source_done = str(source_dir) in self.book_results
+        if source_done:
+            self._complete_shared(str(source_dir))
+    
+    def _complete_shared(self, source_dir: str) -> None:
+        """Hand the results of a classified book to the books sharing its pages."""
+        with self.lock:
+            source_results = self.book_results[source_dir]
+            completed = []
+            for book_dir in self.shared_books.pop(source_dir, []):
+                book_results = share_book_results(source_results, Path(source_dir).name, Path(book_dir).name)
+                self.book_results[book_dir] = book_results
+                completed.append((book_dir, book_results))
+        
+        for book_dir, book_results in completed:
+            self._run_book_callback(book_dir, book_results)
+    
+    def _run_book_callback(self, book_dir: str, book_results: Dict[str, Any]) -> None:
+        """Run the book callback, logging (not raising) its errors."""
+        if self.book_callback:
+            try:
+                self.book_callback(book_dir, book_results)
+            except Exception as e:
+                self.logger.error(f"Book callback failed for {book_dir}: {e}")
+    
+    def _worker(self) -> None:
+        """Analyze queued pages until the stop marker arrives."""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            book_dir, image_path, page_number = item
+            try:
+                result = self.toc_filter.analyze_screenshot(image_path)
+            except Exception as e:
+                self.logger.error(f"Failed to process {image_path}: {e}")
+                result = {
+                    'is_toc': False,
+                    'confidence': 0.0,
+                    'reasoning': f"Processing failed: {str(e)}",
+                    'error': str(e)
+                }
+            result['filename'] = Path(image_path).name
+            result['page_number'] = page_number
+            with self.lock:
+                self.books[book_dir]['results'].append(result)
+            self._complete_if_done(book_dir)
+    
+    def _complete_if_done(self, book_dir: str) -> None:
+        """Summarize a book (and run the book callback) once all its pages are classified."""
+        with self.lock:
+            state = self.books[book_dir]
+            if state['expected'] is None or len(state['results']) < state['expected'] or book_dir in self.book_results:
+                return
+            book_results = self.toc_filter.summarize_book(Path(book_dir).name, state['results'],
+                                                          self.confidence_threshold)
+            self.book_results[book_dir] = book_results
+        
+        self._run_book_callback(book_dir, book_results)
+        self._complete_shared(book_dir)
+    
+    def close(self) -> Dict[str, Any]:
+        """
+        Wait for all queued pages and stop the workers.
+        
+        Books that were never finished are summarized with the pages classified so far.
+        
+        Returns:
+            Dict with results for all books (same format as filter_batch_directories)
+        """
+        for _ in self.workers:
+            self.queue.put(None)
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
+        
+        for book_dir in list(self.books):
+            with self.lock:
+                self.books[book_dir]['expected'] = len(self.books[book_dir]['results'])
+            self._complete_if_done(book_dir)
+        
+        processed = {Path(book_dir).name: results for book_dir, results in self.book_results.items()}
+        processing_time = time.time() - self.start_time if self.start_time else 0.0
+        summary = self.toc_filter.summarize_batch(processed, self.confidence_threshold, processing_time)
+        summary['streaming'] = True
+        
+        return {
+            'processed_isbns': processed,
+            'summary': summary
+        }
+    
+    def __enter__(self):
+        """Context manager entry."""
+        return self.start()
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit."""
+        if self.workers:
+            self.close()
+
+
 def main():
     """Main function to run TOC filtering with parallel processing."""
     print("📚 TOC Screenshot Filter using OpenAI GPT-4o mini (Parallel Processing)")
@@ -585,33 +1664,83 @@ def main():
         print("🚀 Processing Options:")
         print("1. Conservative (sequential books, parallel pages within books)")
         print("2. Aggressive (parallel books + parallel pages - faster but more API usage)")
+        print("3. Async (all pages of all books on one event loop - many requests in flight)")
+        print("4. Batch API (offline - lower cost, results within 24 hours)")
+        
+        mode = input("\nChoose processing mode (1/2/3/4, default=1): ").strip()
+        parallel_books = mode in ("2", "3")
+        use_async = mode == "3"
+        use_batch_api = mode == "4"
+        
+        if use_batch_api:
+            # Requests are queued by OpenAI, so there are no local workers
+            max_workers = 1
+        elif use_async:
+            # Ask about the upper bound of requests in flight (the actual limit adapts to 429s)
+            concurrency = input(f"Max requests in flight, adapted to rate limits (1-256, default=32): ").strip()
+            try:
+                max_workers = max(1, min(256, int(concurrency)))
+            except ValueError:
+                max_workers = 32
+        else:
+            # Ask about the upper bound of parallel requests (the actual limit adapts to 429s)
+            workers = input(f"Max parallel requests, adapted to rate limits (1-16, default=8): ").strip()
+            try:
+                max_workers = max(1, min(16, int(workers)))
+            except ValueError:
+                max_workers = 8
         
-        mode = input("\nChoose processing mode (1/2, default=1): ").strip()
-        parallel_books = mode == "2"
+        max_calls_per_minute = None
+        if not use_batch_api:
+            # No fixed cap by default: the adaptive limit and Retry-After set the request rate
+            rpm = input(f"Requests per minute ceiling of your account (blank = none): ").strip()
+            try:
+                max_calls_per_minute = max(1, int(rpm)) if rpm else None
+            except ValueError:
+                max_calls_per_minute = None
         
-        # Ask about worker count
-        workers = input(f"Number of parallel workers (1-8, default=4): ").strip()
+        # Ask about multi-page requests
+        pages = input(f"Pages classified per request (1-20, default=1): ").strip()
         try:
-            max_workers = max(1, min(8, int(workers)))
+            pages_per_request = max(1, min(20, int(pages)))
         except ValueError:
-            max_workers = 4
+            pages_per_request = 1
         
         print(f"\n🔧 Configuration:")
-        print(f"   • Processing mode: {'Aggressive' if parallel_books else 'Conservative'}")
-        print(f"   • Max workers: {max_workers}")
-        print(f"   • Rate limit: 30 calls/minute")
+        print(f"   • Processing mode: {'Batch API' if use_batch_api else 'Async' if use_async else 'Aggressive' if parallel_books else 'Conservative'}")
+        if not use_batch_api:
+            print(f"   • Max requests in flight: {max_workers} (adapted to 429s and latency)")
+        print(f"   • Pages per request: {pages_per_request}")
+        if max_calls_per_minute:
+            print(f"   • Requests per minute ceiling: {max_calls_per_minute}")
         print()
         
         # Initialize filter
-        filter_tool = TOCScreenshotFilter(max_workers=max_workers)
+        if use_async:
+            # Imported here: async_toc_filter builds on this module
+            from async_toc_filter import AsyncTOCScreenshotFilter
+            filter_tool = AsyncTOCScreenshotFilter(max_concurrency=max_workers, max_calls_per_minute=max_calls_per_minute,
+                                                   pages_per_request=pages_per_request)
+        elif use_batch_api:
+            filter_tool = TOCScreenshotFilter(max_workers=max_workers, pages_per_request=pages_per_request)
+        else:
+            controller = AdaptiveConcurrencyController(initial_concurrency=min(4, max_workers),
+                                                       max_concurrency=max_workers)
+            filter_tool = TOCScreenshotFilter(max_workers=max_workers, max_calls_per_minute=max_calls_per_minute,
+                                              concurrency_controller=controller,
+                                              pages_per_request=pages_per_request)
         
         # Filter all screenshots
         print("🔍 Analyzing all screenshots to identify TOC pages...")
         start_time = time.time()
-        results = filter_tool.filter_batch_directories(
-            confidence_threshold=0.7, 
-            parallel_books=parallel_books
-        )
+        if use_batch_api:
+            print("📤 Submitting to the Batch API and waiting for the results (polling every minute)...")
+            results = filter_tool.filter_batch_directories_offline(confidence_threshold=0.7)
+        else:
+            results = filter_tool.filter_batch_directories(
+                confidence_threshold=0.7, 
+                parallel_books=parallel_books
+            )
         total_time = time.time() - start_time
         
         # Display results
@@ -621,14 +1750,28 @@ def main():
         summary = results['summary']
         print(f"📚 Books processed: {summary['total_books_processed']}")
         print(f"📄 Screenshots analyzed: {summary['total_screenshots_analyzed']}")
+        print(f"🗃️ From classification cache: {summary['cache_hits']} (hit rate {summary['cache_hit_rate']:.0%})")
         print(f"✅ TOC pages found: {summary['total_toc_pages_found']}")
         print(f"❌ Non-TOC pages: {summary['total_non_toc_pages']}")
         print(f"🎯 Confidence threshold: {summary['confidence_threshold']}")
         print(f"⚡ Processing time: {summary['processing_time_seconds']}s")
         print(f"🔧 Workers used: {summary['max_workers']}")
+        batching = summary.get('batching')
+        if batching:
+            print(f"📦 Multi-page requests: {batching['requests']} for {batching['pages']} pages "
+                  f"({batching['pages_per_api_request']} pages/request, {batching['splits']} batches split)")
+        concurrency = summary.get('concurrency')
+        if concurrency:
+            print(f"🎚️ Adaptive concurrency: limit {concurrency['limit']} "
+                  f"(range {concurrency['lowest_limit']}-{concurrency['highest_limit']}), "
+                  f"{concurrency['rate_limited']} rate-limited requests retried")
         
         # Calculate estimated cost (rough estimate)
-        estimated_cost = summary['total_screenshots_analyzed'] * 0.0015  # Rough estimate
+        estimated_cost = summary['api_calls'] * 0.0015  # Rough estimate (cached pages are free)
+        if use_batch_api:
+            estimated_cost *= 0.5  # Batch API requests cost half
+            print(f"📦 Batch API: {summary['batch_api']['requests']} requests, "
+                  f"{summary['batch_api']['failed_requests']} failed ({summary['batch_api']['manifest']})")
         print(f"💰 Estimated cost: ${estimated_cost:.4f}")
         
         # Show details for each book
@@ -7,13 +7,20 @@ This script copies all table of contents screenshots from the
 screenshots/{isbn}/toc_pages/ directories into a new organized
 structure: tocs/toc_{isbn}/
 
+Files are hardlinked (or symlinked) rather than copied where the file
+system allows it, so the export takes no extra disk space.
+
 Usage: python copy_toc_pages.py
 """
 
 import os
-import shutil
 from pathlib import Path
 
+from blob_store import link_file
+
+# Screenshot formats produced by the screenshot tool
+SCREENSHOT_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
 def copy_toc_pages():
     """Copy all TOC pages to organized tocs/ directory structure."""
     
@@ -27,13 +34,14 @@ def copy_toc_pages():
     total_books = 0
     total_files_copied = 0
     books_with_toc = 0
+    placements = {}
     
     print("📚 Copying TOC Screenshots to Organized Structure")
     print("=" * 60)
     print()
     
-    # Find all ISBN directories
-    isbn_dirs = [d for d in screenshots_dir.iterdir() if d.is_dir()]
+    # Find all ISBN directories (hidden ones such as the .blobs store are not books)
+    isbn_dirs = [d for d in screenshots_dir.iterdir() if d.is_dir() and not d.name.startswith('.')]
     isbn_dirs.sort(key=lambda x: x.name)
     
     for isbn_dir in isbn_dirs:
@@ -47,8 +55,8 @@ def copy_toc_pages():
             print(f"⚠️  {isbn_name}: No toc_pages directory")
             continue
         
-        # Find all PNG files in toc_pages
-        toc_files = list(toc_pages_dir.glob("*.png"))
+        # Find all screenshots in toc_pages
+        toc_files = sorted(f for f in toc_pages_dir.iterdir() if f.suffix.lower() in SCREENSHOT_EXTENSIONS)
         
         if not toc_files:
             print(f"📖 {isbn_name}: No TOC pages found")
@@ -69,7 +77,8 @@ def copy_toc_pages():
             target_file = target_dir / toc_file.name
             
             try:
-                shutil.copy2(toc_file, target_file)
+                method = link_file(toc_file, target_file)
+                placements[method] = placements.get(method, 0) + 1
                 files_copied += 1
                 total_files_copied += 1
                 print(f"   ✅ {toc_file.name}")
@@ -86,6 +95,8 @@ def copy_toc_pages():
     print(f"📚 Total books processed: {total_books}")
     print(f"✅ Books with TOC pages: {books_with_toc}")
     print(f"📄 Total files copied: {total_files_copied}")
+    if placements:
+        print(f"🔗 Placed as: {', '.join(f'{count} {method}' for method, count in sorted(placements.items()))}")
     print(f"📁 Output directory: {tocs_dir.absolute()}")
     
     # Show directory structure sample
@@ -216,34 +216,28 @@ class LivebookDebugTool(LivebookScreenshotTool):
             'kapitel', 'chapter', 'section', 'übersicht', 'overview'
         ]
         
-        potential_elements = []
-        
+        # Text-based and class-based search for every pattern
+        queries = []
         for pattern in toc_patterns:
-            # Text-based search
-            text_elements = self.driver.find_elements(
-                By.XPATH, f"//*[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{pattern}')]"
-            )
-            
-            # Class-based search
-            class_elements = self.driver.find_elements(
-                By.XPATH, f"//*[contains(@class, '{pattern}')]"
-            )
-            
-            for elements, search_type in [(text_elements, 'text'), (class_elements, 'class')]:
-                for elem in elements[:3]:  # Limit results
-                    try:
-                        potential_elements.append({
-                            'pattern': pattern,
-                            'search_type': search_type,
-                            'tag': elem.tag_name,
-                            'text': elem.text[:100],
-                            'class': elem.get_attribute('class'),
-                            'size': elem.size,
-                            'displayed': elem.is_displayed(),
-                            'location': elem.location
-                        })
-                    except Exception:
-                        continue
+            queries.append((pattern, 'text', f"//*[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{pattern}')]"))
+            queries.append((pattern, 'class', f"//*[contains(@class, '{pattern}')]"))
+        
+        # Evaluate all queries in a single round-trip
+        report = self._probe_selectors([xpath for _, _, xpath in queries], visible_only=False, limit=3)
+        
+        potential_elements = []
+        for (pattern, search_type, _), entry in zip(queries, report):
+            for match in entry['matches']:
+                potential_elements.append({
+                    'pattern': pattern,
+                    'search_type': search_type,
+                    'tag': match['tag'],
+                    'text': match['text'][:100],
+                    'class': match['class'],
+                    'size': match['size'],
+                    'displayed': match['displayed'],
+                    'location': match['location']
+                })
         
         return potential_elements
     
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Local Livebook Stand-in Server
+==============================
+
+A small HTTP server that emulates the parts of a Livebook viewer that
+LivebookScreenshotTool interacts with, so capture can be tested and
+benchmarked without reaching klettbib.livebook.de.
+
+Features:
+- Any ISBN path serves a book viewer (e.g. http://127.0.0.1:8765/978-3-12-345678-9/)
+- First page, next page and "Inhalt" buttons, plus arrow-key navigation
+- "Inhalt" headings and page-numbered entries on the configured TOC pages
+- Lazy-loaded page images with a configurable server-side delay
+- Configurable render delay on load and on every page turn
+- A DOM text layer on every page (for extract_text_layer)
+
+Usage:
+    python livebook_fixture_server.py --port 8765 --pages 12 --render-delay 0.5
+
+    # Or from code (port 0 picks a free port)
+    with LivebookFixtureServer(pages=12) as server:
+        url = server.book_url("978-3-12-345678-9")
+"""
+
+import re
+import json
+import time
+import argparse
+import threading
+from html import escape
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Any, Dict, Optional, Sequence
+
+
+VIEWER_TEMPLATE = """<!DOCTYPE html>
+<html lang="de">
+<head>
+<meta charset="utf-8">
+<title>Livebook {isbn}</title>
+<style>
+  body {{ margin: 0; font-family: sans-serif; background: #e9e9e9; }}
+  .toolbar {{ display: flex; gap: 8px; padding: 8px; background: #333; }}
+  .toolbar button {{ padding: 6px 14px; }}
+  #viewer {{ display: flex; justify-content: center; padding: 16px; }}
+  .page {{ position: relative; width: 700px; height: 900px; background: #fff; box-shadow: 0 2px 8px #999; }}
+  .page img {{ position: absolute; inset: 0; width: 100%; height: 100%; }}
+  .text-layer {{ position: absolute; inset: 60px; }}
+  .toc-entry {{ display: flex; justify-content: space-between; margin: 6px 0; }}
+</style>
+</head>
+<body>
+<div class="toolbar">
+  <button class="first" aria-label="Go to first page" title="first page">&#9198;</button>
+  <button class="prev" aria-label="Go to previous page">&#9664;</button>
+  <button class="next" aria-label="Go to next page" title="next page">&#9654;</button>
+  <button class="toc-button" title="Inhalt">Inhalt</button>
+  <span id="page-indicator" style="color: #fff"></span>
+</div>
+<div id="viewer"></div>
+<script>
+var BOOK = {config};
+var current = 1;
+var viewer = document.getElementById('viewer');
+var firstButton = document.querySelector('.first');
+var prevButton = document.querySelector('.prev');
+var nextButton = document.querySelector('.next');
+
+function pageText(n) {{
+    var layer = document.createElement('div');
+    layer.className = 'text-layer';
+    if (BOOK.toc_pages.indexOf(n) !== -1) {{
+        var heading = document.createElement('h2');
+        heading.textContent = n === BOOK.toc_pages[0] ? 'Inhalt' : 'Inhalt (Fortsetzung)';
+        layer.appendChild(heading);
+        for (var i = 0; i < BOOK.toc_entries; i++) {{
+            var chapter = (n - BOOK.toc_pages[0]) * BOOK.toc_entries + i + 1;
+            var entry = document.createElement('div');
+            entry.className = 'toc-entry';
+            var title = document.createElement('span');
+            title.textContent = chapter + ' Kapitel ' + chapter;
+            var pageRef = document.createElement('span');
+            pageRef.textContent = String(BOOK.pages + chapter * 6);
+            entry.appendChild(title);
+            entry.appendChild(pageRef);
+            layer.appendChild(entry);
+        }}
+    }} else {{
+        var heading = document.createElement('h3');
+        heading.textContent = 'Seite ' + n;
+        layer.appendChild(heading);
+        for (var j = 0; j < 4; j++) {{
+            var paragraph = document.createElement('p');
+            paragraph.textContent = 'Dies ist der Text von Seite ' + n + ', Absatz ' + (j + 1) +
+                '. Er steht hier, damit die Seite eine Textebene hat.';
+            layer.appendChild(paragraph);
+        }}
+    }}
+    return layer;
+}}
+
+function render(n) {{
+    current = n;
+    viewer.innerHTML = '';
+    firstButton.disabled = n === 1;
+    prevButton.disabled = n === 1;
+    nextButton.disabled = n === BOOK.pages;
+    document.getElementById('page-indicator').textContent = n + ' / ' + BOOK.pages;
+    setTimeout(function () {{
+        if (current !== n) {{ return; }}
+        var page = document.createElement('div');
+        page.className = 'page';
+        page.setAttribute('data-page', n);
+        var image = document.createElement('img');
+        image.loading = 'lazy';
+        image.alt = 'Seite ' + n;
+        page.appendChild(image);
+        page.appendChild(pageText(n));
+        viewer.appendChild(page);
+        image.src = 'pages/' + n + '.svg';
+    }}, n === 1 && !render.started ? BOOK.render_delay_ms : BOOK.page_turn_delay_ms);
+    render.started = true;
+}}
+
+firstButton.addEventListener('click', function () {{ render(1); }});
+prevButton.addEventListener('click', function () {{ if (current > 1) {{ render(current - 1); }} }});
+nextButton.addEventListener('click', function () {{ if (current < BOOK.pages) {{ render(current + 1); }} }});
+document.querySelector('.toc-button').addEventListener('click', function () {{
+    if (BOOK.toc_pages.length) {{ render(BOOK.toc_pages[0]); }}
+}});
+document.addEventListener('keydown', function (event) {{
+    if (event.key === 'ArrowRight' && current < BOOK.pages) {{ render(current + 1); }}
+    if (event.key === 'ArrowLeft' && current > 1) {{ render(current - 1); }}
+}});
+render(1);
+</script>
+</body>
+</html>
+"""
+
+
+PAGE_IMAGE_TEMPLATE = """<svg xmlns="http://www.w3.org/2000/svg" width="700" height="900" viewBox="0 0 700 900">
+<rect width="700" height="900" fill="#fdfdf8"/>
+<rect x="0" y="0" width="700" height="{band}" fill="{color}"/>
+<text x="350" y="860" font-family="sans-serif" font-size="22" text-anchor="middle" fill="#555">{page}</text>
+{lines}
+</svg>
+"""
+
+
+class LivebookFixtureServer:
+    """
+    Serves stand-in Livebook viewers for any ISBN on a local port.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, pages: int = 12,
+                 toc_pages: Sequence[int] = (2, 3), toc_entries: int = 12,
+                 render_delay: float = 0.5, page_turn_delay: float = 0.3, image_delay: float = 0.2):
+        """
+        Configure the server.
+
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            pages: Number of pages in every book
+            toc_pages: Page numbers showing the table of contents
+            toc_entries: Chapter entries listed per TOC page
+            render_delay: Seconds before the first page renders after load
+            page_turn_delay: Seconds before a page renders after a page turn
+            image_delay: Seconds the server waits before sending a page image
+        """
+        self.host = host
+        self.port = port
+        self.pages = pages
+        self.toc_pages = list(toc_pages)
+        self.toc_entries = toc_entries
+        self.render_delay = render_delay
+        self.page_turn_delay = page_turn_delay
+        self.image_delay = image_delay
+        self.requests_served = 0
+        self.httpd: Optional[ThreadingHTTPServer] = None
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Root URL of the running server."""
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def url_template(self) -> str:
+        """Book URL template with {} placeholder for the ISBN (as used by screenshot_book_batch)."""
+        return f"{self.base_url}/{{}}/"
+
+    def book_url(self, isbn: str) -> str:
+        """URL of the viewer for an ISBN."""
+        return self.url_template.format(isbn)
+
+    def viewer_html(self, isbn: str) -> str:
+        """Render the viewer page for an ISBN."""
+        config = {
+            'pages': self.pages,
+            'toc_pages': self.toc_pages,
+            'toc_entries': self.toc_entries,
+            'render_delay_ms': int(self.render_delay * 1000),
+            'page_turn_delay_ms': int(self.page_turn_delay * 1000)
+        }
+        return VIEWER_TEMPLATE.format(isbn=escape(isbn), config=json.dumps(config))
+
+    def page_image(self, page: int) -> str:
+        """Render the SVG image of a page (distinct per page, so frames differ)."""
+        is_toc = page in self.toc_pages
+        lines = []
+        for i in range(self.toc_entries if is_toc else 18):
+            y = 120 + i * (56 if is_toc else 38)
+            width = 420 if is_toc else 560 - (i * 37 + page * 53) % 180
+            lines.append(f'<rect x="70" y="{y}" width="{width}" height="12" fill="#bbb"/>')
+            if is_toc:
+                lines.append(f'<rect x="590" y="{y}" width="40" height="12" fill="#888"/>')
+        return PAGE_IMAGE_TEMPLATE.format(
+            band=40 + (page * 29) % 160,
+            color="#2b6cb0" if is_toc else "#a0aec0",
+            page=page,
+            lines="\n".join(lines)
+        )
+
+    def _handler_class(self):
+        """Build the request handler bound to this server's configuration."""
+        server = self
+
+        class FixtureHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests_served += 1
+                path = self.path.split('?', 1)[0]
+
+                image_match = re.fullmatch(r'/([^/]+)/pages/(\d+)\.svg', path)
+                if image_match:
+                    page = int(image_match.group(2))
+                    if not 1 <= page <= server.pages:
+                        self.send_error(404, "No such page")
+                        return
+                    time.sleep(server.image_delay)
+                    self._send(server.page_image(page), 'image/svg+xml')
+                    return
+
+                book_match = re.fullmatch(r'/([^/]+)/?', path)
+                if book_match and book_match.group(1) != 'favicon.ico':
+                    self._send(server.viewer_html(book_match.group(1)), 'text/html; charset=utf-8')
+                    return
+
+                self.send_error(404, "Not found")
+
+            def _send(self, body: str, content_type: str) -> None:
+                payload = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                self.send_header('Cache-Control', 'no-store')
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass  # Keep benchmark output clean
+
+        return FixtureHandler
+
+    def start(self) -> 'LivebookFixtureServer':
+        """Start serving in a background thread."""
+        self.httpd = ThreadingHTTPServer((self.host, self.port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="livebook-fixture", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the server."""
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def settings(self) -> Dict[str, Any]:
+        """Configuration of the stand-in books (for benchmark reports)."""
+        return {
+            'pages': self.pages,
+            'toc_pages': self.toc_pages,
+            'render_delay': self.render_delay,
+            'page_turn_delay': self.page_turn_delay,
+            'image_delay': self.image_delay
+        }
+
+    def __enter__(self):
+        """Context manager entry."""
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit."""
+        self.stop()
+
+
+def main():
+    """Serve stand-in Livebooks until interrupted."""
+    parser = argparse.ArgumentParser(description="Local Livebook stand-in server for capture tests and benchmarks")
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='Port to bind (default: 8765)')
+    parser.add_argument('--pages', type=int, default=12, help='Pages per book (default: 12)')
+    parser.add_argument('--toc-pages', default='2,3', help='Comma-separated TOC page numbers (default: 2,3)')
+    parser.add_argument('--render-delay', type=float, default=0.5, help='Seconds before the first page renders')
+    parser.add_argument('--page-turn-delay', type=float, default=0.3, help='Seconds before a turned page renders')
+    parser.add_argument('--image-delay', type=float, default=0.2, help='Seconds before page images are sent')
+    args = parser.parse_args()
+
+    server = LivebookFixtureServer(
+        host=args.host,
+        port=args.port,
+        pages=args.pages,
+        toc_pages=[int(p) for p in args.toc_pages.split(',') if p.strip()],
+        render_delay=args.render_delay,
+        page_turn_delay=args.page_turn_delay,
+        image_delay=args.image_delay
+    )
+
+    with server:
+        print(f"📚 Livebook stand-in running at {server.base_url}")
+        print(f"🔗 Example book: {server.book_url('978-3-12-345678-9')}")
+        print(f"🔧 URL template: {server.url_template}")
+        print("Press Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print("\n👋 Server stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,12 +11,24 @@ Author: Senior Python Developer
 Version: 1.0.0
 """
 
+import io
 import os
+import base64
+import json
 import time
+import shutil
+import random
+import hashlib
 import logging
-from typing import Optional, Tuple, Dict, Any
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional, Tuple, Dict, Any, Callable, List
 from datetime import datetime
 from pathlib import Path
+from urllib.parse import urlparse
+from queue import Queue, Empty
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     from selenium import webdriver
@@ -31,19 +43,656 @@ try:
         WebDriverException,
         ElementNotInteractableException
     )
-    from webdriver_manager.chrome import ChromeDriverManager
 except ImportError as e:
     raise ImportError(
         f"Required dependencies not installed: {e}\n"
         "Please install with: pip install selenium webdriver-manager"
     )
 
+from capture_manifest import CaptureManifest
+from blob_store import BlobStore, link_file
+
+try:
+    from webdriver_manager.chrome import ChromeDriverManager
+except ImportError:
+    ChromeDriverManager = None  # Offline workers resolve ChromeDriver from local paths only
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None  # Duplicate page detection falls back to exact frame hashes
+
+try:
+    import psutil
+except ImportError:
+    psutil = None  # Browser memory checks fall back to the page's JS heap size
+
+
+# ChromeDriver resolution is done once per process and shared by all tools
+DEFAULT_CHROMEDRIVER_CACHE_DIR = os.path.join(".cache", "chromedriver")
+_chromedriver_resolutions: Dict[Optional[str], Tuple[str, str, float]] = {}
+_chromedriver_lock = threading.Lock()
+
+
+def resolve_chromedriver_path(explicit_path: Optional[str] = None) -> Tuple[str, str, float]:
+    """
+    Resolve the ChromeDriver binary, memoized for the life of the process.
+    
+    Locations are tried in order:
+    
+    1. ``explicit_path`` or the ``CHROMEDRIVER_PATH`` environment variable
+    2. The pinned local cache (``CHROMEDRIVER_CACHE_DIR``, default .cache/chromedriver/)
+    3. A ``chromedriver`` on the system PATH
+    4. webdriver-manager, whose download is then copied into the pinned cache
+    
+    Steps 1-3 need no network, so isolated workers work once a driver is
+    pinned. Delete the pinned copy after a Chrome upgrade to refresh it.
+    
+    Args:
+        explicit_path (str): Driver path configured on the tool (optional)
+        
+    Returns:
+        Tuple[str, str, float]: Driver path, the source it came from and the
+        seconds the first resolution took
+        
+    Raises:
+        LivebookScreenshotError: If no ChromeDriver could be found
+    """
+    explicit_path = explicit_path or os.getenv('CHROMEDRIVER_PATH')
+    
+    with _chromedriver_lock:
+        if explicit_path in _chromedriver_resolutions:
+            return _chromedriver_resolutions[explicit_path]
+        
+        start = time.time()
+        binary_name = "chromedriver.exe" if os.name == "nt" else "chromedriver"
+        pinned_path = Path(os.getenv('CHROMEDRIVER_CACHE_DIR', DEFAULT_CHROMEDRIVER_CACHE_DIR)) / binary_name
+        path, source = None, None
+        
+        if explicit_path:
+            if not os.path.isfile(explicit_path):
+                raise LivebookScreenshotError(f"Configured ChromeDriver not found: {explicit_path}")
+            path, source = explicit_path, "explicit path"
+        elif pinned_path.is_file():
+            path, source = str(pinned_path), "pinned cache"
+        elif shutil.which("chromedriver"):
+            path, source = shutil.which("chromedriver"), "system PATH"
+        elif ChromeDriverManager is not None:
+            try:
+                path, source = ChromeDriverManager().install(), "webdriver-manager"
+            except Exception as e:
+                raise LivebookScreenshotError(f"webdriver-manager could not install ChromeDriver: {e}")
+            try:
+                pinned_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(path, pinned_path)
+                path = str(pinned_path)
+            except OSError as e:
+                logging.getLogger(__name__).warning(f"Could not pin ChromeDriver in {pinned_path.parent}: {e}")
+        else:
+            raise LivebookScreenshotError(
+                "ChromeDriver not found: set CHROMEDRIVER_PATH, place it in "
+                f"{pinned_path.parent}, add it to PATH or install webdriver-manager"
+            )
+        
+        _chromedriver_resolutions[explicit_path] = (path, source, time.time() - start)
+        return _chromedriver_resolutions[explicit_path]
+
 
 class LivebookScreenshotError(Exception):
     """Custom exception for Livebook screenshot operations."""
     pass
 
 
+class CircuitOpenError(LivebookScreenshotError):
+    """Raised when a host's circuit breaker or failure budget forbids further attempts."""
+    pass
+
+
+class BatchResults(dict):
+    """
+    Per-book batch results with batch-level statistics attached.
+    
+    Behaves exactly like the plain dict previously returned (keyed by book),
+    so existing callers iterating over ``.items()`` or ``.values()`` are
+    unaffected. Aggregates that do not belong to a single book live in
+    ``summary``.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.summary: Dict[str, Any] = {}
+
+
+class PhaseTimer:
+    """
+    Collects timing spans (phase, seconds, context) for one capture.
+    
+    Spans recorded while ``page`` is set are tagged with that page number, so
+    the same spans yield per-page and per-book breakdowns.
+    """
+    
+    def __init__(self):
+        self.spans: List[Dict[str, Any]] = []
+        self.page: Optional[int] = None
+    
+    @contextmanager
+    def span(self, phase: str, **context: Any):
+        """Time the enclosed block as one span of the given phase; context may be updated inside."""
+        start = time.perf_counter()
+        try:
+            yield context
+        finally:
+            record = {'phase': phase, 'seconds': round(time.perf_counter() - start, 4)}
+            if self.page is not None:
+                record['page'] = self.page
+            record.update(context)
+            self.spans.append(record)
+    
+    def page_totals(self, page: int) -> Dict[str, float]:
+        """Seconds per phase spent on one page."""
+        totals: Dict[str, float] = {}
+        for record in self.spans:
+            if record.get('page') == page:
+                totals[record['phase']] = round(totals.get(record['phase'], 0.0) + record['seconds'], 4)
+        return totals
+    
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        """Span count and total seconds per phase."""
+        totals: Dict[str, Dict[str, float]] = {}
+        for record in self.spans:
+            entry = totals.setdefault(record['phase'], {'count': 0, 'total_seconds': 0.0})
+            entry['count'] += 1
+            entry['total_seconds'] = round(entry['total_seconds'] + record['seconds'], 4)
+        return totals
+
+
+# Upper bounds (seconds) of the timing histogram buckets; the last bucket is open-ended
+TIMING_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+
+def timing_histogram(spans: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Aggregate timing spans per phase into statistics and a bucketed histogram.
+    
+    Args:
+        spans (List[Dict[str, Any]]): Spans as recorded by PhaseTimer
+        
+    Returns:
+        Dict[str, Dict[str, Any]]: Per phase: count, total, mean, p50, p90, max (seconds)
+        and bucket counts keyed by upper bound ("<=0.5", ..., ">30.0")
+    """
+    by_phase: Dict[str, List[float]] = {}
+    for record in spans:
+        by_phase.setdefault(record['phase'], []).append(record['seconds'])
+    
+    histogram = {}
+    for phase, durations in by_phase.items():
+        durations.sort()
+        buckets = {f"<={bound}": 0 for bound in TIMING_BUCKETS}
+        buckets[f">{TIMING_BUCKETS[-1]}"] = 0
+        for seconds in durations:
+            bound = next((b for b in TIMING_BUCKETS if seconds <= b), None)
+            buckets[f"<={bound}" if bound is not None else f">{TIMING_BUCKETS[-1]}"] += 1
+        histogram[phase] = {
+            'count': len(durations),
+            'total_seconds': round(sum(durations), 3),
+            'mean_seconds': round(sum(durations) / len(durations), 3),
+            'p50_seconds': round(durations[int(0.5 * (len(durations) - 1))], 3),
+            'p90_seconds': round(durations[int(0.9 * (len(durations) - 1))], 3),
+            'max_seconds': round(durations[-1], 3),
+            'buckets': buckets
+        }
+    return dict(sorted(histogram.items(), key=lambda item: -item[1]['total_seconds']))
+
+
+class NavigationStrategyCache:
+    """
+    Persistent, per-host record of which navigation strategy and selector worked.
+    
+    Entries are keyed by host (optionally "host@viewer-version") and action
+    ("toc", "first_page", "next_page"). The winning strategy is tried first on
+    later books; the full strategy list is still used when it stops working.
+    A single instance is safe to share between pooled workers.
+    """
+    
+    def __init__(self, cache_file: str = ".cache/navigation_strategies.json"):
+        """
+        Initialize the cache.
+        
+        Args:
+            cache_file (str): JSON file the cache is loaded from and saved to
+        """
+        self.cache_file = Path(cache_file)
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+        self.entries: Dict[str, Dict[str, Dict[str, Any]]] = self._load()
+    
+    def _load(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Load cached entries, starting empty if the file is missing or unreadable."""
+        if not self.cache_file.exists():
+            return {}
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable navigation cache {self.cache_file}: {e}")
+            return {}
+    
+    def lookup(self, key: str, action: str) -> Optional[Dict[str, Any]]:
+        """Return the cached strategy entry for a host key and action, if any."""
+        with self.lock:
+            entry = self.entries.get(key, {}).get(action)
+            return dict(entry) if entry else None
+    
+    def record(self, key: str, action: str, strategy: str, selector: Optional[str]) -> None:
+        """Remember the strategy and selector (None for selector-less strategies) that just succeeded, saving if it changed."""
+        with self.lock:
+            actions = self.entries.setdefault(key, {})
+            entry = actions.get(action)
+            if entry and entry['strategy'] == strategy and entry['selector'] == selector:
+                return
+            actions[action] = {
+                'strategy': strategy,
+                'selector': selector,
+                'updated_at': datetime.now().isoformat()
+            }
+            self._save()
+    
+    def _save(self) -> None:
+        """Write the cache atomically (caller holds the lock)."""
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.cache_file.with_name(f"{self.cache_file.name}.tmp")
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=2, ensure_ascii=False)
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            self.logger.warning(f"Failed to save navigation cache: {e}")
+
+
+class RetryPolicy:
+    """
+    Retry policy shared by all captures of a batch (including pooled workers).
+    
+    - Exponential backoff with jitter between attempts
+    - A per-host failure budget: once a host has failed this often, no further
+      attempts are made against it
+    - A per-host circuit breaker: when the error rate over the recent attempts
+      crosses the threshold, the circuit opens and further attempts either pause
+      until the cooldown has passed ("pause") or are refused for the rest of the
+      batch ("abort"). After a pause the host is half-open: the next recorded
+      outcome closes or reopens the circuit.
+    """
+    
+    def __init__(self, max_attempts: int = 3, base_delay: float = 2.0, max_delay: float = 60.0,
+                 jitter: float = 0.5, host_failure_budget: Optional[int] = 20,
+                 error_rate_threshold: float = 0.5, min_requests: int = 5, window: int = 20,
+                 breaker_cooldown: float = 60.0, on_open: str = "pause"):
+        """
+        Configure the policy.
+        
+        Args:
+            max_attempts (int): Attempts per book/URL, including the first
+            base_delay (float): Backoff before the first retry in seconds (doubles per retry)
+            max_delay (float): Upper bound for a single backoff in seconds
+            jitter (float): Fraction (0-1) of each backoff that is randomized
+            host_failure_budget (int): Failures allowed per host per batch (None: unlimited)
+            error_rate_threshold (float): Error rate over the recent window that opens the circuit
+            min_requests (int): Attempts needed in the window before the error rate is judged
+            window (int): Number of recent attempts per host the error rate is computed over
+            breaker_cooldown (float): Seconds an open circuit pauses a host ("pause" mode)
+            on_open (str): "pause" to wait out the cooldown, "abort" to skip the host's
+                remaining work for the batch
+        """
+        if on_open not in ("pause", "abort"):
+            raise LivebookScreenshotError(f"Invalid on_open: {on_open} (expected 'pause' or 'abort')")
+        
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.host_failure_budget = host_failure_budget
+        self.error_rate_threshold = error_rate_threshold
+        self.min_requests = min_requests
+        self.window = window
+        self.breaker_cooldown = breaker_cooldown
+        self.on_open = on_open
+        self.logger = logging.getLogger(__name__)
+        self.lock = threading.Lock()
+        self.hosts: Dict[str, Dict[str, Any]] = {}
+    
+    def reset(self) -> None:
+        """Forget all host statistics (called at the start of each batch)."""
+        with self.lock:
+            self.hosts = {}
+    
+    def _host(self, url: str) -> Dict[str, Any]:
+        """Return the state of a URL's host (caller holds the lock)."""
+        host = urlparse(url).netloc or url
+        return self.hosts.setdefault(host, {
+            'outcomes': deque(maxlen=self.window),
+            'attempts': 0,
+            'failures': 0,
+            'open_until': None,
+            'half_open': False,
+            'trips': 0,
+            'paused_seconds': 0.0
+        })
+    
+    def backoff_delay(self, attempt: int) -> float:
+        """Seconds to wait before retry number attempt + 1 (attempt counts from 0)."""
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay * (1 - self.jitter) + random.uniform(0, delay * self.jitter)
+    
+    def before_attempt(self, url: str) -> None:
+        """
+        Gate an attempt against the URL's host, pausing while its circuit is open.
+        
+        Raises:
+            CircuitOpenError: If the host's failure budget is spent, or its circuit is
+                open in "abort" mode
+        """
+        with self.lock:
+            state = self._host(url)
+            if self.host_failure_budget is not None and state['failures'] >= self.host_failure_budget:
+                raise CircuitOpenError(f"Failure budget of {self.host_failure_budget} exhausted for "
+                                       f"{urlparse(url).netloc or url}")
+            if state['open_until'] is None:
+                return
+            if self.on_open == "abort":
+                raise CircuitOpenError(f"Circuit open for {urlparse(url).netloc or url} "
+                                       f"(error rate above {self.error_rate_threshold:.0%})")
+            wait = state['open_until'] - time.time()
+        
+        if wait > 0:
+            self.logger.warning(f"⏸️ Circuit open for {urlparse(url).netloc or url}, pausing {wait:.0f}s")
+            time.sleep(wait)
+        
+        with self.lock:
+            state = self._host(url)
+            if state['open_until'] is not None and time.time() >= state['open_until']:
+                state['paused_seconds'] += max(0.0, wait)
+                state['open_until'] = None
+                state['half_open'] = True
+    
+    def record_success(self, url: str) -> None:
+        """Record a successful attempt (closes a half-open circuit)."""
+        with self.lock:
+            state = self._host(url)
+            state['attempts'] += 1
+            state['outcomes'].append(True)
+            if state['half_open']:
+                state['half_open'] = False
+                state['outcomes'].clear()
+    
+    def record_failure(self, url: str) -> None:
+        """Record a failed attempt, opening the circuit if the host's error rate is too high."""
+        with self.lock:
+            state = self._host(url)
+            state['attempts'] += 1
+            state['failures'] += 1
+            state['outcomes'].append(False)
+            
+            outcomes = state['outcomes']
+            error_rate = outcomes.count(False) / len(outcomes)
+            trip = state['half_open'] or (len(outcomes) >= self.min_requests and error_rate >= self.error_rate_threshold)
+            if trip and state['open_until'] is None:
+                state['open_until'] = time.time() + self.breaker_cooldown
+                state['half_open'] = False
+                state['trips'] += 1
+                outcomes.clear()
+                self.logger.warning(f"🔌 Circuit opened for {urlparse(url).netloc or url} "
+                                    f"(error rate {error_rate:.0%}, {state['failures']} failures so far)")
+    
+    def should_retry(self, url: str, attempt: int, max_attempts: Optional[int] = None) -> bool:
+        """
+        Decide whether a failed attempt (counting from 0) gets another try.
+        
+        Args:
+            url (str): URL that failed
+            attempt (int): Index of the attempt that just failed
+            max_attempts (int): Overrides the policy's max_attempts
+        """
+        if attempt + 1 >= (max_attempts or self.max_attempts):
+            return False
+        with self.lock:
+            state = self._host(url)
+            if self.host_failure_budget is not None and state['failures'] >= self.host_failure_budget:
+                return False
+            return not (state['open_until'] is not None and self.on_open == "abort")
+    
+    def wait_before_retry(self, url: str, attempt: int) -> float:
+        """Sleep for the backoff of the given attempt and return the seconds slept."""
+        delay = self.backoff_delay(attempt)
+        self.logger.info(f"Retrying {url} in {delay:.1f}s (attempt {attempt + 2})")
+        time.sleep(delay)
+        return delay
+    
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Per-host attempts, failures, circuit state and remaining failure budget."""
+        with self.lock:
+            report = {}
+            for host, state in self.hosts.items():
+                if state['open_until'] is not None:
+                    circuit = 'open'
+                elif state['half_open']:
+                    circuit = 'half_open'
+                else:
+                    circuit = 'closed'
+                report[host] = {
+                    'attempts': state['attempts'],
+                    'failures': state['failures'],
+                    'circuit': circuit,
+                    'trips': state['trips'],
+                    'paused_seconds': round(state['paused_seconds'], 1),
+                    'budget_remaining': (max(0, self.host_failure_budget - state['failures'])
+                                         if self.host_failure_budget is not None else None)
+                }
+            return report
+
+
+def frame_fingerprint(image_bytes: bytes, hash_size: int = 64) -> str:
+    """
+    Fingerprint a captured frame for duplicate page detection.
+    
+    Uses a difference hash (dHash) over a downscaled, contrast-normalized
+    grayscale copy so that re-renders of the same page match even if a few
+    pixels differ. The grid is deliberately finer than the usual 8x8: text
+    pages look alike when shrunk that far. Without Pillow an exact SHA-1 of
+    the bytes is returned instead.
+    
+    Args:
+        image_bytes (bytes): Encoded screenshot
+        hash_size (int): Hash grid size; the hash has hash_size**2 bits
+        
+    Returns:
+        str: "dhash:<hex>" or "sha1:<hex>"
+    """
+    if Image is None:
+        return f"sha1:{hashlib.sha1(image_bytes).hexdigest()}"
+    
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        gray = ImageOps.autocontrast(img.convert('L'))
+        pixels = gray.resize((hash_size + 1, hash_size), Image.Resampling.BOX).tobytes()
+    
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    
+    return f"dhash:{bits:0{hash_size * hash_size // 4}x}"
+
+
+def fingerprints_match(first: str, second: str, max_distance: int = 0) -> bool:
+    """
+    Compare two frame fingerprints.
+    
+    Difference hashes match within ``max_distance`` differing bits; exact
+    hashes (or mixed kinds) only match when identical.
+    """
+    if first.startswith('dhash:') and second.startswith('dhash:'):
+        distance = bin(int(first[6:], 16) ^ int(second[6:], 16)).count('1')
+        return distance <= max_distance
+    return first == second
+
+
+# Resolves once the page has been quiet (no DOM mutations, no pending images)
+# for arguments[0] ms, or after arguments[1] ms at the latest. Attribute
+# changes only count if arguments[2] is true: animated viewers toggle classes
+# and inline styles continuously and would otherwise never look quiet.
+_SETTLE_SCRIPT = """
+var quietMs = arguments[0], timeoutMs = arguments[1], observeAttributes = arguments[2];
+var done = arguments[arguments.length - 1];
+var start = performance.now(), lastChange = start;
+var observer = new MutationObserver(function () { lastChange = performance.now(); });
+observer.observe(document.documentElement || document,
+                 {childList: true, subtree: true, characterData: true, attributes: observeAttributes});
+function pendingImages() {
+    var pending = 0;
+    for (var i = 0; i < document.images.length; i++) {
+        if (!document.images[i].complete) { pending++; }
+    }
+    return pending;
+}
+(function check() {
+    var now = performance.now(), pending = pendingImages();
+    if (pending > 0) { lastChange = now; }
+    if (now - lastChange >= quietMs || now - start >= timeoutMs) {
+        observer.disconnect();
+        done({settled: now - lastChange >= quietMs, elapsed_ms: now - start, pending_images: pending});
+        return;
+    }
+    setTimeout(check, 50);
+})();
+"""
+
+
+# Evaluates a list of XPath selectors in one round-trip. arguments[1] holds
+# minHeight, visibleOnly, firstMatch (stop at the first selector with a
+# qualifying element) and limit (elements reported per selector).
+_SELECTOR_PROBE_SCRIPT = """
+var selectors = arguments[0], options = arguments[1];
+function isVisible(el, rect) {
+    if (rect.width === 0 && rect.height === 0) { return false; }
+    var style = window.getComputedStyle(el);
+    return style.display !== 'none' && style.visibility !== 'hidden' && parseFloat(style.opacity) !== 0;
+}
+var report = [];
+for (var i = 0; i < selectors.length; i++) {
+    var entry = {selector: selectors[i], count: 0, matches: [], error: null};
+    try {
+        var snapshot = document.evaluate(selectors[i], document, null,
+                                         XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        entry.count = snapshot.snapshotLength;
+        for (var j = 0; j < snapshot.snapshotLength && entry.matches.length < options.limit; j++) {
+            var el = snapshot.snapshotItem(j);
+            if (el.nodeType !== 1) { continue; }
+            var rect = el.getBoundingClientRect();
+            var displayed = isVisible(el, rect);
+            if (options.visibleOnly && (!displayed || rect.height <= options.minHeight)) { continue; }
+            entry.matches.push({
+                element: el,
+                tag: el.tagName.toLowerCase(),
+                text: (el.innerText || '').slice(0, 200),
+                'class': el.getAttribute('class'),
+                size: {width: rect.width, height: rect.height},
+                location: {x: rect.left + window.scrollX, y: rect.top + window.scrollY},
+                displayed: displayed
+            });
+        }
+    } catch (e) {
+        entry.error = String(e);
+    }
+    report.push(entry);
+    if (options.firstMatch && entry.matches.length > 0) { break; }
+}
+return report;
+"""
+
+
+# Returns the page-coordinate rectangle of the largest visible element matching
+# any CSS selector in arguments[0] that covers at least arguments[1] of the viewport.
+_VIEWER_CLIP_SCRIPT = """
+var selectors = arguments[0], minCoverage = arguments[1];
+var viewportArea = window.innerWidth * window.innerHeight, best = null, bestArea = 0;
+for (var i = 0; i < selectors.length; i++) {
+    var elements = document.querySelectorAll(selectors[i]);
+    for (var j = 0; j < elements.length; j++) {
+        var rect = elements[j].getBoundingClientRect();
+        var left = Math.max(rect.left, 0), top = Math.max(rect.top, 0);
+        var right = Math.min(rect.right, window.innerWidth), bottom = Math.min(rect.bottom, window.innerHeight);
+        var area = Math.max(0, right - left) * Math.max(0, bottom - top);
+        var style = window.getComputedStyle(elements[j]);
+        if (style.visibility === 'hidden' || style.display === 'none') { continue; }
+        if (area > bestArea) {
+            bestArea = area;
+            best = {x: left + window.scrollX, y: top + window.scrollY, width: right - left, height: bottom - top};
+        }
+    }
+}
+return best && bestArea >= viewportArea * minCoverage ? best : null;
+"""
+
+
+# Collects the visible text nodes of the page with their bounding boxes, relative
+# to the captured image: arguments[0] is the capture clip in page coordinates
+# (or null for the whole viewport). Each text node yields one block whose box
+# spans its visible line rects.
+_TEXT_LAYER_SCRIPT = """
+var clip = arguments[0];
+var originX = clip ? clip.x - window.scrollX : 0, originY = clip ? clip.y - window.scrollY : 0;
+var width = clip ? clip.width : window.innerWidth, height = clip ? clip.height : window.innerHeight;
+var blocks = [], parts = [];
+var walker = document.createTreeWalker(document.body || document.documentElement, NodeFilter.SHOW_TEXT, {
+    acceptNode: function (node) {
+        if (!node.nodeValue || !node.nodeValue.trim()) { return NodeFilter.FILTER_REJECT; }
+        var parent = node.parentElement;
+        if (!parent || /^(SCRIPT|STYLE|NOSCRIPT|TEMPLATE)$/.test(parent.tagName)) { return NodeFilter.FILTER_REJECT; }
+        var style = window.getComputedStyle(parent);
+        if (style.display === 'none' || style.visibility === 'hidden' || parseFloat(style.opacity) === 0) {
+            return NodeFilter.FILTER_REJECT;
+        }
+        return NodeFilter.FILTER_ACCEPT;
+    }
+});
+var range = document.createRange();
+while (walker.nextNode()) {
+    var node = walker.currentNode;
+    range.selectNodeContents(node);
+    var rects = range.getClientRects(), box = null;
+    for (var i = 0; i < rects.length; i++) {
+        var r = rects[i];
+        var left = r.left - originX, top = r.top - originY, right = left + r.width, bottom = top + r.height;
+        if (r.width === 0 || r.height === 0 || right <= 0 || bottom <= 0 || left >= width || top >= height) {
+            continue;
+        }
+        if (box) {
+            box.right = Math.max(box.right, right);
+            box.bottom = Math.max(box.bottom, bottom);
+            box.left = Math.min(box.left, left);
+            box.top = Math.min(box.top, top);
+        } else {
+            box = {left: left, top: top, right: right, bottom: bottom};
+        }
+    }
+    if (box) {
+        var text = node.nodeValue.replace(/\\s+/g, ' ').trim();
+        blocks.push({text: text, x: box.left, y: box.top, width: box.right - box.left, height: box.bottom - box.top});
+        parts.push(text);
+    }
+}
+range.detach();
+return {
+    text: parts.join('\\n'),
+    blocks: blocks,
+    width: width,
+    height: height,
+    device_pixel_ratio: window.devicePixelRatio || 1
+};
+"""
+
+
 class LivebookScreenshotTool:
     """
     A comprehensive tool for capturing table of contents screenshots from Livebook platforms.
@@ -57,16 +706,106 @@ class LivebookScreenshotTool:
     - Logging support
     """
     
-    def __init__(self, headless: bool = True, window_size: Tuple[int, int] = (1920, 1080)):
+    # File extensions for the supported capture formats
+    CAPTURE_EXTENSIONS = {'png': '.png', 'jpeg': '.jpg', 'webp': '.webp'}
+    
+    # Fixed delays replaced by settle detection, kept only to report the time saved
+    LEGACY_CAPTURE_DELAY = 2.0
+    LEGACY_PAGE_TURN_DELAY = 3.0
+    LEGACY_PAGE_LOAD_DELAY = 3.0
+    LEGACY_NAVIGATION_DELAY = 2.0
+    
+    def __init__(self, headless: bool = True, window_size: Tuple[int, int] = (1920, 1080),
+                 settle_timeout: float = 3.0, settle_quiet_window: float = 0.5,
+                 settle_observe_attributes: bool = False,
+                 duplicate_action: str = "stop", duplicate_window: int = 3, duplicate_max_distance: int = 2,
+                 navigation_cache_file: Optional[str] = ".cache/navigation_strategies.json",
+                 cache_by_viewer_version: bool = False,
+                 recycle_after_pages: Optional[int] = 300, max_browser_memory_mb: Optional[float] = 2048,
+                 driver_path: Optional[str] = None,
+                 capture_format: str = "png", capture_quality: int = 80, clip_to_viewer: bool = False,
+                 extract_text_layer: bool = False, retry_policy: Optional[RetryPolicy] = None,
+                 blob_store: bool = True):
         """
         Initialize the LivebookScreenshotTool.
         
         Args:
             headless (bool): Whether to run browser in headless mode
             window_size (Tuple[int, int]): Browser window size (width, height)
+            settle_timeout (float): Hard cap in seconds for waiting on a page to settle
+                (default: 3.0, the longest of the fixed sleeps settle detection replaced)
+            settle_quiet_window (float): Seconds without DOM changes or pending images
+                after which a page counts as settled
+            settle_observe_attributes (bool): Also count attribute changes as DOM changes
+                (off by default: animated viewers change attributes continuously)
+            duplicate_action (str): What to do when a captured page repeats a recent one:
+                "stop" ends the capture (end of book), "mark" keeps it flagged as duplicate
+            duplicate_window (int): Number of recent pages a new frame is compared against
+            duplicate_max_distance (int): Maximum differing hash bits for two frames to match
+            navigation_cache_file (str): File remembering the winning navigation strategy
+                per host (None disables the cache)
+            cache_by_viewer_version (bool): Key the navigation cache by viewer version as well as host
+            recycle_after_pages (int): Relaunch the browser after this many captured pages (None: never)
+            max_browser_memory_mb (float): Relaunch the browser before a book once its memory
+                use exceeds this many MB (None: never)
+            driver_path (str): Explicit ChromeDriver executable (default: CHROMEDRIVER_PATH,
+                the pinned cache, the system PATH, then webdriver-manager)
+            capture_format (str): "png" (lossless), or "jpeg"/"webp" captured through the
+                DevTools Page.captureScreenshot API
+            capture_quality (int): Quality (0-100) for jpeg/webp captures
+            clip_to_viewer (bool): Clip page captures to the detected book page/viewer canvas
+            extract_text_layer (bool): Also save each page's visible DOM text with bounding
+                boxes to a sidecar JSON file next to the screenshot
+            retry_policy (RetryPolicy): Backoff, per-host failure budget and circuit breaker
+                shared by all captures of a batch (default: RetryPolicy())
+            blob_store (bool): Store the page images of book batches once in the
+                content-addressed .blobs directory of the batch's output root and link
+                them into the book directories, so identical pages are kept once
+                (False: write plain files); standalone captures write plain files
         """
+        if duplicate_action not in ("stop", "mark"):
+            raise LivebookScreenshotError(f"Invalid duplicate_action: {duplicate_action} (expected 'stop' or 'mark')")
+        if capture_format not in self.CAPTURE_EXTENSIONS:
+            raise LivebookScreenshotError(f"Invalid capture_format: {capture_format} "
+                                          f"(expected one of {', '.join(self.CAPTURE_EXTENSIONS)})")
+        
         self.headless = headless
         self.window_size = window_size
+        self.settle_timeout = settle_timeout
+        self.settle_quiet_window = settle_quiet_window
+        self.settle_observe_attributes = settle_observe_attributes
+        self.duplicate_action = duplicate_action
+        self.duplicate_window = duplicate_window
+        self.duplicate_max_distance = duplicate_max_distance
+        self.navigation_cache = NavigationStrategyCache(navigation_cache_file) if navigation_cache_file else None
+        self.cache_by_viewer_version = cache_by_viewer_version
+        self.navigation_stats = {'hits': 0, 'misses': 0}
+        self._viewer_versions: Dict[str, Optional[str]] = {}
+        self._last_nav_selector: Optional[str] = None
+        self.recycle_after_pages = recycle_after_pages
+        self.max_browser_memory_mb = max_browser_memory_mb
+        self.pages_since_launch = 0
+        self.browser_launches = 0
+        self.driver_path = driver_path
+        self.capture_format = capture_format
+        self.capture_quality = capture_quality
+        self.clip_to_viewer = clip_to_viewer
+        self.extract_text_layer = extract_text_layer
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.use_blob_store = blob_store
+        self.blob_stores: Dict[str, BlobStore] = {}
+        self.blob_store_lock = threading.Lock()
+        self.timer = PhaseTimer()
+        
+        # CSS selectors for the element showing the book page, used for clipped captures
+        self.viewer_selectors = [
+            "canvas",
+            "[class*='page'] img",
+            "[class*='page']",
+            "[class*='viewer']",
+            "#viewer",
+            "img"
+        ]
         self.driver = None
         self.wait = None
         
@@ -132,19 +871,112 @@ class LivebookScreenshotTool:
             # chrome_options.add_argument("--disable-javascript")  # Keep JS enabled for Livebook
             chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
             
-            # Install and setup ChromeDriver automatically
-            service = Service(ChromeDriverManager().install())
+            # Resolve ChromeDriver (once per process) and launch the browser
+            resolve_start = time.time()
+            with self.timer.span('driver_resolve') as span:
+                driver_path, source, first_resolution_seconds = resolve_chromedriver_path(self.driver_path)
+                span['source'] = source
+            resolve_seconds = time.time() - resolve_start
+            service = Service(driver_path)
             
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            launch_start = time.time()
+            with self.timer.span('driver_launch'):
+                self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            launch_seconds = time.time() - launch_start
+            self.pages_since_launch = 0
+            self.browser_launches += 1
             self.wait = WebDriverWait(self.driver, 30)
+            # Settle detection runs as an async script bounded by its own timeout
+            self.driver.set_script_timeout(self.settle_timeout + 5)
             
-            self.logger.info("Chrome WebDriver setup successful")
+            self.logger.info(f"Chrome WebDriver setup successful - driver from {source} ({driver_path}, "
+                             f"resolved in {resolve_seconds:.2f}s, first resolution {first_resolution_seconds:.2f}s), "
+                             f"browser launched in {launch_seconds:.2f}s")
             
         except Exception as e:
             error_msg = f"Failed to setup Chrome WebDriver: {str(e)}"
             self.logger.error(error_msg)
             raise LivebookScreenshotError(error_msg)
     
+    def _prepare_session(self) -> bool:
+        """
+        Get a clean browser session for the next book.
+        
+        The running browser is reused by opening a fresh tab and closing the old
+        ones, so Chrome starts once per batch. It is recycled instead when it has
+        captured ``recycle_after_pages`` pages or uses more than
+        ``max_browser_memory_mb``, which keeps memory bounded on long batches.
+        
+        Returns:
+            bool: True if a new browser was launched
+        """
+        if self.driver and self._should_recycle():
+            self.close()
+        
+        if not self.driver:
+            self._setup_driver()
+            return True
+        
+        return self._open_fresh_tab()
+    
+    def _should_recycle(self) -> bool:
+        """Check the session lifecycle policy against the running browser."""
+        if self.recycle_after_pages and self.pages_since_launch >= self.recycle_after_pages:
+            self.logger.info(f"Recycling browser after {self.pages_since_launch} pages")
+            return True
+        
+        if self.max_browser_memory_mb:
+            memory_mb = self._browser_memory_mb()
+            if memory_mb is not None and memory_mb >= self.max_browser_memory_mb:
+                self.logger.info(f"Recycling browser using {memory_mb:.0f} MB "
+                                 f"(limit {self.max_browser_memory_mb:.0f} MB)")
+                return True
+        
+        return False
+    
+    def _browser_memory_mb(self) -> Optional[float]:
+        """
+        Measure the browser's memory use in MB.
+        
+        With psutil this is the RSS of the ChromeDriver process tree (all Chrome
+        processes); otherwise the JS heap of the current page is used as a proxy.
+        """
+        try:
+            if psutil is not None:
+                root = psutil.Process(self.driver.service.process.pid)
+                processes = [root] + root.children(recursive=True)
+                return sum(process.memory_info().rss for process in processes) / (1024 * 1024)
+            
+            heap = self.driver.execute_script(
+                "return performance.memory ? performance.memory.totalJSHeapSize : null;"
+            )
+            return heap / (1024 * 1024) if heap else None
+        except Exception as e:
+            self.logger.debug(f"Could not measure browser memory: {e}")
+            return None
+    
+    def _open_fresh_tab(self) -> bool:
+        """
+        Replace all open tabs with a single new one, relaunching the browser if it is unusable.
+        
+        Returns:
+            bool: True if the browser had to be relaunched
+        """
+        try:
+            old_handles = self.driver.window_handles
+            self.driver.switch_to.new_window('tab')
+            fresh_handle = self.driver.current_window_handle
+            for handle in old_handles:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+            self.driver.switch_to.window(fresh_handle)
+            return False
+        except WebDriverException as e:
+            self.logger.warning(f"Browser session unusable ({e}), relaunching")
+            self.close()
+            self._setup_driver()
+            return True
+    
     def _find_toc_element(self) -> Optional[Any]:
         """
         Find the table of contents element using multiple selectors and navigation.
@@ -160,7 +992,7 @@ class LivebookScreenshotTool:
         # If not found, try to navigate to TOC page
         self.logger.info("TOC not found on current page, attempting navigation...")
         if self._navigate_to_toc_page():
-            time.sleep(3)  # Wait for page to load after navigation
+            self._wait_for_settle(legacy_delay=self.LEGACY_PAGE_TURN_DELAY)
             toc_element = self._find_toc_on_current_page()
             if toc_element:
                 self.logger.info("Found TOC after navigation")
@@ -171,45 +1003,191 @@ class LivebookScreenshotTool:
     
     def _find_toc_on_current_page(self) -> Optional[Any]:
         """Find TOC element on the current page."""
-        for selector in self.toc_selectors:
-            try:
-                self.logger.debug(f"Trying selector: {selector}")
-                elements = self.driver.find_elements(By.XPATH, selector)
-                
-                if elements:
-                    # Filter elements by size and visibility
-                    for element in elements:
-                        if element.is_displayed() and element.size['height'] > 50:
-                            self.logger.info(f"Found TOC element with selector: {selector}")
-                            return element
-                            
-            except Exception as e:
-                self.logger.debug(f"Selector {selector} failed: {str(e)}")
-                continue
+        selector, element = self._find_first_visible(self.toc_selectors, min_height=50)
+        if element is not None:
+            self.logger.info(f"Found TOC element with selector: {selector}")
+        return element
+    
+    def _probe_selectors(self, selectors: List[str], min_height: float = 0, visible_only: bool = True,
+                         first_match: bool = False, limit: int = 1) -> List[Dict[str, Any]]:
+        """
+        Evaluate XPath selectors inside the page with a single WebDriver round-trip.
         
-        return None
+        Visibility and size filtering happen in the browser, so there are no
+        per-element is_displayed()/size calls.
+        
+        Args:
+            selectors (List[str]): XPath selectors, evaluated in order
+            min_height (float): Minimum element height when filtering for visible elements
+            visible_only (bool): Only report displayed elements taller than min_height
+            first_match (bool): Stop after the first selector with a reported element
+            limit (int): Maximum number of elements reported per selector
+            
+        Returns:
+            List[Dict[str, Any]]: Per selector: selector, count (raw matches), matches
+            (element handle plus tag, text, class, size, location, displayed) and error
+        """
+        options = {
+            'minHeight': min_height,
+            'visibleOnly': visible_only,
+            'firstMatch': first_match,
+            'limit': limit
+        }
+        report = self.driver.execute_script(_SELECTOR_PROBE_SCRIPT, selectors, options) or []
+        for entry in report:
+            if entry.get('error'):
+                self.logger.debug(f"Selector {entry['selector']} failed: {entry['error']}")
+        return report
+    
+    def _find_first_visible(self, selectors: List[str], min_height: float = 0) -> Tuple[Optional[str], Optional[Any]]:
+        """
+        Find the first selector matching a visible element taller than min_height.
+        
+        Args:
+            selectors (List[str]): XPath selectors in priority order
+            min_height (float): Minimum element height in pixels
+            
+        Returns:
+            Tuple[Optional[str], Optional[Any]]: Winning selector and WebElement, or (None, None)
+        """
+        try:
+            report = self._probe_selectors(selectors, min_height=min_height, first_match=True)
+        except Exception as e:
+            self.logger.debug(f"Selector probe failed: {str(e)}")
+            return None, None
+        
+        for entry in report:
+            if entry['matches']:
+                return entry['selector'], entry['matches'][0]['element']
+        return None, None
     
     def _navigate_to_toc_page(self) -> bool:
         """Attempt to navigate to the TOC page using various methods."""
         navigation_strategies = [
-            self._click_toc_button,
-            self._click_inhalt_button,
-            self._try_keyboard_navigation,
-            self._try_page_navigation
+            ('click_toc_button', self._click_toc_button),
+            ('click_inhalt_button', self._click_inhalt_button),
+            ('keyboard_navigation', self._try_keyboard_navigation),
+            ('page_navigation', self._try_page_navigation)
         ]
         
-        for strategy in navigation_strategies:
+        strategy = self._run_navigation('toc', navigation_strategies)
+        if strategy:
+            self.logger.info(f"Navigation successful with {strategy}")
+            return True
+        return False
+    
+    def _run_navigation(self, action: str, strategies: List[Tuple[str, Callable[[Optional[str]], bool]]]) -> Optional[str]:
+        """
+        Run navigation strategies, trying the cached winner for this host first.
+        
+        Strategies are called with the cached selector when they are the cached
+        strategy (None otherwise) and report the selector they clicked through
+        ``self._last_nav_selector``. On a cache miss the full list is tried in
+        order and the winner is recorded, with selector None for strategies that
+        do not click an element (e.g. keyboard navigation).
+        
+        Args:
+            action (str): Navigation action being cached ("toc", "first_page", "next_page")
+            strategies (List[Tuple[str, callable]]): (name, strategy) pairs in default order
+            
+        Returns:
+            Optional[str]: Name of the successful strategy, or None
+        """
+        cache_key = self._navigation_cache_key() if self.navigation_cache else None
+        cached = self.navigation_cache.lookup(cache_key, action) if cache_key else None
+        
+        ordered = list(strategies)
+        if cached:
+            ordered.sort(key=lambda item: item[0] != cached['strategy'])
+        
+        for name, strategy in ordered:
+            is_cached = bool(cached and cached['strategy'] == name)
+            preferred = cached['selector'] if is_cached else None
+            self._last_nav_selector = None
+            with self.timer.span('navigation', action=action, strategy=name, cached=is_cached) as span:
+                try:
+                    span['success'] = bool(strategy(preferred))
+                except Exception as e:
+                    self.logger.debug(f"Navigation strategy {name} failed: {e}")
+                    span['success'] = False
+            if not span['success']:
+                continue
+            
+            selector = self._last_nav_selector
+            if is_cached and cached['selector'] == selector:
+                self.navigation_stats['hits'] += 1
+            else:
+                self.navigation_stats['misses'] += 1
+            if cache_key:
+                self.navigation_cache.record(cache_key, action, name, selector)
+            return name
+        
+        self.navigation_stats['misses'] += 1
+        return None
+    
+    def _navigation_cache_key(self) -> Optional[str]:
+        """Build the navigation cache key (host, optionally with viewer version) for the current page."""
+        try:
+            host = urlparse(self.driver.current_url).netloc
+        except Exception:
+            return None
+        if not host:
+            return None
+        if not self.cache_by_viewer_version:
+            return host
+        
+        if host not in self._viewer_versions:
+            try:
+                self._viewer_versions[host] = self.driver.execute_script(
+                    "var meta = document.querySelector('meta[name=\"generator\"], meta[name=\"version\"]');"
+                    "return meta ? meta.getAttribute('content') : null;"
+                )
+            except Exception:
+                self._viewer_versions[host] = None
+        version = self._viewer_versions[host]
+        return f"{host}@{version}" if version else host
+    
+    def _click_first_available(self, selectors: List[str], preferred_selector: Optional[str] = None,
+                               require_displayed: bool = True, skip_disabled: bool = False,
+                               description: str = "Clicking") -> bool:
+        """
+        Click the first usable element matched by a list of XPath selectors.
+        
+        Args:
+            selectors (List[str]): XPath selectors in default order
+            preferred_selector (str): Selector to try first (e.g. from the navigation cache)
+            require_displayed (bool): Skip elements that are not displayed
+            skip_disabled (bool): Skip elements marked disabled or aria-disabled
+            description (str): Log message prefix
+            
+        Returns:
+            bool: True if an element was clicked (its selector is stored in _last_nav_selector)
+        """
+        ordered = list(selectors)
+        if preferred_selector in ordered:
+            ordered.remove(preferred_selector)
+            ordered.insert(0, preferred_selector)
+        
+        for selector in ordered:
             try:
-                if strategy():
-                    self.logger.info(f"Navigation successful with {strategy.__name__}")
+                for element in self.driver.find_elements(By.XPATH, selector):
+                    if require_displayed and not element.is_displayed():
+                        continue
+                    if not element.is_enabled():
+                        continue
+                    if skip_disabled and (element.get_attribute('disabled') or
+                                          element.get_attribute('aria-disabled') == 'true'):
+                        continue
+                    self.logger.info(f"{description}: {selector}")
+                    self.driver.execute_script("arguments[0].click();", element)
+                    self._last_nav_selector = selector
                     return True
             except Exception as e:
-                self.logger.debug(f"Navigation strategy {strategy.__name__} failed: {e}")
+                self.logger.debug(f"{description} failed with {selector}: {e}")
                 continue
-        
         return False
     
-    def _click_toc_button(self) -> bool:
+    def _click_toc_button(self, preferred_selector: Optional[str] = None) -> bool:
         """Try to click TOC/Inhaltsverzeichnis buttons."""
         button_selectors = [
             "//button[contains(text(), 'Inhalt')]",
@@ -222,36 +1200,18 @@ class LivebookScreenshotTool:
             "*[title*='Inhaltsverzeichnis']"
         ]
         
-        for selector in button_selectors:
-            try:
-                buttons = self.driver.find_elements(By.XPATH, selector)
-                for button in buttons:
-                    if button.is_enabled():
-                        self.logger.info(f"Clicking TOC button: {selector}")
-                        self.driver.execute_script("arguments[0].click();", button)
-                        return True
-            except Exception:
-                continue
-        return False
+        return self._click_first_available(button_selectors, preferred_selector, require_displayed=False,
+                                           description="Clicking TOC button")
     
-    def _click_inhalt_button(self) -> bool:
+    def _click_inhalt_button(self, preferred_selector: Optional[str] = None) -> bool:
         """Try to click any clickable element containing 'Inhalt'."""
-        try:
-            clickable_elements = self.driver.find_elements(
-                By.XPATH, 
-                "//*[contains(text(), 'Inhalt') and (self::button or self::a or @onclick or @role='button')]"
-            )
-            
-            for element in clickable_elements:
-                if element.is_displayed() and element.is_enabled():
-                    self.logger.info("Clicking Inhalt element")
-                    self.driver.execute_script("arguments[0].click();", element)
-                    return True
-        except Exception:
-            pass
-        return False
+        return self._click_first_available(
+            ["//*[contains(text(), 'Inhalt') and (self::button or self::a or @onclick or @role='button')]"],
+            preferred_selector,
+            description="Clicking Inhalt element"
+        )
     
-    def _try_keyboard_navigation(self) -> bool:
+    def _try_keyboard_navigation(self, preferred_selector: Optional[str] = None) -> bool:
         """Try keyboard shortcuts that might navigate to TOC."""
         try:
             from selenium.webdriver.common.keys import Keys
@@ -263,43 +1223,32 @@ class LivebookScreenshotTool:
             
             # Try 'i' for index/inhalt
             actions.click(body).send_keys('i').perform()
-            time.sleep(1)
+            self._wait_for_settle(legacy_delay=1.0)
             
             # Try 't' for table of contents
             actions.send_keys('t').perform()
-            time.sleep(1)
+            self._wait_for_settle(legacy_delay=1.0)
             
             return True
         except Exception:
             return False
     
-    def _try_page_navigation(self) -> bool:
+    def _try_page_navigation(self, preferred_selector: Optional[str] = None) -> bool:
         """Try navigating through pages to find TOC."""
-        try:
-            # Look for common navigation elements
-            nav_selectors = [
-                "//button[contains(@aria-label, 'first') or contains(@title, 'first')]",
-                "//button[contains(@aria-label, 'beginning') or contains(@title, 'beginning')]",
-                "//a[contains(@href, 'page=1') or contains(@href, 'p=1')]",
-                "//button[contains(text(), '1')]",
-                "//button[@aria-label='Go to first page']"
-            ]
-            
-            for selector in nav_selectors:
-                try:
-                    nav_buttons = self.driver.find_elements(By.XPATH, selector)
-                    for button in nav_buttons:
-                        if button.is_displayed() and button.is_enabled():
-                            self.logger.info(f"Clicking navigation button: {selector}")
-                            self.driver.execute_script("arguments[0].click();", button)
-                            time.sleep(2)
-                            return True
-                except Exception:
-                    continue
-                    
-            return False
-        except Exception:
-            return False
+        # Look for common navigation elements
+        nav_selectors = [
+            "//button[contains(@aria-label, 'first') or contains(@title, 'first')]",
+            "//button[contains(@aria-label, 'beginning') or contains(@title, 'beginning')]",
+            "//a[contains(@href, 'page=1') or contains(@href, 'p=1')]",
+            "//button[contains(text(), '1')]",
+            "//button[@aria-label='Go to first page']"
+        ]
+        
+        if self._click_first_available(nav_selectors, preferred_selector,
+                                       description="Clicking navigation button"):
+            self._wait_for_settle(legacy_delay=self.LEGACY_NAVIGATION_DELAY)
+            return True
+        return False
     
     def _wait_for_page_load(self, timeout: int = 30) -> bool:
         """
@@ -317,23 +1266,82 @@ class LivebookScreenshotTool:
                 lambda driver: driver.execute_script("return document.readyState") == "complete"
             )
             
-            # Additional wait for dynamic content
-            time.sleep(3)
+            # Wait for dynamic content to finish rendering
+            settle = self._wait_for_settle(legacy_delay=self.LEGACY_PAGE_LOAD_DELAY)
             
-            self.logger.info("Page loaded successfully")
+            self.logger.info(f"Page loaded successfully (settled in {settle['waited_seconds']:.2f}s)")
             return True
             
         except TimeoutException:
             self.logger.warning(f"Page load timeout after {timeout} seconds")
             return False
     
-    def _create_output_directory(self, filename: str, custom_dir: str = None) -> str:
+    def _wait_for_settle(self, legacy_delay: float = 0.0) -> Dict[str, Any]:
+        """
+        Wait until the viewer has stopped changing instead of sleeping for a fixed time.
+        
+        A page counts as settled once it had no DOM mutations and no pending image
+        loads for ``settle_quiet_window`` seconds. If the observer script cannot run,
+        two identical consecutive frames are used instead. The wait never exceeds
+        ``settle_timeout``.
+        
+        Args:
+            legacy_delay (float): Fixed sleep this wait replaces, used to report time saved
+            
+        Returns:
+            Dict[str, Any]: Settled flag, detection method, seconds waited and seconds saved
+        """
+        start = time.time()
+        with self.timer.span('settle') as span:
+            try:
+                outcome = self.driver.execute_async_script(
+                    _SETTLE_SCRIPT,
+                    int(self.settle_quiet_window * 1000),
+                    int(self.settle_timeout * 1000),
+                    self.settle_observe_attributes
+                )
+                settled = bool(outcome and outcome.get('settled'))
+                method = 'dom'
+            except Exception as e:
+                self.logger.debug(f"DOM settle detection unavailable, comparing frames instead: {e}")
+                settled = self._wait_for_identical_frames(start)
+                method = 'frames'
+            span.update(method=method, settled=settled)
+        
+        waited = time.time() - start
+        if not settled:
+            self.logger.debug(f"Page did not settle within {self.settle_timeout}s")
+        
+        return {
+            'settled': settled,
+            'method': method,
+            'waited_seconds': round(waited, 3),
+            'saved_seconds': round(max(0.0, legacy_delay - waited), 3)
+        }
+    
+    def _wait_for_identical_frames(self, start: float) -> bool:
+        """Poll screenshots until two consecutive frames are identical or the settle timeout passes."""
+        previous = None
+        while time.time() - start < self.settle_timeout:
+            try:
+                frame = hashlib.sha1(self.driver.get_screenshot_as_png()).digest()
+            except Exception as e:
+                self.logger.debug(f"Frame comparison failed: {e}")
+                return False
+            if frame == previous:
+                return True
+            previous = frame
+            time.sleep(self.settle_quiet_window)
+        return False
+    
+    def _create_output_directory(self, filename: str, custom_dir: str = None, extension: str = '.png') -> str:
         """
         Create output directory if it doesn't exist and return full path.
         
         Args:
             filename (str): Output filename
             custom_dir (str): Custom directory path (optional)
+            extension (str): Image file extension to enforce (default: .png)
             
         Returns:
             str: Full path to output file
@@ -348,12 +1356,108 @@ class LivebookScreenshotTool:
         # Add timestamp if filename doesn't have extension
         if not Path(filename).suffix:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{filename}_{timestamp}.png"
-        elif not filename.endswith('.png'):
-            filename = f"{filename}.png"
+            filename = f"{filename}_{timestamp}{extension}"
+        elif not filename.endswith(extension):
+            filename = f"{filename}{extension}"
         
         return str(output_dir / filename)
     
+    def _capture_frame(self, clip: Optional[Dict[str, float]] = None) -> bytes:
+        """
+        Capture the current viewport as encoded image bytes in the configured format.
+        
+        Lossless PNG of the whole window uses the regular WebDriver screenshot.
+        JPEG/WebP and clipped captures go through the DevTools
+        ``Page.captureScreenshot`` API, which encodes in the browser so no
+        full-size PNG is written or re-encoded later.
+        
+        Args:
+            clip (Dict[str, float]): Page-coordinate region (x, y, width, height); defaults
+                to the detected viewer canvas when clip_to_viewer is enabled
+                
+        Returns:
+            bytes: Encoded image
+        """
+        if clip is None and self.clip_to_viewer:
+            clip = self._find_viewer_clip()
+        
+        if self.capture_format == 'png' and clip is None:
+            return self.driver.get_screenshot_as_png()
+        
+        params: Dict[str, Any] = {'format': self.capture_format}
+        if self.capture_format != 'png':
+            params['quality'] = self.capture_quality
+        if clip:
+            params['clip'] = {
+                'x': clip['x'],
+                'y': clip['y'],
+                'width': clip['width'],
+                'height': clip['height'],
+                'scale': 1
+            }
+        
+        try:
+            result = self.driver.execute_cdp_cmd('Page.captureScreenshot', params)
+            return base64.b64decode(result['data'])
+        except Exception as e:
+            raise LivebookScreenshotError(f"DevTools screenshot capture failed: {str(e)}")
+    
+    def _save_frame(self, full_path: str, clip: Optional[Dict[str, float]] = None) -> bool:
+        """Capture a frame (see _capture_frame) and write it to full_path."""
+        with open(full_path, 'wb') as f:
+            f.write(self._capture_frame(clip))
+        return True
+    
+    def _find_viewer_clip(self) -> Optional[Dict[str, float]]:
+        """Find the on-screen region of the book page/viewer canvas, or None to capture the full window."""
+        try:
+            return self.driver.execute_script(_VIEWER_CLIP_SCRIPT, self.viewer_selectors, 0.1)
+        except Exception as e:
+            self.logger.debug(f"Viewer clip detection failed: {e}")
+            return None
+    
+    def _extract_text_layer(self, clip: Optional[Dict[str, float]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Extract the visible text of the current page with text-node bounding boxes.
+        
+        Args:
+            clip (Dict[str, float]): Page-coordinate region the screenshot was clipped to,
+                so boxes are reported in the same coordinates as the image
+                
+        Returns:
+            Optional[Dict[str, Any]]: Text layer with text, blocks (text, x, y, width, height),
+            width, height and device_pixel_ratio, or None if extraction failed
+        """
+        try:
+            return self.driver.execute_script(_TEXT_LAYER_SCRIPT, clip)
+        except Exception as e:
+            self.logger.debug(f"Text layer extraction failed: {e}")
+            return None
+    
+    def _save_text_layer(self, image_path: str, text_layer: Dict[str, Any], page_number: int) -> str:
+        """
+        Write a page's text layer to a sidecar JSON file next to its screenshot.
+        
+        Args:
+            image_path (str): Path of the screenshot the text layer belongs to
+            text_layer (Dict[str, Any]): Result of _extract_text_layer
+            page_number (int): Page number within the book
+            
+        Returns:
+            str: Path of the sidecar JSON file
+        """
+        sidecar_path = str(Path(image_path).with_suffix('.json'))
+        sidecar = {
+            'image': Path(image_path).name,
+            'page_number': page_number,
+            'url': self.driver.current_url,
+            'extracted_at': datetime.now().isoformat(),
+            **text_layer
+        }
+        with open(sidecar_path, 'w', encoding='utf-8') as f:
+            json.dump(sidecar, f, ensure_ascii=False, indent=2)
+        return sidecar_path
+    
     def screenshot_livebook_toc(self, url: str, filename: str, retry_count: int = 3, full_page: bool = True) -> bool:
         """
         Capture a screenshot from a Livebook URL.
@@ -373,10 +1477,11 @@ class LivebookScreenshotTool:
         if not url or not filename:
             raise LivebookScreenshotError("URL and filename are required")
         
-        full_path = self._create_output_directory(filename)
+        full_path = self._create_output_directory(filename, extension=self.CAPTURE_EXTENSIONS[self.capture_format])
         
         for attempt in range(retry_count):
             try:
+                self.retry_policy.before_attempt(url)
                 self.logger.info(f"Attempt {attempt + 1}/{retry_count}: Capturing screenshot of {url}")
                 
                 # Setup driver if not already done
@@ -394,7 +1499,7 @@ class LivebookScreenshotTool:
                 if full_page:
                     # Simple full page screenshot
                     self.logger.info(f"Capturing full page screenshot to: {full_path}")
-                    success = self.driver.save_screenshot(full_path)
+                    success = self._save_frame(full_path)
                 else:
                     # Try to find specific TOC element
                     toc_element = self._find_toc_element()
@@ -411,58 +1516,64 @@ class LivebookScreenshotTool:
                             "//div[contains(@class, 'content')]"
                         ]
                         
-                        for selector in fallback_selectors:
-                            try:
-                                elements = self.driver.find_elements(By.XPATH, selector)
-                                for element in elements:
-                                    if element.is_displayed() and element.size['height'] > 100:
-                                        toc_element = element
-                                        self.logger.info(f"Found TOC with fallback selector: {selector}")
-                                        break
-                                if toc_element:
-                                    break
-                            except Exception:
-                                continue
+                        selector, toc_element = self._find_first_visible(fallback_selectors, min_height=100)
+                        if toc_element:
+                            self.logger.info(f"Found TOC with fallback selector: {selector}")
                     
                     if not toc_element:
-                        if attempt < retry_count - 1:
-                            self.logger.warning(f"TOC element not found, retrying in 5 seconds...")
-                            time.sleep(5)
+                        if self.retry_policy.should_retry(url, attempt, max_attempts=retry_count):
+                            self.logger.warning("TOC element not found, retrying")
+                            self.retry_policy.wait_before_retry(url, attempt)
                             continue
                         else:
                             self.logger.warning("TOC element not found, falling back to full page screenshot")
-                            success = self.driver.save_screenshot(full_path)
+                            success = self._save_frame(full_path)
                     else:
                         # Scroll element into view and capture element screenshot
                         self.driver.execute_script("arguments[0].scrollIntoView(true);", toc_element)
-                        time.sleep(2)
+                        self._wait_for_settle(legacy_delay=self.LEGACY_CAPTURE_DELAY)
                         self.logger.info(f"Capturing TOC element screenshot to: {full_path}")
-                        success = toc_element.screenshot(full_path)
+                        if self.capture_format == 'png':
+                            success = toc_element.screenshot(full_path)
+                        else:
+                            rect = self.driver.execute_script(
+                                "var r = arguments[0].getBoundingClientRect();"
+                                "return {x: r.left + window.scrollX, y: r.top + window.scrollY,"
+                                " width: r.width, height: r.height};",
+                                toc_element
+                            )
+                            success = self._save_frame(full_path, clip=rect)
                 
                 if success and os.path.exists(full_path):
                     file_size = os.path.getsize(full_path)
                     self.logger.info(f"Screenshot captured successfully: {full_path} ({file_size} bytes)")
+                    self.retry_policy.record_success(url)
                     return True
                 else:
                     raise LivebookScreenshotError("Screenshot capture failed - file not created")
                     
-            except LivebookScreenshotError:
+            except CircuitOpenError:
                 raise
             except Exception as e:
-                error_msg = f"Unexpected error during screenshot capture: {str(e)}"
+                if isinstance(e, LivebookScreenshotError):
+                    error_msg = str(e)
+                else:
+                    error_msg = f"Unexpected error during screenshot capture: {str(e)}"
                 self.logger.error(error_msg)
+                self.retry_policy.record_failure(url)
                 
-                if attempt < retry_count - 1:
-                    self.logger.info(f"Retrying in 5 seconds...")
-                    time.sleep(5)
-                    # Reset driver on error
-                    self.close()
+                if self.retry_policy.should_retry(url, attempt, max_attempts=retry_count):
+                    self.retry_policy.wait_before_retry(url, attempt)
+                    # Reset the session on error: a fresh tab if the browser still responds
+                    if self.driver:
+                        self._open_fresh_tab()
                 else:
                     raise LivebookScreenshotError(error_msg)
         
         return False
     
-    def screenshot_multiple_urls(self, url_filename_pairs: list, progress_callback=None, full_page: bool = True) -> Dict[str, bool]:
+    def screenshot_multiple_urls(self, url_filename_pairs: list, progress_callback=None, full_page: bool = True,
+                                 max_concurrency: int = 1) -> Dict[str, bool]:
         """
         Capture screenshots from multiple URLs.
         
@@ -470,25 +1581,37 @@ class LivebookScreenshotTool:
             url_filename_pairs (list): List of (url, filename) tuples
             progress_callback (callable): Optional callback for progress updates
             full_page (bool): If True, capture full pages; if False, try to find TOC elements
+            max_concurrency (int): Number of isolated Chrome sessions taking URLs from a
+                shared queue (default: 1, sequential in this browser); a slow or failing
+                URL only holds up its own session
             
         Returns:
             Dict[str, bool]: Results for each URL
         """
-        results = {}
+        total = len(url_filename_pairs)
+        self.retry_policy.reset()
         
-        for i, (url, filename) in enumerate(url_filename_pairs):
+        def capture(tool: 'LivebookScreenshotTool', job: Tuple[int, Tuple[str, str]]) -> Tuple[str, bool]:
+            i, (url, filename) = job
             try:
                 if progress_callback:
-                    progress_callback(i, len(url_filename_pairs), url)
+                    progress_callback(i, total, url)
                 
-                result = self.screenshot_livebook_toc(url, filename, full_page=full_page)
-                results[url] = result
+                return url, tool.screenshot_livebook_toc(url, filename, full_page=full_page)
                 
             except Exception as e:
-                self.logger.error(f"Failed to capture {url}: {str(e)}")
-                results[url] = False
+                tool.logger.error(f"Failed to capture {url}: {str(e)}")
+                return url, False
         
-        return results
+        jobs = list(enumerate(url_filename_pairs))
+        if max_concurrency > 1 and total > 1:
+            self.logger.info(f"Capturing {total} URLs with up to {min(max_concurrency, total)} browsers")
+            outcomes = self._run_pooled(jobs, capture, max_concurrency,
+                                        on_error=lambda job, error: (job[1][0], False))
+        else:
+            outcomes = [capture(self, job) for job in jobs]
+        
+        return dict(outcomes)
     
     def screenshot_isbn_batch(self, isbn_list: list, base_url_template: str = "https://klettbib.livebook.de/{}/", 
                              max_pages: int = 10, progress_callback=None) -> Dict[str, Any]:
@@ -546,85 +1669,598 @@ class LivebookScreenshotTool:
         return batch_results
     
     def screenshot_book_batch(self, book_list: list, base_url_template: str = "https://klettbib.livebook.de/{}/", 
-                             max_pages: int = 10, progress_callback=None) -> Dict[str, Any]:
+                             max_pages: int = 10, progress_callback=None, pool_size: int = 1,
+                             output_root: str = "screenshots", resume: bool = True,
+                             page_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                             book_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                             page_classifier: Optional[Callable[[str], Any]] = None,
+                             stop_after_non_toc: Optional[int] = None) -> Dict[str, Any]:
         """
         Capture screenshots for a batch of books with metadata, each in its own directory.
         
         Args:
-            book_list (list): List of book dictionaries with keys: isbn, name, subject, grade
+            book_list (list): List of book dictionaries with keys: isbn, name, subject, grade,
+                and optionally alias_of (ISBN of an edition with identical pages). Books with
+                the same ISBN or alias are captured once; the other directories receive
+                copies of the captured pages (see _share_book)
             base_url_template (str): URL template with {} placeholder for ISBN
             max_pages (int): Maximum pages per book (default: 10)
             progress_callback (callable): Optional progress callback function
+            pool_size (int): Number of isolated Chrome sessions capturing books in
+                parallel from a shared queue (default: 1, sequential in this browser)
+            output_root (str): Directory receiving one subdirectory per book and the
+                capture manifest (default: screenshots)
+            resume (bool): Use the capture manifest to skip completed books and resume
+                interrupted or failed ones after their last captured page; if False,
+                every book is captured from scratch (the manifest is still updated)
+            page_callback (callable): Called as page_callback(book_dir, page_record) as soon
+                as each page is written, e.g. to stream pages into the TOC filter
+            book_callback (callable): Called as book_callback(book_dir, results) when a book
+                is done (captured, skipped as already complete, or failed); for shared books
+                results['shared_from_dir'] names the directory the pages were copied from
+            page_classifier (callable): Classifies each saved page (see screenshot_all_pages),
+                e.g. filter_toc_screenshots.classify_text_layer
+            stop_after_non_toc (int): Stop a book once its TOC run is followed by this many
+                non-TOC pages (requires page_classifier)
             
         Returns:
-            Dict[str, Any]: Results for each book
+            Dict[str, Any]: Results for each book (a BatchResults with a batch summary)
         """
-        batch_results = {}
+        start_time = time.time()
+        total_books = len(book_list)
+        manifest = CaptureManifest(output_root)
+        self.retry_policy.reset()
         
-        for i, book in enumerate(book_list):
-            try:
-                # Validate book dictionary structure
-                required_keys = ['isbn', 'name', 'subject', 'grade']
-                if not all(key in book for key in required_keys):
-                    error_msg = f"Book missing required keys. Expected: {required_keys}, Got: {list(book.keys())}"
-                    self.logger.error(error_msg)
-                    batch_results[f"{book.get('name', 'unknown')}_{book.get('isbn', 'unknown')}"] = {
-                        'success': False,
-                        'error': error_msg,
-                        'captured_pages': []
-                    }
+        # One capture job per distinct ISBN (or alias target); the other books share its pages
+        groups = self._group_books(book_list)
+        total_jobs = len(groups)
+        if total_jobs < total_books:
+            self.logger.info(f"📚 {total_books} books map to {total_jobs} capture jobs "
+                             f"({total_books - total_jobs} share the pages of an identical ISBN or edition)")
+        
+        def capture(tool: 'LivebookScreenshotTool',
+                    job: Tuple[int, Tuple[Dict[str, str], List[Dict[str, str]]]]) -> List[Tuple[str, Dict[str, Any]]]:
+            index, (book, shared_books) = job
+            book_key, results = tool._capture_book(book, index, total_jobs, base_url_template, max_pages,
+                                                   progress_callback, output_root=output_root, manifest=manifest,
+                                                   resume=resume, page_callback=page_callback,
+                                                   page_classifier=page_classifier,
+                                                   stop_after_non_toc=stop_after_non_toc)
+            outcomes = [(book_key, results)]
+            # Fan the pages out before any callback can reorganize the source directory
+            for shared_book in shared_books:
+                outcomes.append(tool._share_book(book, results, shared_book, base_url_template,
+                                                 output_root=output_root, manifest=manifest, resume=resume))
+            if book_callback:
+                for _, book_results in outcomes:
+                    if book_results.get('book_dir'):
+                        try:
+                            book_callback(book_results['book_dir'], book_results)
+                        except Exception as e:
+                            # The pages are on disk; a failing consumer must not lose the batch
+                            tool.logger.error(f"❌ book_callback failed for {book_results['book_dir']}: {str(e)}")
+                            book_results['callback_error'] = str(e)
+            return outcomes
+        
+        def failed(job: Tuple[int, Tuple[Dict[str, str], List[Dict[str, str]]]],
+                   error: Exception) -> List[Tuple[str, Dict[str, Any]]]:
+            _, (book, shared_books) = job
+            return [(f"{failed_book.get('name', 'unknown')}_{failed_book.get('isbn', 'unknown')}", {
+                'success': False,
+                'error': f"Capture job failed: {str(error)}",
+                'captured_pages': []
+            }) for failed_book in [book, *shared_books]]
+        
+        jobs = list(enumerate(groups))
+        if pool_size > 1 and total_jobs > 1:
+            self.logger.info(f"Capturing {total_jobs} books with a pool of {min(pool_size, total_jobs)} browsers")
+            outcomes = self._run_pooled(jobs, capture, pool_size, on_error=failed)
+        else:
+            outcomes = [capture(self, job) for job in jobs]
+        
+        batch_results = BatchResults()
+        for book_key, results in (outcome for group in outcomes for outcome in group):
+            if book_key in batch_results:
+                # Same name and ISBN requested under another subject: key by directory instead
+                book_key = Path(results.get('book_dir', book_key)).name
+            batch_results[book_key] = results
+        
+        elapsed = time.time() - start_time
+        cache_hits = sum(r.get('navigation_cache', {}).get('hits', 0) for r in batch_results.values())
+        cache_misses = sum(r.get('navigation_cache', {}).get('misses', 0) for r in batch_results.values())
+        batch_results.summary = {
+            'total_books': total_books,
+            'capture_jobs': total_jobs,
+            'successful_books': sum(1 for r in batch_results.values() if r.get('success')),
+            'shared_books': sum(1 for r in batch_results.values() if r.get('shared_from')),
+            'pool_size': max(1, min(pool_size, total_jobs)),
+            'elapsed_seconds': round(elapsed, 2),
+            'browser_launches': sum(1 for r in batch_results.values() if r.get('new_browser')),
+            'skipped_books': sum(1 for r in batch_results.values() if r.get('skipped')),
+            'resumed_books': sum(1 for r in batch_results.values() if r.get('resumed_from_page')),
+            'early_stopped_books': sum(1 for r in batch_results.values() if r.get('early_stop')),
+            'breaker_skipped_books': sum(1 for r in batch_results.values() if r.get('skipped_by_breaker')),
+            'retried_books': sum(1 for r in batch_results.values() if r.get('attempts', 1) > 1),
+            'hosts': self.retry_policy.snapshot(),
+            'pages_saved': sum(r.get('pages_saved', 0) for r in batch_results.values()),
+            'blob_store': self._blob_store_summary(output_root),
+            'timing_histogram': timing_histogram(
+                [span for r in batch_results.values() for span in r.get('timings', {}).get('spans', [])]
+            ),
+            'navigation_cache': {
+                'hits': cache_hits,
+                'misses': cache_misses,
+                'hit_rate': round(cache_hits / (cache_hits + cache_misses), 3) if cache_hits + cache_misses else 0.0
+            }
+        }
+        self.logger.info(f"Book batch completed in {elapsed:.1f}s: "
+                         f"{batch_results.summary['successful_books']}/{total_books} books captured")
+        blob_summary = batch_results.summary['blob_store']
+        if blob_summary and blob_summary['deduplicated']:
+            self.logger.info(f"🧱 Blob store: {blob_summary['stored']} new pages stored, {blob_summary['deduplicated']} "
+                             f"identical pages linked ({blob_summary['bytes_deduplicated'] / 1024:.0f} KB not written again)")
+        if batch_results.summary['breaker_skipped_books']:
+            self.logger.warning(f"⛔ {batch_results.summary['breaker_skipped_books']} books skipped by the circuit "
+                                f"breaker; rerun the batch to capture them")
+        if batch_results.summary['timing_histogram']:
+            self.logger.info("Time by phase: " + ", ".join(
+                f"{phase} {stats['total_seconds']:.1f}s (p90 {stats['p90_seconds']:.2f}s)"
+                for phase, stats in batch_results.summary['timing_histogram'].items()
+            ))
+        
+        return batch_results
+    
+    def _blob_store_summary(self, output_root: str) -> Optional[Dict[str, Any]]:
+        """Writes and disk use of an output root's blob store (None if it is disabled)."""
+        blob_store = self._blob_store_for(output_root)
+        if not blob_store:
+            return None
+        with blob_store.lock:
+            summary = dict(blob_store.stats)
+        summary.update(blob_store.usage())
+        return summary
+    
+    def _book_dir_name(self, book: Dict[str, str]) -> str:
+        """Directory name (and screenshot base filename) of a book: {subject}_{grade}_{name}_{isbn}."""
+        # Clean the values to make them filesystem-safe
+        subject = self._clean_filename(book['subject'])
+        grade = self._clean_filename(book['grade'])
+        name = self._clean_filename(book['name'])
+        isbn = self._clean_filename(book['isbn'])
+        return f"{subject}_{grade}_{name}_{isbn}"
+    
+    def _group_books(self, book_list: list) -> List[Tuple[Dict[str, str], List[Dict[str, str]]]]:
+        """
+        Collapse a book list into capture jobs.
+        
+        Books with the same ISBN, and books whose alias_of names the ISBN of another
+        listed book (e.g. flexible vs. hardcover edition), form one job: the first
+        book with that ISBN is captured, the others share its pages.
+        
+        Args:
+            book_list (list): Book dictionaries as passed to screenshot_book_batch
+            
+        Returns:
+            List[Tuple[Dict[str, str], List[Dict[str, str]]]]: (captured book, sharing books)
+            per job, in book list order
+        """
+        listed_isbns = {book.get('isbn') for book in book_list if not book.get('alias_of')}
+        
+        groups: Dict[str, Tuple[Dict[str, str], List[Dict[str, str]]]] = {}
+        seen_dirs = set()
+        for book in book_list:
+            isbn = book.get('isbn')
+            alias_of = book.get('alias_of')
+            if alias_of and alias_of not in listed_isbns:
+                self.logger.warning(f"⚠️ {book.get('name')} ({isbn}): alias_of {alias_of} is not in the book list, "
+                                    f"capturing it separately")
+                alias_of = None
+            key = alias_of or isbn
+            if key is None or not all(field in book for field in ('isbn', 'name', 'subject', 'grade')):
+                # Invalid books keep their own job so _capture_book reports them
+                groups[f"invalid_{len(groups)}"] = (book, [])
+                continue
+            
+            dir_name = self._book_dir_name(book)
+            if dir_name in seen_dirs:
+                self.logger.info(f"⏭️ {book['name']} ({isbn}): listed twice, capturing once")
+                continue
+            seen_dirs.add(dir_name)
+            
+            if key not in groups:
+                # An alias listed before its edition waits for the edition to become the captured book
+                groups[key] = (book, []) if not alias_of else (None, [book])
+            elif groups[key][0] is None and not alias_of:
+                groups[key] = (book, groups[key][1])
+            else:
+                groups[key][1].append(book)
+        
+        return [group for group in groups.values() if group[0] is not None]
+    
+    def _share_book(self, source_book: Dict[str, str], source_results: Dict[str, Any], book: Dict[str, str],
+                    base_url_template: str, output_root: str = "screenshots",
+                    manifest: Optional[CaptureManifest] = None, resume: bool = True) -> Tuple[str, Dict[str, Any]]:
+        """
+        Give a book the pages captured for an identical ISBN or edition.
+        
+        Screenshots are linked from the blob store into the book's own directory under
+        its own base filename (see blob_store.link_file); text-layer sidecars are
+        rewritten for the new file name. Pages already sorted into toc_pages/ or
+        non_toc_pages/ keep that location.
+        
+        Args:
+            source_book (Dict[str, str]): Book that was captured
+            source_results (Dict[str, Any]): Capture results of the source book
+            book (Dict[str, str]): Book receiving the pages
+            base_url_template (str): URL template with {} placeholder for ISBN
+            output_root (str): Directory receiving the book directory
+            manifest (CaptureManifest): Manifest recording the shared book (None: not tracked)
+            resume (bool): Keep the book as is if the manifest marks it completed
+            
+        Returns:
+            Tuple[str, Dict[str, Any]]: Book key and results for the book, with shared_from
+            (source book key) and shared_from_dir (source directory)
+        """
+        book_key = f"{book['name']}_{book['isbn']}"
+        source_key = f"{source_book['name']}_{source_book['isbn']}"
+        url = base_url_template.format(book['isbn'])
+        dir_name = self._book_dir_name(book)
+        book_dir = f"{output_root}/{dir_name}"
+        source_dir = source_results.get('book_dir') or f"{output_root}/{self._book_dir_name(source_book)}"
+        source_name = Path(source_dir).name
+        shared = {'shared_from': source_key, 'shared_from_dir': source_dir, 'book_dir': book_dir, 'base_url': url}
+        
+        status, _, previous_pages = manifest.resume_point(dir_name) if manifest and resume else (None, 1, [])
+        if status == 'completed':
+            self.logger.info(f"⏭️ {book['name']} ({book['isbn']}): already has its pages ({len(previous_pages)} in {book_dir})")
+            return book_key, {
+                'success': True,
+                'skipped': True,
+                'total_pages': len(previous_pages),
+                'captured_pages': previous_pages,
+                'total_size': sum(page.get('file_size') or 0 for page in previous_pages),
+                **shared
+            }
+        
+        if not source_results.get('success'):
+            error = f"Shared capture failed for {source_key}: {source_results.get('error', 'Unknown error')}"
+            self.logger.warning(f"❌ {book['name']} ({book['isbn']}): {error}")
+            return book_key, {'success': False, 'error': error, 'captured_pages': [], **shared}
+        
+        try:
+            pages = []
+            for page in source_results.get('captured_pages', []):
+                source_path = self._locate_shared_page(Path(page['filename']))
+                if source_path is None:
+                    self.logger.warning(f"Page {page['page_number']} of {source_key} not found, not shared")
                     continue
+                # Mirror the source layout (book dir or toc_pages/non_toc_pages below it)
+                organized = source_path.parent.name in ("toc_pages", "non_toc_pages")
+                relative_dir = source_path.parent.name if organized else ""
+                target_name = source_path.name.replace(source_name, dir_name, 1)
+                target_path = Path(book_dir) / relative_dir / target_name
+                blob_store = self._blob_store_for(output_root)
+                if blob_store:
+                    link_file(blob_store.put_file(source_path, digest=page.get('sha256')), target_path)
+                else:
+                    link_file(source_path, target_path)
                 
-                if progress_callback:
-                    progress_callback(i, len(book_list), book)
-                
-                # Create URL from template
-                url = base_url_template.format(book['isbn'])
-                
-                # Create directory name: {subject}_{grade}_{name}_{isbn}
-                # Clean the values to make them filesystem-safe
-                subject = self._clean_filename(book['subject'])
-                grade = self._clean_filename(book['grade'])
-                name = self._clean_filename(book['name'])
-                isbn = self._clean_filename(book['isbn'])
-                
-                dir_name = f"{subject}_{grade}_{name}_{isbn}"
-                book_dir = f"screenshots/{dir_name}"
+                sidecar = source_path.with_suffix('.json')
+                if sidecar.exists():
+                    with open(sidecar, 'r', encoding='utf-8') as f:
+                        text_layer = json.load(f)
+                    text_layer['image'] = target_name
+                    with open(target_path.with_suffix('.json'), 'w', encoding='utf-8') as f:
+                        json.dump(text_layer, f, ensure_ascii=False, indent=2)
                 
-                self.logger.info(f"Processing book {book['name']} ({book['isbn']}) ({i+1}/{len(book_list)})")
-                self.logger.info(f"Target directory: {book_dir}")
+                shared_page = dict(page, filename=str(target_path))
+                shared_page.pop('timings', None)
+                if 'text_layer' in page:
+                    shared_page['text_layer'] = str(target_path.with_suffix('.json'))
+                pages.append(shared_page)
+        except Exception as e:
+            error = f"Could not share pages of {source_key}: {e}"
+            self.logger.error(f"❌ {book['name']} ({book['isbn']}): {error}")
+            return book_key, {'success': False, 'error': error, 'captured_pages': [], **shared}
+        
+        if manifest:
+            manifest.share_book(dir_name, book['isbn'], url, Path(source_dir).name, pages)
+        self.logger.info(f"♻️ {book['name']} ({book['isbn']}): {len(pages)} pages shared from {source_key}")
+        return book_key, {
+            'success': True,
+            'total_pages': len(pages),
+            'captured_pages': pages,
+            'total_size': sum(page.get('file_size') or 0 for page in pages),
+            'early_stop': source_results.get('early_stop', False),
+            **shared
+        }
+    
+    def _locate_shared_page(self, path: Path) -> Optional[Path]:
+        """Find a captured page, also if it was already organized into toc_pages/ or non_toc_pages/."""
+        for candidate in (path, path.parent / "toc_pages" / path.name, path.parent / "non_toc_pages" / path.name):
+            if candidate.exists():
+                return candidate
+        return None
+    
+    def _blob_store_for(self, output_root: Optional[str]) -> Optional[BlobStore]:
+        """
+        Return the blob store of an output root (shared with pool workers).
+        
+        Args:
+            output_root (str): Output root of a book batch (None: no blob store)
+            
+        Returns:
+            Optional[BlobStore]: The store, or None if the blob store is disabled or no
+            output root was given
+        """
+        if not self.use_blob_store or not output_root:
+            return None
+        with self.blob_store_lock:
+            if output_root not in self.blob_stores:
+                self.blob_stores[output_root] = BlobStore.for_output_root(output_root)
+            return self.blob_stores[output_root]
+    
+    def _capture_book(self, book: Dict[str, str], index: int, total_books: int, base_url_template: str,
+                      max_pages: int, progress_callback=None, output_root: str = "screenshots",
+                      manifest: Optional[CaptureManifest] = None, resume: bool = True,
+                      page_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                      page_classifier: Optional[Callable[[str], Any]] = None,
+                      stop_after_non_toc: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Capture all pages of a single book from a batch into its own directory.
+        
+        Args:
+            book (Dict[str, str]): Book dictionary with keys: isbn, name, subject, grade
+            index (int): Position of the book in the batch
+            total_books (int): Size of the batch (for progress reporting)
+            base_url_template (str): URL template with {} placeholder for ISBN
+            max_pages (int): Maximum pages per book
+            progress_callback (callable): Optional progress callback function
+            output_root (str): Directory receiving the book directory
+            manifest (CaptureManifest): Manifest recording the book's progress (None: not tracked)
+            resume (bool): Skip the book if the manifest marks it completed, or continue
+                after its last recorded page
+            page_callback (callable): Called as page_callback(book_dir, page_record) for each page
+            page_classifier (callable): Classifies each saved page for the early stop
+            stop_after_non_toc (int): Non-TOC pages after a TOC run that end the book
+            
+        Returns:
+            Tuple[str, Dict[str, Any]]: Book key and the capture results for that book
+        """
+        try:
+            # Validate book dictionary structure
+            required_keys = ['isbn', 'name', 'subject', 'grade']
+            if not all(key in book for key in required_keys):
+                error_msg = f"Book missing required keys. Expected: {required_keys}, Got: {list(book.keys())}"
+                self.logger.error(error_msg)
+                return f"{book.get('name', 'unknown')}_{book.get('isbn', 'unknown')}", {
+                    'success': False,
+                    'error': error_msg,
+                    'captured_pages': []
+                }
+            
+            if progress_callback:
+                progress_callback(index, total_books, book)
+            
+            # Create URL from template
+            url = base_url_template.format(book['isbn'])
+            
+            # Create directory name: {subject}_{grade}_{name}_{isbn}
+            dir_name = self._book_dir_name(book)
+            book_dir = f"{output_root}/{dir_name}"
+            book_key = f"{book['name']}_{book['isbn']}"
+            
+            # Check the manifest for work done by an earlier run
+            status, start_page, previous_pages = manifest.resume_point(dir_name) if manifest and resume else (None, 1, [])
+            if status == 'completed':
+                self.logger.info(f"⏭️ {book['name']} ({book['isbn']}): already captured "
+                                 f"({len(previous_pages)} pages in {book_dir}), skipping")
+                return book_key, {
+                    'success': True,
+                    'skipped': True,
+                    'book_dir': book_dir,
+                    'total_pages': len(previous_pages),
+                    'captured_pages': previous_pages,
+                    'total_size': sum(page.get('file_size') or 0 for page in previous_pages),
+                    'base_url': url
+                }
+            
+            self.logger.info(f"Processing book {book['name']} ({book['isbn']}) ({index+1}/{total_books})")
+            self.logger.info(f"Target directory: {book_dir}")
+            
+            # Create base filename
+            base_filename = dir_name
+            
+            def on_page(page: Dict[str, Any]) -> None:
+                if manifest:
+                    manifest.record_page(dir_name, page)
+                if page_callback:
+                    page_callback(book_dir, page)
+            
+            attempt = 0
+            while True:
+                # The shared policy may pause here, or refuse the book when the host is failing
+                try:
+                    self.retry_policy.before_attempt(url)
+                except CircuitOpenError as e:
+                    self.logger.warning(f"⛔ {book['name']} ({book['isbn']}): skipped - {e}")
+                    if manifest:
+                        manifest.skip_book(dir_name, book['isbn'], url, str(e))
+                    return book_key, {
+                        'success': False,
+                        'skipped_by_breaker': True,
+                        'error': str(e),
+                        'book_dir': book_dir,
+                        'attempts': attempt,
+                        'captured_pages': previous_pages
+                    }
                 
-                # Create base filename
-                base_filename = f"{subject}_{grade}_{name}_{isbn}"
+                if start_page > 1:
+                    self.logger.info(f"Resuming {status or 'interrupted'} capture at page {start_page}")
+                if manifest:
+                    manifest.start_book(dir_name, book['isbn'], url, restart=start_page == 1)
                 
                 # Capture all pages for this book
                 results = self.screenshot_all_pages(
                     url=url,
                     base_filename=base_filename,
                     max_pages=max_pages,
-                    output_dir=book_dir
+                    output_dir=book_dir,
+                    start_page=start_page,
+                    page_callback=on_page,
+                    known_frames=[(page['page_number'], page['frame_hash']) for page in previous_pages if page.get('frame_hash')],
+                    page_classifier=page_classifier,
+                    stop_after_non_toc=stop_after_non_toc,
+                    blob_root=output_root
                 )
+                results['book_dir'] = book_dir
                 
-                # Use book name and ISBN as key for clearer identification
-                book_key = f"{book['name']}_{book['isbn']}"
-                batch_results[book_key] = results
+                if previous_pages:
+                    # Report the whole book, including pages captured by earlier runs or attempts
+                    results['resumed_from_page'] = start_page
+                    results['captured_pages'] = previous_pages + results['captured_pages']
+                    if results['success']:
+                        results['total_pages'] = len(results['captured_pages'])
+                        results['total_size'] = sum(page.get('file_size') or 0 for page in results['captured_pages'])
                 
                 if results['success']:
-                    self.logger.info(f"✅ {book['name']} ({book['isbn']}): {results['total_pages']} pages captured in {book_dir}")
-                else:
-                    self.logger.warning(f"❌ {book['name']} ({book['isbn']}): Failed - {results.get('error', 'Unknown error')}")
+                    self.retry_policy.record_success(url)
+                    break
+                
+                self.retry_policy.record_failure(url)
+                if not self.retry_policy.should_retry(url, attempt):
+                    break
+                self.logger.warning(f"⚠️ {book['name']} ({book['isbn']}): attempt {attempt + 1} failed - "
+                                    f"{results.get('error', 'Unknown error')}")
+                self.retry_policy.wait_before_retry(url, attempt)
+                attempt += 1
                 
+                # The next attempt continues after the pages this one captured
+                status = 'failed'
+                previous_pages = results['captured_pages']
+                start_page = previous_pages[-1]['page_number'] + 1 if previous_pages else 1
+            
+            results['attempts'] = attempt + 1
+            
+            if manifest:
+                if results['success']:
+                    manifest.complete_book(dir_name)
+                else:
+                    manifest.fail_book(dir_name, results.get('error', 'Unknown error'))
+            
+            if results['success']:
+                self.logger.info(f"✅ {book['name']} ({book['isbn']}): {results['total_pages']} pages captured in {book_dir}")
+                if results.get('early_stop'):
+                    self.logger.info(f"⏹️ {book['name']} ({book['isbn']}): stopped after the TOC, "
+                                     f"{results['pages_saved']} pages not captured")
+            else:
+                self.logger.warning(f"❌ {book['name']} ({book['isbn']}): Failed - {results.get('error', 'Unknown error')}")
+            
+            # Use book name and ISBN as key for clearer identification
+            return book_key, results
+            
+        except Exception as e:
+            error_msg = f"Failed to process book {book.get('name', 'unknown')} ({book.get('isbn', 'unknown')}): {str(e)}"
+            self.logger.error(error_msg)
+            return f"{book.get('name', 'unknown')}_{book.get('isbn', 'unknown')}", {
+                'success': False,
+                'error': error_msg,
+                'captured_pages': []
+            }
+    
+    def _spawn_worker(self) -> 'LivebookScreenshotTool':
+        """Create an independent tool (with its own browser session) sharing this tool's configuration."""
+        worker = type(self)(
+            headless=self.headless,
+            window_size=self.window_size,
+            settle_timeout=self.settle_timeout,
+            settle_quiet_window=self.settle_quiet_window,
+            settle_observe_attributes=self.settle_observe_attributes,
+            duplicate_action=self.duplicate_action,
+            duplicate_window=self.duplicate_window,
+            duplicate_max_distance=self.duplicate_max_distance,
+            navigation_cache_file=None,
+            cache_by_viewer_version=self.cache_by_viewer_version,
+            recycle_after_pages=self.recycle_after_pages,
+            max_browser_memory_mb=self.max_browser_memory_mb,
+            driver_path=self.driver_path,
+            capture_format=self.capture_format,
+            capture_quality=self.capture_quality,
+            clip_to_viewer=self.clip_to_viewer,
+            extract_text_layer=self.extract_text_layer,
+            blob_store=self.use_blob_store
+        )
+        worker.toc_selectors = list(self.toc_selectors)
+        worker.viewer_selectors = list(self.viewer_selectors)
+        # Workers learn from (and contribute to) the same navigation cache, and share
+        # the retry policy so host failures count against one budget and breaker
+        worker.navigation_cache = self.navigation_cache
+        worker.retry_policy = self.retry_policy
+        worker.blob_stores = self.blob_stores
+        worker.blob_store_lock = self.blob_store_lock
+        return worker
+    
+    def _run_pooled(self, jobs: List[Any], handler: Callable[['LivebookScreenshotTool', Any], Any],
+                    pool_size: int, on_error: Callable[[Any, Exception], Any]) -> List[Any]:
+        """
+        Run jobs across a pool of isolated browser sessions.
+        
+        Each worker owns a separate tool instance, and therefore a separate Chrome
+        process, and keeps taking jobs from a shared queue until it is empty. Slow
+        jobs only hold up the worker processing them. A job that raises is recorded
+        through on_error and the worker moves on; a worker that cannot be started
+        leaves its jobs to the other workers, and jobs no worker could take are
+        recorded through on_error as well.
+        
+        Args:
+            jobs (List[Any]): Work items passed to the handler
+            handler (callable): Called as handler(worker_tool, job) for every job
+            pool_size (int): Maximum number of concurrent browser sessions
+            on_error (callable): Called as on_error(job, exception) for the failure
+                result of a job that raised or was never run
+            
+        Returns:
+            List[Any]: Handler (or on_error) results in the same order as jobs
+        """
+        job_queue = Queue()
+        for position, job in enumerate(jobs):
+            job_queue.put((position, job))
+        
+        outcomes: List[Any] = [None] * len(jobs)
+        worker_count = max(1, min(pool_size, len(jobs)))
+        spawn_errors: List[Exception] = []
+        
+        def worker() -> None:
+            try:
+                tool = self._spawn_worker()
             except Exception as e:
-                error_msg = f"Failed to process book {book.get('name', 'unknown')} ({book.get('isbn', 'unknown')}): {str(e)}"
-                self.logger.error(error_msg)
-                book_key = f"{book.get('name', 'unknown')}_{book.get('isbn', 'unknown')}"
-                batch_results[book_key] = {
-                    'success': False,
-                    'error': error_msg,
-                    'captured_pages': []
-                }
+                self.logger.error(f"❌ Could not start a browser worker: {str(e)}")
+                spawn_errors.append(e)
+                return
+            with tool:
+                while True:
+                    try:
+                        position, job = job_queue.get_nowait()
+                    except Empty:
+                        return
+                    try:
+                        outcomes[position] = handler(tool, job)
+                    except Exception as e:
+                        tool.logger.error(f"❌ Pooled job failed: {str(e)}")
+                        outcomes[position] = on_error(job, e)
         
-        return batch_results
+        with ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix="livebook-worker") as executor:
+            futures = [executor.submit(worker) for _ in range(worker_count)]
+            for future in futures:
+                future.result()
+        
+        # Only left over if every worker failed to start
+        while not job_queue.empty():
+            position, job = job_queue.get_nowait()
+            error = spawn_errors[0] if spawn_errors else LivebookScreenshotError("No browser worker took the job")
+            outcomes[position] = on_error(job, error)
+        
+        return outcomes
     
     def _clean_filename(self, text: str) -> str:
         """
@@ -649,7 +2285,13 @@ class LivebookScreenshotTool:
         
         return cleaned
     
-    def screenshot_all_pages(self, url: str, base_filename: str, max_pages: int = 10, output_dir: str = None) -> Dict[str, Any]:
+    def screenshot_all_pages(self, url: str, base_filename: str, max_pages: int = 10, output_dir: str = None,
+                             start_page: int = 1, page_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                             known_frames: Optional[List[Tuple[int, str]]] = None,
+                             page_classifier: Optional[Callable[[str], Any]] = None,
+                             stop_after_non_toc: Optional[int] = None,
+                             classifier_threshold: float = 0.7,
+                             blob_root: Optional[str] = None) -> Dict[str, Any]:
         """
         Capture screenshots of all pages in a Livebook.
         
@@ -658,6 +2300,21 @@ class LivebookScreenshotTool:
             base_filename (str): Base filename for screenshots (will be numbered)
             max_pages (int): Maximum number of pages to capture (default: 10)
             output_dir (str): Custom output directory (default: screenshots/)
+            start_page (int): First page to capture; earlier pages are paged through
+                without capturing (used to resume an interrupted book)
+            page_callback (callable): Called with each page record right after the page is saved
+            known_frames (List[Tuple[int, str]]): (page_number, frame_hash) of pages captured
+                before start_page, so end-of-book detection works across a resume
+            page_classifier (callable): Called with each saved screenshot path, returning a
+                result like TOCScreenshotFilter.analyze_screenshot (is_toc, confidence), a
+                bool, or None if undecided. Runs while the next page is loading.
+            stop_after_non_toc (int): Stop capturing once a run of TOC pages has started and
+                this many consecutive non-TOC pages followed (None: capture up to max_pages)
+            classifier_threshold (float): Minimum confidence for a classifier result to count
+                as a TOC page
+            blob_root (str): Output root whose blob store receives the page images (see
+                blob_store.BlobStore); None writes plain files (screenshot_book_batch
+                passes its output_root)
             
         Returns:
             Dict[str, Any]: Results with page count and file paths
@@ -666,67 +2323,179 @@ class LivebookScreenshotTool:
             raise LivebookScreenshotError("URL and base filename are required")
         
         self.logger.info(f"Starting multi-page screenshot capture for: {url}")
+        self.navigation_stats = {'hits': 0, 'misses': 0}
+        self.timer = PhaseTimer()
+        book_start = time.perf_counter()
+        classifier_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="page-classifier") if page_classifier else None
+        toc_state = {'toc_pages': 0, 'non_toc_streak': 0, 'classifier_wait_seconds': 0.0}
         
         try:
-            # Setup driver if not already done
-            if not self.driver:
-                self._setup_driver()
+            # Reuse the browser with a fresh tab, or (re)launch it per the lifecycle policy
+            with self.timer.span('session') as span:
+                new_browser = self._prepare_session()
+                span['new_browser'] = new_browser
             
             # Navigate to URL
             self.logger.info(f"Navigating to: {url}")
-            self.driver.get(url)
+            with self.timer.span('driver_get'):
+                self.driver.get(url)
             
             # Wait for page to load
-            if not self._wait_for_page_load():
-                self.logger.warning("Page may not have loaded completely")
+            with self.timer.span('page_load'):
+                if not self._wait_for_page_load():
+                    self.logger.warning("Page may not have loaded completely")
             
             # Try to navigate to first page
-            self._navigate_to_first_page()
+            with self.timer.span('first_page'):
+                self._navigate_to_first_page()
             
             captured_pages = []
+            recent_frames = list(known_frames or [])[-self.duplicate_window:]  # (page_number, fingerprint) of the last few pages
+            duplicate_pages = 0
+            stopped_on_duplicate = False
             current_page = 1
             
-            while current_page <= max_pages:
+            # Page past the pages captured by an earlier run
+            while current_page < start_page:
+                self._wait_for_settle()
+                if not self._navigate_to_next_page():
+                    self.logger.info(f"No more pages found after page {current_page} while resuming at page {start_page}")
+                    break
+                current_page += 1
+            ended_before_start = current_page < start_page
+            pending_classification = None  # (page_record, future) of the previous page
+            early_stop = False
+            
+            while current_page <= max_pages and not ended_before_start:
                 self.logger.info(f"Capturing page {current_page}...")
+                self.timer.page = current_page
+                
+                # Wait for the page (and any page turn) to stabilize
+                legacy_delay = self.LEGACY_CAPTURE_DELAY
+                if current_page > 1:
+                    legacy_delay += self.LEGACY_PAGE_TURN_DELAY
+                settle = self._wait_for_settle(legacy_delay=legacy_delay)
                 
-                # Wait a moment for page to stabilize
-                time.sleep(2)
+                # The previous page was classified while this one loaded
+                if pending_classification:
+                    early_stop = self._apply_page_classification(*pending_classification, toc_state,
+                                                                 stop_after_non_toc, classifier_threshold)
+                    pending_classification = None
+                    if early_stop:
+                        self.logger.info(f"TOC run ended {stop_after_non_toc} pages ago - stopping before page {current_page}")
+                        break
                 
                 # Create filename for this page
                 page_filename = f"{base_filename}_page_{current_page:02d}"
-                full_path = self._create_output_directory(page_filename, custom_dir=output_dir)
+                full_path = self._create_output_directory(
+                    page_filename, custom_dir=output_dir, extension=self.CAPTURE_EXTENSIONS[self.capture_format]
+                )
                 
-                # Capture screenshot of current page
-                success = self.driver.save_screenshot(full_path)
+                # Capture screenshot of current page and compare it with recent pages
+                clip = self._find_viewer_clip() if self.clip_to_viewer else None
+                with self.timer.span('capture', format=self.capture_format):
+                    image_bytes = self._capture_frame(clip)
+                with self.timer.span('fingerprint'):
+                    fingerprint = frame_fingerprint(image_bytes)
+                duplicate_of = self._find_duplicate_frame(fingerprint, recent_frames)
                 
-                if success and os.path.exists(full_path):
+                if duplicate_of is not None:
+                    duplicate_pages += 1
+                    if self.duplicate_action == "stop":
+                        self.logger.info(f"Page {current_page} repeats page {duplicate_of} - assuming end of book")
+                        stopped_on_duplicate = True
+                        break
+                    self.logger.info(f"Page {current_page} repeats page {duplicate_of} - marking as duplicate")
+                
+                image_sha256 = hashlib.sha256(image_bytes).hexdigest()
+                blob_store = self._blob_store_for(blob_root)
+                with self.timer.span('write', bytes=len(image_bytes)) as write_span:
+                    if blob_store:
+                        write_span['placed'] = blob_store.store(image_bytes, Path(full_path), digest=image_sha256)
+                    else:
+                        with open(full_path, 'wb') as f:
+                            f.write(image_bytes)
+                
+                if os.path.exists(full_path):
+                    self.pages_since_launch += 1
                     file_size = os.path.getsize(full_path)
-                    self.logger.info(f"Page {current_page} captured: {full_path} ({file_size} bytes)")
-                    captured_pages.append({
+                    self.logger.info(f"Page {current_page} captured: {full_path} ({file_size} bytes, "
+                                     f"settled in {settle['waited_seconds']:.2f}s, saved {settle['saved_seconds']:.2f}s)")
+                    page_record = {
                         'page_number': current_page,
                         'filename': full_path,
-                        'file_size': file_size
-                    })
+                        'file_size': file_size,
+                        'sha256': image_sha256,
+                        'frame_hash': fingerprint,
+                        'captured_at': datetime.now().isoformat(),
+                        'settled': settle['settled'],
+                        'settle_seconds': settle['waited_seconds'],
+                        'wait_saved_seconds': settle['saved_seconds']
+                    }
+                    if duplicate_of is not None:
+                        page_record['duplicate_of'] = duplicate_of
+                    if self.extract_text_layer:
+                        # Same pass as the screenshot, so text and pixels describe the same page state
+                        with self.timer.span('text_layer'):
+                            text_layer = self._extract_text_layer(clip)
+                            if text_layer is not None:
+                                page_record['text_layer'] = self._save_text_layer(full_path, text_layer, current_page)
+                                page_record['text_chars'] = len(text_layer.get('text', ''))
+                    captured_pages.append(page_record)
+                    if page_callback:
+                        page_callback(page_record)
+                    if classifier_pool:
+                        pending_classification = (page_record, classifier_pool.submit(page_classifier, full_path))
                 else:
                     self.logger.warning(f"Failed to capture page {current_page}")
                 
+                recent_frames.append((current_page, fingerprint))
+                del recent_frames[:-self.duplicate_window]
+                
                 # Try to navigate to next page
-                if not self._navigate_to_next_page():
+                with self.timer.span('page_turn') as span:
+                    span['success'] = self._navigate_to_next_page()
+                if not span['success']:
                     self.logger.info(f"No more pages found after page {current_page}")
                     break
                 
                 current_page += 1
             
+            self.timer.page = None
+            if pending_classification:
+                self._apply_page_classification(*pending_classification, toc_state,
+                                                stop_after_non_toc, classifier_threshold)
+            
+            # Per-page breakdown; spans of the final page turn and classification are included
+            for page in captured_pages:
+                page['timings'] = self.timer.page_totals(page['page_number'])
+            
             total_pages = len(captured_pages)
             total_size = sum(page['file_size'] for page in captured_pages)
+            total_saved = sum(page['wait_saved_seconds'] for page in captured_pages)
+            text_layer_pages = sum(1 for page in captured_pages if 'text_layer' in page)
             
-            self.logger.info(f"Multi-page capture completed: {total_pages} pages, {total_size:,} bytes total")
+            self.logger.info(f"Multi-page capture completed: {total_pages} pages, {total_size:,} bytes total, "
+                             f"{total_saved:.1f}s of fixed waits saved, {duplicate_pages} duplicate pages")
             
             return {
                 'success': True,
                 'total_pages': total_pages,
                 'captured_pages': captured_pages,
                 'total_size': total_size,
+                'total_wait_saved_seconds': round(total_saved, 2),
+                'duplicate_pages': duplicate_pages,
+                'stopped_on_duplicate': stopped_on_duplicate,
+                'text_layer_pages': text_layer_pages,
+                'start_page': start_page,
+                'early_stop': early_stop,
+                'pages_saved': max_pages - current_page + 1 if early_stop else 0,
+                'toc_pages_detected': toc_state['toc_pages'],
+                'classifier_wait_seconds': round(toc_state['classifier_wait_seconds'], 2),
+                'navigation_cache': dict(self.navigation_stats),
+                'new_browser': new_browser,
+                'elapsed_seconds': round(time.perf_counter() - book_start, 3),
+                'timings': {'totals': self.timer.totals(), 'spans': self.timer.spans},
                 'base_url': url
             }
             
@@ -736,11 +2505,86 @@ class LivebookScreenshotTool:
             return {
                 'success': False,
                 'error': error_msg,
-                'captured_pages': captured_pages if 'captured_pages' in locals() else []
+                'captured_pages': captured_pages if 'captured_pages' in locals() else [],
+                'navigation_cache': dict(self.navigation_stats),
+                'elapsed_seconds': round(time.perf_counter() - book_start, 3),
+                'timings': {'totals': self.timer.totals(), 'spans': self.timer.spans}
             }
+        finally:
+            if classifier_pool:
+                classifier_pool.shutdown(wait=False)
+    
+    def _apply_page_classification(self, page_record: Dict[str, Any], future: Any, toc_state: Dict[str, Any],
+                                   stop_after_non_toc: Optional[int], threshold: float) -> bool:
+        """
+        Record a page classifier result and update the TOC run tracking.
+        
+        Args:
+            page_record (Dict[str, Any]): Record of the classified page (updated in place)
+            future: Future of the page classifier call
+            toc_state (Dict[str, Any]): TOC page count, non-TOC streak and time spent waiting on the classifier
+            stop_after_non_toc (int): Non-TOC pages after a TOC run that end the capture
+            threshold (float): Minimum confidence for a TOC result
+            
+        Returns:
+            bool: True if capture should stop early
+        """
+        start = time.time()
+        with self.timer.span('classifier_wait', page=page_record['page_number']):
+            try:
+                result = future.result()
+            except Exception as e:
+                self.logger.warning(f"Page classifier failed for page {page_record['page_number']}: {e}")
+                result = None
+        toc_state['classifier_wait_seconds'] += time.time() - start
+        
+        if isinstance(result, dict):
+            is_toc = bool(result.get('is_toc')) and result.get('confidence', 1.0) >= threshold
+            page_record['toc_confidence'] = result.get('confidence')
+            if result.get('error'):
+                is_toc = None
+        elif isinstance(result, bool):
+            is_toc = result
+        else:
+            is_toc = None  # Undecided pages neither start nor extend a run
+        page_record['is_toc'] = is_toc
+        
+        if is_toc:
+            toc_state['toc_pages'] += 1
+            toc_state['non_toc_streak'] = 0
+        elif is_toc is False and toc_state['toc_pages']:
+            toc_state['non_toc_streak'] += 1
+        
+        return bool(stop_after_non_toc and toc_state['toc_pages']
+                    and toc_state['non_toc_streak'] >= stop_after_non_toc)
+    
+    def _find_duplicate_frame(self, fingerprint: str, recent_frames: List[Tuple[int, str]]) -> Optional[int]:
+        """
+        Check a frame fingerprint against recently captured pages.
+        
+        Args:
+            fingerprint (str): Fingerprint of the frame just captured
+            recent_frames (List[Tuple[int, str]]): (page_number, fingerprint) of recent pages
+            
+        Returns:
+            Optional[int]: Page number of the matching earlier page, or None
+        """
+        for page_number, previous in reversed(recent_frames):
+            if fingerprints_match(fingerprint, previous, self.duplicate_max_distance):
+                return page_number
+        return None
     
     def _navigate_to_first_page(self) -> bool:
         """Try to navigate to the first page of the Livebook."""
+        if self._run_navigation('first_page', [('first_page_button', self._click_first_page_button)]):
+            self._wait_for_settle(legacy_delay=self.LEGACY_NAVIGATION_DELAY)
+            return True
+        
+        self.logger.info("No first page navigation found, assuming already on first page")
+        return True
+    
+    def _click_first_page_button(self, preferred_selector: Optional[str] = None) -> bool:
+        """Click a visible "first page" control."""
         first_page_selectors = [
             "//button[contains(@aria-label, 'first') or contains(@title, 'first')]",
             "//button[contains(@aria-label, 'beginning') or contains(@title, 'beginning')]", 
@@ -751,24 +2595,46 @@ class LivebookScreenshotTool:
             "//button[contains(@class, 'pagination') and contains(text(), '1')]"
         ]
         
-        for selector in first_page_selectors:
-            try:
-                elements = self.driver.find_elements(By.XPATH, selector)
-                for element in elements:
-                    if element.is_displayed() and element.is_enabled():
-                        self.logger.info(f"Navigating to first page with: {selector}")
-                        self.driver.execute_script("arguments[0].click();", element)
-                        time.sleep(2)
-                        return True
-            except Exception as e:
-                self.logger.debug(f"First page navigation failed with {selector}: {e}")
-                continue
-        
-        self.logger.info("No first page navigation found, assuming already on first page")
-        return True
+        return self._click_first_available(first_page_selectors, preferred_selector,
+                                           description="Navigating to first page with")
     
     def _navigate_to_next_page(self) -> bool:
         """Try to navigate to the next page of the Livebook."""
+        # Next buttons first, then the keyboard (the caller waits for the new page to settle);
+        # on hosts without a next button the cached keyboard strategy is tried first
+        if self._run_navigation('next_page', [('next_page_button', self._click_next_page_button),
+                                              ('keyboard', self._press_next_page_keys)]):
+            return True
+        
+        self.logger.info("No next page navigation found")
+        return False
+    
+    def _press_next_page_keys(self, preferred_selector: Optional[str] = None) -> bool:
+        """Turn the page with the arrow and page-down keys, reporting whether the frame changed."""
+        from selenium.webdriver.common.keys import Keys
+        from selenium.webdriver.common.action_chains import ActionChains
+        
+        before = frame_fingerprint(self._capture_frame())
+        actions = ActionChains(self.driver)
+        body = self.driver.find_element(By.TAG_NAME, "body")
+        
+        # Try right arrow key
+        actions.click(body).send_keys(Keys.ARROW_RIGHT).perform()
+        self._wait_for_settle(legacy_delay=self.LEGACY_NAVIGATION_DELAY)
+        
+        # Try page down
+        actions.send_keys(Keys.PAGE_DOWN).perform()
+        self._wait_for_settle(legacy_delay=self.LEGACY_NAVIGATION_DELAY)
+        
+        # Keys on the last page (or in a viewer ignoring them) leave the frame as it was
+        changed = not fingerprints_match(before, frame_fingerprint(self._capture_frame()),
+                                         self.duplicate_max_distance)
+        if not changed:
+            self.logger.info("Keyboard navigation did not change the page, assuming end of book")
+        return changed
+    
+    def _click_next_page_button(self, preferred_selector: Optional[str] = None) -> bool:
+        """Click an enabled "next page" control."""
         next_page_selectors = [
             "//button[contains(@aria-label, 'next') or contains(@title, 'next')]",
             "//button[contains(@aria-label, 'forward') or contains(@title, 'forward')]",
@@ -783,47 +2649,8 @@ class LivebookScreenshotTool:
             "//button[contains(@class, 'pagination')][following-sibling::button]",
         ]
         
-        # First try standard next buttons
-        for selector in next_page_selectors:
-            try:
-                elements = self.driver.find_elements(By.XPATH, selector)
-                for element in elements:
-                    if element.is_displayed() and element.is_enabled():
-                        # Check if button is not disabled
-                        disabled = element.get_attribute('disabled')
-                        aria_disabled = element.get_attribute('aria-disabled')
-                        
-                        if not disabled and aria_disabled != 'true':
-                            self.logger.info(f"Navigating to next page with: {selector}")
-                            self.driver.execute_script("arguments[0].click();", element)
-                            time.sleep(3)  # Wait for page to load
-                            return True
-            except Exception as e:
-                self.logger.debug(f"Next page navigation failed with {selector}: {e}")
-                continue
-        
-        # Alternative: try keyboard navigation
-        try:
-            from selenium.webdriver.common.keys import Keys
-            from selenium.webdriver.common.action_chains import ActionChains
-            
-            actions = ActionChains(self.driver)
-            body = self.driver.find_element(By.TAG_NAME, "body")
-            
-            # Try right arrow key
-            actions.click(body).send_keys(Keys.ARROW_RIGHT).perform()
-            time.sleep(2)
-            
-            # Try page down
-            actions.send_keys(Keys.PAGE_DOWN).perform()
-            time.sleep(2)
-            
-            return True
-        except Exception:
-            pass
-        
-        self.logger.info("No next page navigation found")
-        return False
+        return self._click_first_available(next_page_selectors, preferred_selector, skip_disabled=True,
+                                           description="Navigating to next page with")
     
     def get_page_info(self, url: str) -> Dict[str, Any]:
         """
@@ -849,13 +2676,9 @@ class LivebookScreenshotTool:
                 'found_elements': {}
             }
             
-            # Check each selector
-            for selector in self.toc_selectors:
-                try:
-                    elements = self.driver.find_elements(By.XPATH, selector)
-                    info['found_elements'][selector] = len(elements)
-                except Exception:
-                    info['found_elements'][selector] = 0
+            # Count matches for every selector in one round-trip
+            for entry in self._probe_selectors(self.toc_selectors, visible_only=False, limit=0):
+                info['found_elements'][entry['selector']] = entry['count'] if not entry['error'] else 0
             
             return info
             
@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""
+OpenAI Batch API Jobs
+=====================
+
+Offline mode for nightly catalog rebuilds: instead of calling the chat
+completions endpoint request by request, the requests are written to JSONL
+files, submitted to the Batch API (lower cost per call, a separate and much
+larger rate limit, results within 24 hours), polled until done, and the output
+files are read back so the callers can ingest them into their normal result
+structures.
+
+Pieces:
+- BatchJob: request files plus a manifest JSON in a batch directory (batches/
+  by default); the manifest keeps the submitted batch IDs, so collecting can
+  resume in another process
+- BatchRunner: submit, poll and download through a transport
+- OpenAIBatchTransport: the real Files and Batches endpoints
+- ReplayBatchTransport: local stand-in that answers from canned responses or a
+  recorded output file, for exercising the whole flow without the API
+
+Usage:
+    job = filter_tool.write_classification_batch("screenshots")
+    runner = BatchRunner(OpenAIBatchTransport(filter_tool.client))
+    runner.submit(job)
+    results = runner.collect(job)   # polls until all batches are done
+"""
+
+import io
+import json
+import time
+import uuid
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+
+# Batch API input file limits (50,000 requests, 200 MB), with headroom for the byte limit
+MAX_REQUESTS_PER_FILE = 50000
+MAX_BYTES_PER_FILE = 190 * 1024 * 1024
+
+# Batch states after which the status no longer changes
+TERMINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+
+class BatchAPIError(Exception):
+    """Custom exception for Batch API job errors."""
+    pass
+
+
+class BatchJob:
+    """
+    Request files and manifest of one batch run on disk.
+    """
+
+    def __init__(self, manifest_path: Union[str, Path]):
+        """
+        Open a job from its manifest (see BatchJob.create to write a new one).
+
+        Args:
+            manifest_path: Path of the job's manifest JSON
+        """
+        self.manifest_path = Path(manifest_path)
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            self.manifest: Dict[str, Any] = json.load(f)
+
+    @classmethod
+    def create(cls, requests: Iterable[Dict[str, Any]], name: str, batch_dir: str = "batches",
+               context: Optional[Dict[str, Any]] = None) -> 'BatchJob':
+        """
+        Write requests to JSONL files (split at the Batch API file limits) and a manifest.
+
+        Args:
+            requests: Dicts with custom_id and body (chat completion parameters); may be a
+                generator, so large image requests are encoded one at a time
+            name: Job name (file name prefix; a timestamp and a random suffix are appended)
+            batch_dir: Directory for the request files and the manifest
+            context: Caller data needed to ingest the results (stored in the manifest)
+
+        Returns:
+            The new job
+        """
+        directory = Path(batch_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        # The random suffix keeps jobs created within the same second from sharing files
+        stem = f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+        request_files: List[str] = []
+        request_count = 0
+        handle = None
+        file_requests = file_bytes = 0
+        try:
+            for request in requests:
+                line = json.dumps({
+                    'custom_id': request['custom_id'],
+                    'method': 'POST',
+                    'url': BATCH_ENDPOINT,
+                    'body': request['body']
+                }, ensure_ascii=False) + '\n'
+                size = len(line.encode('utf-8'))
+                if handle is None or file_requests >= MAX_REQUESTS_PER_FILE or file_bytes + size > MAX_BYTES_PER_FILE:
+                    if handle:
+                        handle.close()
+                    path = directory / f"{stem}.requests.{len(request_files) + 1:03d}.jsonl"
+                    request_files.append(str(path))
+                    handle = open(path, 'w', encoding='utf-8')
+                    file_requests = file_bytes = 0
+                handle.write(line)
+                file_requests += 1
+                file_bytes += size
+                request_count += 1
+        finally:
+            if handle:
+                handle.close()
+
+        manifest_path = directory / f"{stem}.manifest.json"
+        with open(manifest_path, 'x', encoding='utf-8') as f:
+            json.dump({
+                'name': name,
+                'created_at': datetime.now().isoformat(),
+                'endpoint': BATCH_ENDPOINT,
+                'request_count': request_count,
+                'request_files': request_files,
+                'batches': [],
+                'context': context or {}
+            }, f, indent=2, ensure_ascii=False)
+        return cls(manifest_path)
+
+    @property
+    def context(self) -> Dict[str, Any]:
+        """Caller data stored with the job."""
+        return self.manifest['context']
+
+    @property
+    def output_path(self) -> Path:
+        """File the downloaded results are saved to (replayable with ReplayBatchTransport)."""
+        return self.manifest_path.with_name(self.manifest_path.name.replace('.manifest.json', '.output.jsonl'))
+
+    def save(self) -> None:
+        """Write the manifest back to disk."""
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2, ensure_ascii=False)
+
+    def summary(self, results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Return the job's batches and request outcomes for reports."""
+        return {
+            'manifest': str(self.manifest_path),
+            'batches': [{'id': batch['id'], 'status': batch.get('status')} for batch in self.manifest['batches']],
+            'requests': self.manifest['request_count'],
+            'failed_requests': sum(1 for result in results.values() if 'error' in result),
+            'output_file': str(self.output_path)
+        }
+
+
+def parse_batch_line(line: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert one line of a batch output or error file to a result.
+
+    Args:
+        line: Parsed JSONL line with custom_id, response and error
+
+    Returns:
+        Dict with content, finish_reason and usage, or with error
+    """
+    response = line.get('response') or {}
+    body = response.get('body') or {}
+    if line.get('error') or response.get('status_code') != 200:
+        error = line.get('error') or body.get('error') or {}
+        message = error.get('message') if isinstance(error, dict) else str(error)
+        return {'error': message or f"Request failed with status {response.get('status_code')}",
+                'status_code': response.get('status_code')}
+    try:
+        choice = body['choices'][0]
+        return {
+            'content': choice['message']['content'] or '',
+            'finish_reason': choice.get('finish_reason'),
+            'usage': body.get('usage')
+        }
+    except (KeyError, IndexError, TypeError) as e:
+        return {'error': f"Malformed response body: {e}"}
+
+
+class OpenAIBatchTransport:
+    """
+    Transport for the OpenAI Files and Batches endpoints.
+    """
+
+    def __init__(self, client: Any):
+        """
+        Initialize the transport.
+
+        Args:
+            client: openai.OpenAI client
+        """
+        self.client = client
+
+    def upload(self, path: Path) -> str:
+        """Upload a request file and return its file ID."""
+        with open(path, 'rb') as f:
+            return self.client.files.create(file=f, purpose="batch").id
+
+    def create_batch(self, input_file_id: str, metadata: Dict[str, str]) -> Dict[str, Any]:
+        """Create a batch for an uploaded request file."""
+        batch = self.client.batches.create(input_file_id=input_file_id, endpoint=BATCH_ENDPOINT,
+                                           completion_window=COMPLETION_WINDOW, metadata=metadata)
+        return self._batch_info(batch)
+
+    def retrieve_batch(self, batch_id: str) -> Dict[str, Any]:
+        """Return a batch's status, request counts and output/error file IDs."""
+        return self._batch_info(self.client.batches.retrieve(batch_id))
+
+    def download(self, file_id: str) -> str:
+        """Return the content of an output or error file."""
+        return self.client.files.content(file_id).text
+
+    @staticmethod
+    def _batch_info(batch: Any) -> Dict[str, Any]:
+        """Convert an SDK batch object to the dict BatchRunner uses."""
+        counts = getattr(batch, 'request_counts', None)
+        return {
+            'id': batch.id,
+            'status': batch.status,
+            'output_file_id': getattr(batch, 'output_file_id', None),
+            'error_file_id': getattr(batch, 'error_file_id', None),
+            'request_counts': {
+                'total': getattr(counts, 'total', 0),
+                'completed': getattr(counts, 'completed', 0),
+                'failed': getattr(counts, 'failed', 0)
+            }
+        }
+
+
+class ReplayBatchTransport:
+    """
+    Local stand-in for the Batch API that answers requests from canned responses.
+
+    Responses can be given as:
+    - A dict of custom_id -> message content (str) or chat completion body (dict)
+    - A callable (custom_id, request body) -> message content or body
+    - The path of a recorded output file (e.g. BatchJob.output_path of an earlier run)
+    Requests without a response end up in the error file.
+    """
+
+    def __init__(self, responses: Union[Dict[str, Any], Callable[[str, Dict[str, Any]], Any], str, None] = None,
+                 polls_until_complete: int = 1):
+        """
+        Initialize the stand-in.
+
+        Args:
+            responses: Canned responses (see class docstring)
+            polls_until_complete: Status checks answered with in_progress before a batch completes
+        """
+        self.recorded: Dict[str, Dict[str, Any]] = {}
+        if isinstance(responses, str):
+            with open(responses, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.recorded[entry['custom_id']] = entry
+            responses = None
+        self.responses = responses
+        self.polls_until_complete = polls_until_complete
+        self.files: Dict[str, str] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+
+    def upload(self, path: Path) -> str:
+        """Store a request file and return its file ID."""
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        self.files[file_id] = Path(path).read_text(encoding='utf-8')
+        return file_id
+
+    def create_batch(self, input_file_id: str, metadata: Dict[str, str]) -> Dict[str, Any]:
+        """Create a batch for a stored request file."""
+        if input_file_id not in self.files:
+            raise BatchAPIError(f"Unknown input file: {input_file_id}")
+        batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+        self.batches[batch_id] = {'id': batch_id, 'input_file_id': input_file_id, 'status': 'validating',
+                                  'polls': 0, 'output_file_id': None, 'error_file_id': None,
+                                  'request_counts': {'total': 0, 'completed': 0, 'failed': 0}}
+        return self._info(batch_id)
+
+    def retrieve_batch(self, batch_id: str) -> Dict[str, Any]:
+        """Return a batch's status, completing it after polls_until_complete checks."""
+        batch = self.batches.get(batch_id)
+        if batch is None:
+            raise BatchAPIError(f"Unknown batch: {batch_id}")
+        if batch['status'] not in TERMINAL_STATUSES:
+            batch['polls'] += 1
+            if batch['polls'] > self.polls_until_complete:
+                self._complete(batch)
+            else:
+                batch['status'] = 'in_progress'
+        return self._info(batch_id)
+
+    def download(self, file_id: str) -> str:
+        """Return the content of an output or error file."""
+        if file_id not in self.files:
+            raise BatchAPIError(f"Unknown file: {file_id}")
+        return self.files[file_id]
+
+    def _info(self, batch_id: str) -> Dict[str, Any]:
+        """Return the public fields of a batch."""
+        batch = self.batches[batch_id]
+        return {key: batch[key] for key in ('id', 'status', 'output_file_id', 'error_file_id', 'request_counts')}
+
+    def _answer(self, custom_id: str, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Look up the canned response of one request (None: no response)."""
+        if custom_id in self.recorded:
+            return self.recorded[custom_id]
+        if callable(self.responses):
+            answer = self.responses(custom_id, body)
+        elif isinstance(self.responses, dict):
+            answer = self.responses.get(custom_id)
+        else:
+            answer = None
+        if answer is None:
+            return None
+        if isinstance(answer, str):
+            answer = {
+                'id': f"chatcmpl-{uuid.uuid4().hex[:24]}",
+                'object': 'chat.completion',
+                'model': body.get('model'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': answer}, 'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+            }
+        return {'id': f"batch_req_{uuid.uuid4().hex[:24]}", 'custom_id': custom_id,
+                'response': {'status_code': 200, 'request_id': uuid.uuid4().hex, 'body': answer}, 'error': None}
+
+    def _complete(self, batch: Dict[str, Any]) -> None:
+        """Answer all requests of a batch and write its output and error files."""
+        output, errors = io.StringIO(), io.StringIO()
+        counts = batch['request_counts']
+        for line in self.files[batch['input_file_id']].splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            counts['total'] += 1
+            entry = self._answer(request['custom_id'], request['body'])
+            if entry is None:
+                counts['failed'] += 1
+                errors.write(json.dumps({
+                    'id': f"batch_req_{uuid.uuid4().hex[:24]}", 'custom_id': request['custom_id'], 'response': None,
+                    'error': {'code': 'replay_missing', 'message': f"No canned response for {request['custom_id']}"}
+                }) + '\n')
+            else:
+                counts['completed'] += 1
+                output.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+        for key, buffer in (('output_file_id', output), ('error_file_id', errors)):
+            if buffer.getvalue():
+                file_id = f"file-{uuid.uuid4().hex[:24]}"
+                self.files[file_id] = buffer.getvalue()
+                batch[key] = file_id
+        batch['status'] = 'completed'
+
+
+class BatchRunner:
+    """
+    Submits BatchJobs through a transport, polls them and downloads their results.
+    """
+
+    def __init__(self, transport: Any, poll_interval: float = 60.0, timeout: float = 25 * 3600):
+        """
+        Initialize the runner.
+
+        Args:
+            transport: OpenAIBatchTransport, ReplayBatchTransport or compatible object
+            poll_interval: Seconds between status checks
+            timeout: Seconds to wait for all batches before giving up (the completion
+                window is 24h; the batches keep running and can be collected later)
+        """
+        self.transport = transport
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.logger = logging.getLogger(__name__)
+
+    def submit(self, job: BatchJob) -> List[str]:
+        """
+        Upload the job's request files and create one batch per file.
+
+        Files already submitted (according to the manifest) are skipped, so a failed
+        submission can be retried.
+
+        Args:
+            job: Job to submit
+
+        Returns:
+            IDs of all the job's batches
+        """
+        submitted = {batch['request_file'] for batch in job.manifest['batches']}
+        for request_file in job.manifest['request_files']:
+            if request_file in submitted:
+                continue
+            file_id = self.transport.upload(Path(request_file))
+            batch = self.transport.create_batch(file_id, {'job': job.manifest['name'],
+                                                          'request_file': Path(request_file).name})
+            job.manifest['batches'].append({'request_file': request_file, 'input_file_id': file_id,
+                                            'id': batch['id'], 'status': batch['status']})
+            job.save()
+            self.logger.info(f"📤 Submitted {Path(request_file).name} as batch {batch['id']}")
+        return [batch['id'] for batch in job.manifest['batches']]
+
+    def wait(self, job: BatchJob) -> List[Dict[str, Any]]:
+        """
+        Poll the job's batches until all of them reach a terminal status.
+
+        Args:
+            job: Submitted job
+
+        Returns:
+            Final batch infos (status, request counts, output/error file IDs)
+        """
+        if not job.manifest['batches']:
+            raise BatchAPIError(f"Job {job.manifest['name']} has not been submitted")
+
+        deadline = time.time() + self.timeout
+        while True:
+            infos = [self.transport.retrieve_batch(batch['id']) for batch in job.manifest['batches']]
+            for batch, info in zip(job.manifest['batches'], infos):
+                batch['status'] = info['status']
+                batch['request_counts'] = info['request_counts']
+            job.save()
+
+            pending = [info for info in infos if info['status'] not in TERMINAL_STATUSES]
+            if not pending:
+                return infos
+            done = sum(info['request_counts'].get('completed', 0) for info in infos)
+            self.logger.info(f"⏳ {len(pending)}/{len(infos)} batches running, "
+                             f"{done}/{job.manifest['request_count']} requests done")
+            if time.time() >= deadline:
+                raise BatchAPIError(f"Batches still running after {self.timeout:.0f}s: "
+                                    f"{', '.join(info['id'] for info in pending)}")
+            time.sleep(self.poll_interval)
+
+    def results(self, job: BatchJob, infos: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Download the output and error files of finished batches.
+
+        The combined output is also saved to job.output_path.
+
+        Args:
+            job: Finished job
+            infos: Batch infos from wait
+
+        Returns:
+            Results by custom_id (see parse_batch_line); requests without any line get an error
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        with open(job.output_path, 'w', encoding='utf-8') as saved:
+            for info in infos:
+                if info['status'] != 'completed':
+                    self.logger.warning(f"⚠️ Batch {info['id']} ended as {info['status']}")
+                for key in ('output_file_id', 'error_file_id'):
+                    if not info.get(key):
+                        continue
+                    for line in self.transport.download(info[key]).splitlines():
+                        if not line.strip():
+                            continue
+                        entry = json.loads(line)
+                        results[entry['custom_id']] = parse_batch_line(entry)
+                        saved.write(line + '\n')
+
+        statuses = {info['id']: info['status'] for info in infos}
+        for batch in job.manifest['batches']:
+            if statuses.get(batch['id']) == 'completed':
+                continue
+            with open(batch['request_file'], 'r', encoding='utf-8') as f:
+                for line in f:
+                    custom_id = json.loads(line)['custom_id']
+                    results.setdefault(custom_id, {'error': f"Batch {batch['id']} {statuses.get(batch['id'])}"})
+        return results
+
+    def collect(self, job: BatchJob) -> Dict[str, Dict[str, Any]]:
+        """Wait for the job's batches and return their results by custom_id."""
+        return self.results(job, self.wait(job))
+
+    def run(self, job: BatchJob) -> Dict[str, Dict[str, Any]]:
+        """Submit the job, wait for it and return its results by custom_id."""
+        self.submit(job)
+        return self.collect(job)
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+API Rate Limiting
+=================
+
+Token-bucket rate limiter (GCRA, the generic cell rate algorithm) for OpenAI
+calls, with a requests-per-minute and an optional tokens-per-minute budget.
+
+Each caller reserves its start time under the lock and sleeps outside it, so
+waiting callers never block each other and queue up at evenly spaced start
+times. One limiter can be shared by TOCScreenshotFilter and TocTaxonomyAnalyzer
+so both draw from the same account budget.
+
+SharedRateLimiter keeps the bucket state in a SQLite file instead of memory, so
+several filter and taxonomy processes on one host share one budget. Setting
+OPENAI_RATE_LIMIT_DB makes every limiter created by create_rate_limiter shared.
+
+Usage:
+    limiter = RateLimiter(max_calls_per_minute=500, max_tokens_per_minute=200000)
+    filter_tool = TOCScreenshotFilter(rate_limiter=limiter)
+    analyzer = TocTaxonomyAnalyzer(rate_limiter=limiter)
+
+    # All processes on the host:
+    export OPENAI_RATE_LIMIT_DB=.cache/openai_rate_limit.sqlite3
+"""
+
+import os
+import math
+import time
+import sqlite3
+import threading
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+
+# Environment variable naming the SQLite file of a host-wide shared limiter
+RATE_LIMIT_DB_ENV = "OPENAI_RATE_LIMIT_DB"
+
+# Calls per minute used when only the shared database is configured
+DEFAULT_MAX_CALLS_PER_MINUTE = 30
+
+# Rough token cost of one high-detail image (a 1024x1024 page: 4 tiles x 170 + 85)
+TOKENS_PER_IMAGE = 765
+
+
+def estimate_tokens(text: str = "", images: int = 0, max_output_tokens: int = 0,
+                    tokens_per_image: int = TOKENS_PER_IMAGE) -> int:
+    """
+    Estimate the tokens a chat completion request will use, for tokens-per-minute budgets.
+
+    Args:
+        text: Prompt text (about 4 characters per token)
+        images: Number of attached images
+        max_output_tokens: Expected completion tokens
+        tokens_per_image: Token cost per image
+
+    Returns:
+        Estimated total tokens (the limiter is corrected with actual usage afterwards)
+    """
+    return len(text) // 4 + images * tokens_per_image + max_output_tokens
+
+
+def image_tokens(width: int, height: int, detail: str = "high") -> int:
+    """
+    Token cost of one image as the vision models bill it.
+
+    High detail scales the image to fit 2048x2048, then to 768px on its short
+    side, and charges 170 tokens per 512px tile plus 85; low detail is 85 flat.
+
+    Args:
+        width: Image width in pixels (as sent)
+        height: Image height in pixels (as sent)
+        detail: Image detail level of the request ("high", "low" or "auto")
+
+    Returns:
+        Estimated input tokens of the image
+    """
+    if detail == "low" or width <= 0 or height <= 0:
+        return 85
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+class RateLimiter:
+    """
+    Rate limiter to control API calls (and tokens) per minute.
+
+    Each budget is a GCRA bucket: a theoretical arrival time (TAT) advances by the
+    emission interval (60s / limit) per request or token, and a caller may start
+    once now >= TAT - burst tolerance. Reservations are computed under the lock;
+    the resulting delay is slept outside it.
+
+    Without a burst, calls are spaced evenly, so no rolling minute holds more than
+    max_calls_per_minute calls. A burst is opt-in: it lets an idle limiter start
+    several calls at once, and a minute starting with a burst then holds up to
+    burst_seconds worth of extra calls.
+    """
+
+    def __init__(self, max_calls_per_minute: Optional[int] = 30, max_tokens_per_minute: Optional[int] = None,
+                 burst_seconds: float = 0.0):
+        """
+        Initialize the limiter.
+
+        Args:
+            max_calls_per_minute: Maximum API calls per minute (None: no requests-per-minute
+                budget, e.g. when an AdaptiveConcurrencyController sets the rate)
+            max_tokens_per_minute: Maximum tokens per minute (None: requests only)
+            burst_seconds: Budget that may be used at once after an idle period, in
+                seconds of the rate (0.0: no burst, calls evenly spaced; 10.0: up to
+                1/6 of the per-minute budget at once, on top of the per-minute rate)
+        """
+        if max_calls_per_minute is not None and max_calls_per_minute <= 0:
+            raise ValueError(f"max_calls_per_minute must be positive, got {max_calls_per_minute}")
+        if max_tokens_per_minute is not None and max_tokens_per_minute <= 0:
+            raise ValueError(f"max_tokens_per_minute must be positive, got {max_tokens_per_minute}")
+        if burst_seconds < 0:
+            raise ValueError(f"burst_seconds must not be negative, got {burst_seconds}")
+
+        self.max_calls = max_calls_per_minute
+        self.max_tokens = max_tokens_per_minute
+        self.burst_seconds = burst_seconds
+        self.lock = threading.Lock()
+
+        self.call_interval = 60.0 / max_calls_per_minute if max_calls_per_minute else 0.0
+        self.token_interval = 60.0 / max_tokens_per_minute if max_tokens_per_minute else 0.0
+        # At least one request may always start immediately when idle
+        self.call_tolerance = max(0.0, burst_seconds - self.call_interval)
+        self.token_tolerance = burst_seconds
+        self.call_tat = 0.0
+        self.token_tat = 0.0
+        self.stats = {'calls': 0, 'waited_calls': 0, 'wait_seconds': 0.0, 'tokens': 0}
+
+    def reserve(self, tokens: int = 0) -> float:
+        """
+        Reserve a start time for one call without waiting.
+
+        Args:
+            tokens: Estimated tokens of the call (ignored without a tokens-per-minute budget)
+
+        Returns:
+            Seconds the caller has to wait before starting the call
+        """
+        with self.lock:
+            now = time.monotonic()
+            start, self.call_tat, self.token_tat = self._schedule(now, self.call_tat, self.token_tat, tokens)
+
+            delay = start - now
+            self.stats['calls'] += 1
+            self.stats['tokens'] += tokens
+            if delay > 0:
+                self.stats['waited_calls'] += 1
+                self.stats['wait_seconds'] += delay
+            return delay
+
+    def _schedule(self, now: float, call_tat: float, token_tat: float, tokens: int) -> Tuple[float, float, float]:
+        """
+        Apply GCRA to the bucket state.
+
+        Args:
+            now: Current time on the clock the TATs are measured with
+            call_tat: Theoretical arrival time of the next call
+            token_tat: Theoretical arrival time of the next token
+            tokens: Estimated tokens of the call
+
+        Returns:
+            Tuple of (start time, new call TAT, new token TAT)
+        """
+        start = max(now, call_tat - self.call_tolerance)
+        if self.max_tokens and tokens:
+            start = max(start, token_tat - self.token_tolerance)
+
+        call_tat = max(call_tat, start) + self.call_interval
+        if self.max_tokens and tokens:
+            token_tat = max(token_tat, start) + tokens * self.token_interval
+        return start, call_tat, token_tat
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Wait until a call may start.
+
+        Args:
+            tokens: Estimated tokens of the call
+
+        Returns:
+            Seconds waited
+        """
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return max(0.0, delay)
+
+    def wait_if_needed(self, tokens: int = 0) -> float:
+        """Wait if necessary to respect rate limits (same as acquire)."""
+        return self.acquire(tokens)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """
+        Correct the tokens-per-minute budget once a call reports its real usage.
+
+        Args:
+            estimated_tokens: Tokens reserved for the call
+            actual_tokens: Tokens the API reported (None: keep the estimate)
+        """
+        if not self.max_tokens or actual_tokens is None:
+            return
+        with self.lock:
+            self.token_tat += (actual_tokens - estimated_tokens) * self.token_interval
+            self.stats['tokens'] += actual_tokens - estimated_tokens
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the limits and the calls, tokens and waiting so far."""
+        with self.lock:
+            return {
+                'max_calls_per_minute': self.max_calls,
+                'max_tokens_per_minute': self.max_tokens,
+                **self.stats,
+                'wait_seconds': round(self.stats['wait_seconds'], 2)
+            }
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    RateLimiter whose bucket lives in a SQLite row shared by all processes on a host.
+
+    Every reservation runs in an immediate (write-locked) transaction, so
+    concurrent processes see each other's reservations; the wait still happens
+    outside the transaction. TATs use wall-clock time, which all processes share.
+    Processes sharing a bucket should use the same limits.
+    """
+
+    def __init__(self, max_calls_per_minute: Optional[int] = 30, max_tokens_per_minute: Optional[int] = None,
+                 burst_seconds: float = 0.0, db_path: str = ".cache/openai_rate_limit.sqlite3",
+                 bucket: str = "openai"):
+        """
+        Initialize the limiter.
+
+        Args:
+            max_calls_per_minute: Maximum API calls per minute (host-wide; None: no requests budget)
+            max_tokens_per_minute: Maximum tokens per minute (None: requests only)
+            burst_seconds: Budget that may be used at once after an idle period (0.0: no burst)
+            db_path: SQLite file holding the bucket state (created if missing)
+            bucket: Bucket name, e.g. one per API account
+        """
+        super().__init__(max_calls_per_minute, max_tokens_per_minute, burst_seconds)
+        self.db_path = Path(db_path)
+        self.bucket = bucket
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit connection: closing() is what releases it
+        with closing(self._connect()) as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, call_tat REAL NOT NULL, token_tat REAL NOT NULL)"
+            )
+            connection.execute("INSERT OR IGNORE INTO buckets VALUES (?, 0, 0)", (bucket,))
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection (one per operation, so the limiter is safe to use from any thread)."""
+        return sqlite3.connect(str(self.db_path), timeout=30.0, isolation_level=None)
+
+    def _update_bucket(self, update) -> Any:
+        """
+        Read, modify and write the bucket row in one write-locked transaction.
+
+        Args:
+            update: Called as update(now, call_tat, token_tat); returns (result, call_tat, token_tat)
+
+        Returns:
+            The result of update
+        """
+        connection = self._connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            call_tat, token_tat = connection.execute(
+                "SELECT call_tat, token_tat FROM buckets WHERE name = ?", (self.bucket,)
+            ).fetchone()
+            result, call_tat, token_tat = update(time.time(), call_tat, token_tat)
+            connection.execute("UPDATE buckets SET call_tat = ?, token_tat = ? WHERE name = ?",
+                               (call_tat, token_tat, self.bucket))
+            connection.execute("COMMIT")
+            return result
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+    def reserve(self, tokens: int = 0) -> float:
+        """
+        Reserve a start time for one call in the host-wide bucket without waiting.
+
+        Args:
+            tokens: Estimated tokens of the call (ignored without a tokens-per-minute budget)
+
+        Returns:
+            Seconds the caller has to wait before starting the call
+        """
+        def update(now: float, call_tat: float, token_tat: float):
+            start, call_tat, token_tat = self._schedule(now, call_tat, token_tat, tokens)
+            return start - now, call_tat, token_tat
+
+        delay = self._update_bucket(update)
+        with self.lock:
+            self.stats['calls'] += 1
+            self.stats['tokens'] += tokens
+            if delay > 0:
+                self.stats['waited_calls'] += 1
+                self.stats['wait_seconds'] += delay
+        return delay
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """
+        Correct the host-wide tokens-per-minute budget with a call's real usage.
+
+        Args:
+            estimated_tokens: Tokens reserved for the call
+            actual_tokens: Tokens the API reported (None: keep the estimate)
+        """
+        if not self.max_tokens or actual_tokens is None:
+            return
+        correction = (actual_tokens - estimated_tokens) * self.token_interval
+        self._update_bucket(lambda now, call_tat, token_tat: (None, call_tat, token_tat + correction))
+        with self.lock:
+            self.stats['tokens'] += actual_tokens - estimated_tokens
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the limits, this process's calls and waiting, and the shared database."""
+        snapshot = super().snapshot()
+        snapshot['shared_db'] = str(self.db_path)
+        return snapshot
+
+
+def create_rate_limiter(max_calls_per_minute: Optional[int] = DEFAULT_MAX_CALLS_PER_MINUTE,
+                        max_tokens_per_minute: Optional[int] = None,
+                        shared_db: Optional[str] = None) -> RateLimiter:
+    """
+    Create a process-local limiter, or a host-wide one if a shared database is configured.
+
+    Args:
+        max_calls_per_minute: Maximum API calls per minute (None: no requests-per-minute budget)
+        max_tokens_per_minute: Maximum tokens per minute (None: requests only)
+        shared_db: SQLite file shared by all processes (default: $OPENAI_RATE_LIMIT_DB;
+            unset means a process-local limiter)
+
+    Returns:
+        RateLimiter or SharedRateLimiter
+    """
+    shared_db = shared_db or os.getenv(RATE_LIMIT_DB_ENV)
+    if shared_db:
+        return SharedRateLimiter(max_calls_per_minute, max_tokens_per_minute, db_path=shared_db)
+    return RateLimiter(max_calls_per_minute, max_tokens_per_minute)
@@ -35,13 +35,15 @@ except ImportError:
 # Import our tools
 try:
     from livebook_screenshot_tool import LivebookScreenshotTool
+    from capture_manifest import CaptureManifest
     print("✅ Screenshot tool imported successfully")
 except ImportError as e:
     print(f"❌ Failed to import screenshot tool: {e}")
     exit(1)
 
 try:
-    from filter_toc_screenshots import TOCScreenshotFilter, TOCFilterError
+    from filter_toc_screenshots import (TOCScreenshotFilter, TOCFilterError, TOCFilterStream, find_screenshots,
+                                        classify_text_layer, share_book_results)
     print("✅ AI filter tool imported successfully")
 except ImportError as e:
     print(f"❌ Failed to import AI filter tool: {e}")
@@ -91,6 +93,9 @@ def generate_book_directory_name(book: Dict[str, str]) -> str:
 # =====================
 
 # ISBN List to Process
+# Books listed twice with the same ISBN are captured and analyzed once. "alias_of" marks an
+# edition with the same pages as another listed ISBN (e.g. flexible vs. hardcover binding):
+# it gets a copy of that edition's screenshots and results instead of its own capture.
 BOOK_LIST = [
 {
     "isbn": "978-3-12-316301-2",
@@ -228,7 +233,8 @@ BOOK_LIST = [
     "isbn": "978-3-12-718513-3",
     "name": "Tafelwerk Mathematik, Physik, Astronomie, Chemie, Biologie, Informatik (flexibler Einband)",
     "subject": "Mathematik, Physik, Astronomie, Chemie, Biologie, Informatik",
-    "grade": "8-13"
+    "grade": "8-13",
+    "alias_of": "978-3-12-718512-6"
 },
 {
     "isbn": "978-3-12-718521-8",
@@ -336,7 +342,8 @@ BOOK_LIST = [
     "isbn": "978-3-12-624012-3",
     "name": "Découvertes 1 (flexibler Einband)",
     "subject": "Französisch 1. Fremdsprache",
-    "grade": "1. Lernjahr"
+    "grade": "1. Lernjahr",
+    "alias_of": "978-3-12-624011-6"
 },
 {
     "isbn": "978-3-12-624011-6",
@@ -348,7 +355,8 @@ BOOK_LIST = [
     "isbn": "978-3-12-624022-2",
     "name": "Découvertes 2 (flexibler Einband)",
     "subject": "Französisch 1. Fremdsprache",
-    "grade": "2. Lernjahr"
+    "grade": "2. Lernjahr",
+    "alias_of": "978-3-12-624021-5"
 },
 {
     "isbn": "978-3-12-624021-5",
@@ -360,7 +368,8 @@ BOOK_LIST = [
     "isbn": "978-3-12-624032-1",
     "name": "Découvertes 3 (flexibler Einband)",
     "subject": "Französisch 1. Fremdsprache",
-    "grade": "3. Lernjahr"
+    "grade": "3. Lernjahr",
+    "alias_of": "978-3-12-624031-4"
 },
 {
     "isbn": "978-3-12-624031-4",
@@ -378,13 +387,15 @@ BOOK_LIST = [
     "isbn": "978-3-12-624042-0",
     "name": "Découvertes 4 (flexibler Einband)",
     "subject": "Französisch 1. Fremdsprache",
-    "grade": "4. Lernjahr"
+    "grade": "4. Lernjahr",
+    "alias_of": "978-3-12-624041-3"
 },
 {
     "isbn": "978-3-12-624052-9",
     "name": "Découvertes 5 (flexibler Einband)",
     "subject": "Französisch 1. Fremdsprache",
-    "grade": "5. Lernjahr"
+    "grade": "5. Lernjahr",
+    "alias_of": "978-3-12-624051-2"
 },
 {
     "isbn": "978-3-12-624051-2",
@@ -423,18 +434,26 @@ BOOK_LIST = [
 MAX_PAGES_PER_BOOK = 10        # Stop after 10 pages per book
 CONFIDENCE_THRESHOLD = 0.7     # AI confidence threshold for TOC identification
 HEADLESS_MODE = True           # Run browser in headless mode
+CAPTURE_POOL_SIZE = 3          # Parallel Chrome sessions for screenshot capture (1 = sequential)
 AUTO_ORGANIZE = True           # Automatically organize files after filtering
+STREAMING_MODE = True          # Filter pages while capture is still running (instead of capture, then filter)
+STREAM_QUEUE_SIZE = 32         # Max captured pages waiting for AI analysis in streaming mode
+EARLY_STOP_AFTER_NON_TOC = 2   # Stop a book after its TOC once this many non-TOC pages follow (None = always MAX_PAGES_PER_BOOK)
 
 def display_configuration():
     """Display current configuration."""
     print("⚙️ Workflow Configuration:")
     print(f"📚 ISBNs to process: {len(BOOK_LIST)}")
     for i, book in enumerate(BOOK_LIST, 1):
-        print(f"   {i}. {book['name']} ({book['isbn']})")
+        alias = f" → pages of {book['alias_of']}" if book.get('alias_of') else ""
+        print(f"   {i}. {book['name']} ({book['isbn']}){alias}")
     print(f"📄 Max pages per book: {MAX_PAGES_PER_BOOK}")
     print(f"🎯 AI confidence threshold: {CONFIDENCE_THRESHOLD}")
     print(f"👻 Headless mode: {HEADLESS_MODE}")
+    print(f"🧵 Capture browsers: {CAPTURE_POOL_SIZE}")
     print(f"🗂️ Auto-organize files: {AUTO_ORGANIZE}")
+    print(f"🌊 Streaming mode: {STREAMING_MODE}")
+    print(f"⏹️ Early stop after TOC: {EARLY_STOP_AFTER_NON_TOC or 'off'}")
 
     # Check API key
     api_key = os.getenv('OPENAI_API_KEY')
@@ -448,6 +467,20 @@ def display_configuration():
     print("\n✅ Configuration ready!")
     return True
 
+def early_stop_options() -> Dict[str, Any]:
+    """
+    Batch capture options for stopping books after their TOC.
+    
+    Pages are classified locally from their DOM text layer, so the early stop costs
+    no API calls; pages without a text layer never trigger it.
+    """
+    if not EARLY_STOP_AFTER_NON_TOC:
+        return {}
+    return {
+        'page_classifier': classify_text_layer,
+        'stop_after_non_toc': EARLY_STOP_AFTER_NON_TOC
+    }
+
 def capture_screenshots_step(book_list: List[Dict[str, str]], max_pages: int = 10) -> Dict[str, Any]:
     """
     Step 1: Capture screenshots for all books.
@@ -461,14 +494,16 @@ def capture_screenshots_step(book_list: List[Dict[str, str]], max_pages: int = 1
         print(f"📊 Progress: {percent:.1f}% - Processing {book_info['name']} ({book_info['isbn']})")
     
     try:
-        with LivebookScreenshotTool(headless=HEADLESS_MODE) as tool:
+        with LivebookScreenshotTool(headless=HEADLESS_MODE, extract_text_layer=bool(EARLY_STOP_AFTER_NON_TOC)) as tool:
             print("🚀 Starting screenshot capture...")
             
             # Capture screenshots for all books
             results = tool.screenshot_book_batch(
                 book_list=book_list,
                 max_pages=max_pages,
-                progress_callback=progress_callback
+                progress_callback=progress_callback,
+                pool_size=CAPTURE_POOL_SIZE,
+                **early_stop_options()
             )
             
             # Calculate summary
@@ -480,11 +515,29 @@ def capture_screenshots_step(book_list: List[Dict[str, str]], max_pages: int = 1
             print(f"   ✅ Successful: {successful_books}/{len(book_list)} books")
             print(f"   📄 Total pages: {total_pages}")
             print(f"   💾 Total size: {total_size / (1024 * 1024):.1f} MB")
+            print(f"   ⏱️ Capture time: {results.summary['elapsed_seconds']:.1f}s with {results.summary['pool_size']} browser(s)")
+            if results.summary['shared_books']:
+                print(f"   ♻️ Shared: {results.summary['shared_books']} books reuse the pages of an identical ISBN or edition "
+                      f"({results.summary['capture_jobs']} capture jobs)")
+            if results.summary['skipped_books'] or results.summary['resumed_books']:
+                print(f"   ⏭️ From earlier runs: {results.summary['skipped_books']} skipped, "
+                      f"{results.summary['resumed_books']} resumed (screenshots/capture_manifest.json)")
+            if results.summary['early_stopped_books']:
+                print(f"   ⏹️ Stopped after TOC: {results.summary['early_stopped_books']} books, "
+                      f"{results.summary['pages_saved']} pages not captured")
+            if results.summary['retried_books'] or results.summary['breaker_skipped_books']:
+                print(f"   🔁 Retried: {results.summary['retried_books']} books, "
+                      f"⛔ skipped by circuit breaker: {results.summary['breaker_skipped_books']} (rerun to capture)")
             
             for book_key, result in results.items():
-                if result['success']:
+                if result.get('shared_from') and result['success']:
+                    print(f"   ♻️ {book_key}: {result['total_pages']} pages (shared from {result['shared_from']})")
+                elif result.get('skipped'):
+                    print(f"   ⏭️ {book_key}: {result['total_pages']} pages (already captured)")
+                elif result['success']:
                     pages = result['total_pages']
-                    print(f"   📖 {book_key}: {pages} pages")
+                    saved = f", stopped after TOC ({result['pages_saved']} pages saved)" if result.get('early_stop') else ""
+                    print(f"   📖 {book_key}: {pages} pages{saved}")
                 else:
                     print(f"   ❌ {book_key}: Failed")
             
@@ -494,6 +547,98 @@ def capture_screenshots_step(book_list: List[Dict[str, str]], max_pages: int = 1
         print(f"❌ Screenshot capture failed: {e}")
         return None
 
+def streaming_capture_and_filter_step(book_list: List[Dict[str, str]], max_pages: int = 10,
+                                     screenshots_dir: str = "screenshots"):
+    """
+    Steps 1-3 overlapped: capture pages, filter them as they arrive, organize each finished book.
+    
+    Returns:
+        Tuple of (screenshot results, filter results) in the formats of the separate steps
+    """
+    print("\n🌊 Steps 1-3: Streaming Capture → AI Filtering → Organization")
+    print("=" * 50)
+    
+    if not os.getenv('OPENAI_API_KEY'):
+        print("❌ OpenAI API key not found!")
+        print("   Create .env file with: OPENAI_API_KEY=your-key-here")
+        return None, None
+    
+    def progress_callback(book_index, total_books, book_info):
+        """Update progress for current book."""
+        percent = (book_index + 1) / total_books * 100
+        print(f"📊 Capture progress: {percent:.1f}% - Processing {book_info['name']} ({book_info['isbn']})")
+    
+    try:
+        print("🔧 Initializing AI filter...")
+        filter_tool = TOCScreenshotFilter()
+        
+        def book_classified(book_dir, book_results):
+            """Organize a book as soon as its last page is classified."""
+            book_name = Path(book_dir).name
+            print(f"   ✅ {book_name}: {len(book_results['toc_pages'])}/{book_results['total_screenshots']} pages are TOC")
+            filter_tool.organize_filtered_results({'processed_isbns': {book_name: book_results}},
+                                                  organize_files=AUTO_ORGANIZE, screenshots_dir=screenshots_dir)
+        
+        stream = TOCFilterStream(filter_tool, confidence_threshold=CONFIDENCE_THRESHOLD,
+                                 queue_size=STREAM_QUEUE_SIZE, book_callback=book_classified)
+        
+        def book_captured(book_dir, results):
+            """Books sharing another book's pages reuse its classification."""
+            if results.get('shared_from_dir') and results['success']:
+                stream.share_book(book_dir, results['shared_from_dir'])
+            else:
+                stream.finish_book(book_dir, results.get('captured_pages'))
+        
+        with stream, LivebookScreenshotTool(headless=HEADLESS_MODE, extract_text_layer=bool(EARLY_STOP_AFTER_NON_TOC)) as tool:
+            print("🚀 Starting streaming capture...")
+            screenshot_results = tool.screenshot_book_batch(
+                book_list=book_list,
+                max_pages=max_pages,
+                progress_callback=progress_callback,
+                pool_size=CAPTURE_POOL_SIZE,
+                output_root=screenshots_dir,
+                page_callback=lambda book_dir, page: stream.submit_page(book_dir, page['filename'], page['page_number']),
+                book_callback=book_captured,
+                **early_stop_options()
+            )
+            print(f"📸 Capture finished in {screenshot_results.summary['elapsed_seconds']:.1f}s - waiting for remaining AI analysis...")
+            batch_results = stream.close()
+        
+        # Same shape as filter_toc_step, so the report and final summary work unchanged
+        summary = batch_results['summary']
+        summary['estimated_cost'] = summary['api_calls'] * 0.00015
+        filter_results = {
+            'processed_books': batch_results['processed_isbns'],
+            'summary': summary
+        }
+        
+        report_file = "reports/toc_analysis_report.json"
+        filter_tool.save_analysis_report(filter_results, report_file)
+        
+        print(f"\n📊 Streaming Summary:")
+        print(f"   ✅ Books captured: {screenshot_results.summary['successful_books']}/{len(book_list)}")
+        if screenshot_results.summary['shared_books']:
+            print(f"   ♻️ Shared: {screenshot_results.summary['shared_books']} books reuse the pages and analysis "
+                  f"of an identical ISBN or edition")
+        if screenshot_results.summary['early_stopped_books']:
+            print(f"   ⏹️ Stopped after TOC: {screenshot_results.summary['early_stopped_books']} books, "
+                  f"{screenshot_results.summary['pages_saved']} pages not captured")
+        if screenshot_results.summary['breaker_skipped_books']:
+            print(f"   ⛔ Skipped by circuit breaker: {screenshot_results.summary['breaker_skipped_books']} books (rerun to capture)")
+        print(f"   📄 Screenshots analyzed: {summary['total_screenshots_analyzed']} "
+              f"({summary['cache_hits']} from cache, hit rate {summary['cache_hit_rate']:.0%})")
+        print(f"   ✅ TOC pages found: {summary['total_toc_pages_found']}")
+        print(f"   ⏱️ End-to-end time: {summary['processing_time_seconds']:.1f}s "
+              f"(capture alone: {screenshot_results.summary['elapsed_seconds']:.1f}s)")
+        print(f"   💰 Total cost: ${summary['estimated_cost']:.4f}")
+        print(f"💾 Detailed report saved: {report_file}")
+        
+        return screenshot_results, filter_results
+        
+    except Exception as e:
+        print(f"❌ Streaming workflow failed: {e}")
+        return None, None
+
 def filter_toc_step(screenshots_dir: str = "screenshots") -> Dict[str, Any]:
     """
     Step 2: Use AI to filter screenshots and identify TOC pages.
@@ -508,13 +653,20 @@ def filter_toc_step(screenshots_dir: str = "screenshots") -> Dict[str, Any]:
         return None
     
     # Find book directories (new format: {subject}_{grade}_{name}_{isbn})
+    # (hidden directories such as the .blobs store are not books)
     book_dirs = [d for d in os.listdir(screenshots_dir) 
-                if os.path.isdir(os.path.join(screenshots_dir, d)) and d != "testrun"]
+                if os.path.isdir(os.path.join(screenshots_dir, d)) and d != "testrun" and not d.startswith('.')]
     
     if not book_dirs:
         print("❌ No book directories found")
         return None
     
+    # Books sharing the pages of another book (see BOOK_LIST) reuse its analysis,
+    # so they are handled after the books they share from
+    manifest = CaptureManifest(screenshots_dir)
+    shared_from = {d: (manifest.get(d) or {}).get('shared_from') for d in book_dirs}
+    book_dirs.sort(key=lambda d: shared_from[d] is not None)
+    
     try:
         # Initialize filter
         print("🔧 Initializing AI filter...")
@@ -525,8 +677,16 @@ def filter_toc_step(screenshots_dir: str = "screenshots") -> Dict[str, Any]:
         total_toc_pages = 0
         total_analyzed = 0
         total_cost = 0.0
+        total_cache_hits = 0
         
         for i, book_dir in enumerate(book_dirs):
+            source = shared_from[book_dir]
+            if source and source in all_results and 'error' not in all_results[source]:
+                all_results[book_dir] = share_book_results(all_results[source], source, book_dir)
+                print(f"   ♻️ {book_dir}: {len(all_results[book_dir]['toc_pages'])}/"
+                      f"{all_results[book_dir]['total_screenshots']} pages are TOC (shared from {source}, $0.0000)")
+                continue
+            
             print(f"📖 Analyzing {book_dir} ({i + 1}/{len(book_dirs)})...")
             
             try:
@@ -541,13 +701,17 @@ def filter_toc_step(screenshots_dir: str = "screenshots") -> Dict[str, Any]:
                 # Update counters
                 book_toc_pages = len(book_results['toc_pages'])
                 book_total_pages = book_results['total_screenshots']
-                book_cost = book_total_pages * 0.00015
+                # Pages classified in an earlier run come from the cache at no cost
+                book_cache_hits = book_results.get('cache', {}).get('hits', 0)
+                book_cost = (book_total_pages - book_cache_hits) * 0.00015
                 
                 total_toc_pages += book_toc_pages
                 total_analyzed += book_total_pages
+                total_cache_hits += book_cache_hits
                 total_cost += book_cost
                 
-                print(f"   ✅ {book_dir}: {book_toc_pages}/{book_total_pages} pages are TOC (${book_cost:.4f})")
+                cached = f", {book_cache_hits} cached" if book_cache_hits else ""
+                print(f"   ✅ {book_dir}: {book_toc_pages}/{book_total_pages} pages are TOC (${book_cost:.4f}{cached})")
                 
                 if book_toc_pages > 0:
                     for page in book_results['toc_pages']:
@@ -570,6 +734,8 @@ def filter_toc_step(screenshots_dir: str = "screenshots") -> Dict[str, Any]:
                 'total_toc_pages_found': total_toc_pages,
                 'total_non_toc_pages': total_analyzed - total_toc_pages,
                 'confidence_threshold': CONFIDENCE_THRESHOLD,
+                'cache_hits': total_cache_hits,
+                'cache_hit_rate': round(total_cache_hits / total_analyzed, 3) if total_analyzed else 0.0,
                 'estimated_cost': total_cost
             }
         }
@@ -577,6 +743,7 @@ def filter_toc_step(screenshots_dir: str = "screenshots") -> Dict[str, Any]:
         print(f"\n📊 AI Analysis Summary:")
         print(f"   📚 Books analyzed: {len(book_dirs)}")
         print(f"   📄 Screenshots analyzed: {total_analyzed}")
+        print(f"   🗃️ From classification cache: {total_cache_hits}")
         print(f"   ✅ TOC pages found: {total_toc_pages}")
         print(f"   ❌ Non-TOC pages: {total_analyzed - total_toc_pages}")
         print(f"   💰 Total cost: ${total_cost:.4f}")
@@ -689,11 +856,11 @@ def display_final_summary(screenshot_results, filter_results):
             non_toc_dir = book_dir / "non_toc_pages"
             
             if toc_dir.exists():
-                toc_files = list(toc_dir.glob("*.png"))
+                toc_files = find_screenshots(toc_dir)
                 print(f"   📖 {book['name']} ({book['isbn']}):")
                 print(f"      ✅ TOC pages: {len(toc_files)} files in {toc_dir}")
                 if non_toc_dir.exists():
-                    non_toc_files = list(non_toc_dir.glob("*.png"))
+                    non_toc_files = find_screenshots(non_toc_dir)
                     print(f"      📄 Other pages: {len(non_toc_files)} files in {non_toc_dir}")
     
     print(f"\n📋 Next Steps:")
@@ -764,6 +931,15 @@ def main():
     print("Starting 3-step workflow...")
     print("="*60)
     
+    if STREAMING_MODE:
+        # Capture, filtering and organization overlap
+        screenshot_results, filter_results = streaming_capture_and_filter_step(BOOK_LIST, MAX_PAGES_PER_BOOK)
+        if not screenshot_results or not filter_results:
+            print("❌ Workflow stopped - streaming capture/filtering failed")
+            return
+        display_final_summary(screenshot_results, filter_results)
+        return
+    
     # Step 1: Capture screenshots
     screenshot_results = capture_screenshots_step(BOOK_LIST, MAX_PAGES_PER_BOOK)
     if not screenshot_results:
@@ -22,6 +22,7 @@ import time
 import argparse
 from pathlib import Path
 from toc_taxonomy_analyzer import TocTaxonomyAnalyzer, TaxonomyAnalysisError
+from filter_toc_screenshots import find_screenshots
 
 def show_configuration(tocs_dir_path: str):
     """Display current configuration and requirements."""
@@ -67,7 +68,7 @@ def show_configuration(tocs_dir_path: str):
     if tocs_dir.exists():
         total_images = 0
         for toc_dir in toc_dirs:
-            screenshots = list(toc_dir.glob("*.png"))
+            screenshots = find_screenshots(toc_dir)
             total_images += len(screenshots)
         
         estimated_cost = total_images * 0.0015  # Rough estimate for GPT-4 vision
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Tests for the Batch API Offline Mode
+====================================
+
+Runs the classification and taxonomy jobs end to end through
+ReplayBatchTransport: fixture books are written under tmp_path, requests go
+to JSONL files, the stand-in answers them and the results are ingested into
+the same structures as the online modes.
+
+Usage:
+    python -m pytest test_openai_batch.py
+"""
+
+import io
+import json
+import base64
+
+import pytest
+from PIL import Image
+
+from filter_toc_screenshots import TOCScreenshotFilter
+from openai_batch import BatchJob, BatchRunner, ReplayBatchTransport
+from toc_taxonomy_analyzer import TocTaxonomyAnalyzer
+
+
+TOC_COLOR = (200, 30, 30)
+PAGE_COLOR = (240, 240, 240)
+
+TAXONOMY_DIR = "toc_Mathematik_5_Mathe_live_978-3-12-720420-9"
+SECOND_TAXONOMY_DIR = "toc_Deutsch_6_Deutsch_kompetent_978-3-12-316302-9"
+
+
+@pytest.fixture(autouse=True)
+def api_key(monkeypatch):
+    # The clients are created, but every request is answered by the stand-in
+    monkeypatch.setenv('OPENAI_API_KEY', 'sk-test')
+    monkeypatch.delenv('OPENAI_RATE_LIMIT_DB', raising=False)
+
+
+def write_page(path, color):
+    Image.new('RGB', (60, 80), color).save(path)
+
+
+def write_book(directory, toc_pages, page_count):
+    """Write a book's screenshots; pages in toc_pages (1-based) are TOC pages."""
+    directory.mkdir(parents=True)
+    for page in range(1, page_count + 1):
+        write_page(directory / f"{directory.name}_page_{page:03d}.png",
+                   TOC_COLOR if page in toc_pages else PAGE_COLOR)
+
+
+@pytest.fixture
+def screenshots_dir(tmp_path):
+    screenshots = tmp_path / "screenshots"
+    write_book(screenshots / "978-3-12-316301-2", toc_pages={2, 3}, page_count=5)
+    write_book(screenshots / "978-3-12-720420-9", toc_pages={1}, page_count=4)
+    return screenshots
+
+
+def request_images(body):
+    """Decode the images of a chat completion request."""
+    images = []
+    for part in body['messages'][0]['content']:
+        if part['type'] == 'image_url':
+            data = part['image_url']['url'].split(',', 1)[1]
+            images.append(Image.open(io.BytesIO(base64.b64decode(data))).convert('RGB'))
+    return images
+
+
+def is_toc_image(image):
+    red, green, _ = image.getpixel((image.width // 2, image.height // 2))
+    return red > 150 and green < 100
+
+
+def classification_answer(custom_id, body):
+    """Answer a classification request the way the model would, from the page colors."""
+    images = request_images(body)
+    verdicts = [{'is_toc': is_toc_image(image), 'confidence': 0.9, 'reasoning': "fixture page"}
+                for image in images]
+    if len(images) == 1:
+        # Also how the model answers a multi-page prompt holding a single page
+        return json.dumps(verdicts[0])
+    return json.dumps({'pages': [dict(verdict, page=i) for i, verdict in enumerate(verdicts, 1)]})
+
+
+def page_numbers(pages):
+    return [page['page_number'] for page in pages]
+
+
+def new_filter(pages_per_request=1):
+    return TOCScreenshotFilter(pages_per_request=pages_per_request, classification_cache_file=None)
+
+
+@pytest.mark.parametrize('pages_per_request', [1, 3])
+def test_filter_offline_classifies_all_books(screenshots_dir, tmp_path, pages_per_request):
+    filter_tool = new_filter(pages_per_request)
+
+    results = filter_tool.filter_batch_directories_offline(
+        str(screenshots_dir), transport=ReplayBatchTransport(classification_answer),
+        batch_dir=str(tmp_path / "batches"), poll_interval=0)
+
+    first = results['processed_isbns']['978-3-12-316301-2']
+    second = results['processed_isbns']['978-3-12-720420-9']
+    assert page_numbers(first['toc_pages']) == [2, 3]
+    assert page_numbers(first['non_toc_pages']) == [1, 4, 5]
+    assert page_numbers(second['toc_pages']) == [1]
+    assert page_numbers(second['non_toc_pages']) == [2, 3, 4]
+
+    summary = results['summary']
+    expected_requests = 9 if pages_per_request == 1 else 4
+    assert summary['engine'] == 'batch_api'
+    assert summary['api_calls'] == expected_requests
+    assert summary['total_toc_pages_found'] == 3
+    assert summary['batch_api']['requests'] == expected_requests
+    assert summary['batch_api']['failed_requests'] == 0
+    assert [batch['status'] for batch in summary['batch_api']['batches']] == ['completed']
+    with open(summary['batch_api']['output_file'], encoding='utf-8') as f:
+        assert sum(1 for line in f if line.strip()) == expected_requests
+
+
+def test_filter_offline_records_missing_responses_as_failed_pages(screenshots_dir, tmp_path):
+    def answer(custom_id, body):
+        # The stand-in sends requests without an answer to the error file
+        return None if custom_id == 'toc-000002' else classification_answer(custom_id, body)
+
+    filter_tool = new_filter()
+    results = filter_tool.filter_batch_directories_offline(
+        str(screenshots_dir), transport=ReplayBatchTransport(answer),
+        batch_dir=str(tmp_path / "batches"), poll_interval=0)
+
+    failed = [page for book in results['processed_isbns'].values() for page in book['non_toc_pages']
+              if page['reasoning'].startswith("Analysis failed")]
+    assert len(failed) == 1
+    assert "No canned response for toc-000002" in failed[0]['reasoning']
+    assert results['summary']['batch_api']['failed_requests'] == 1
+    assert results['summary']['total_toc_pages_found'] + results['summary']['total_non_toc_pages'] == 9
+
+
+class ExpiringBatchTransport(ReplayBatchTransport):
+    """Stand-in whose batches run out of their completion window without answers."""
+
+    def _complete(self, batch):
+        batch['status'] = 'expired'
+
+
+def test_filter_offline_reports_batches_that_did_not_complete(screenshots_dir, tmp_path):
+    filter_tool = new_filter()
+
+    results = filter_tool.filter_batch_directories_offline(
+        str(screenshots_dir), transport=ExpiringBatchTransport(classification_answer),
+        batch_dir=str(tmp_path / "batches"), poll_interval=0)
+
+    batch_api = results['summary']['batch_api']
+    assert [batch['status'] for batch in batch_api['batches']] == ['expired']
+    assert batch_api['failed_requests'] == batch_api['requests'] == 9
+    assert results['summary']['total_toc_pages_found'] == 0
+    for book in results['processed_isbns'].values():
+        assert all("expired" in page['reasoning'] for page in book['non_toc_pages'])
+
+
+def test_collect_classification_batch_resumes_from_manifest(screenshots_dir, tmp_path):
+    transport = ReplayBatchTransport(classification_answer, polls_until_complete=2)
+    job = new_filter(pages_per_request=3).write_classification_batch(str(screenshots_dir),
+                                                                     batch_dir=str(tmp_path / "batches"))
+    BatchRunner(transport, poll_interval=0).submit(job)
+
+    # Another process picks the job up from its manifest
+    results = new_filter(pages_per_request=3).collect_classification_batch(
+        str(job.manifest_path), transport=transport, poll_interval=0)
+
+    assert page_numbers(results['processed_isbns']['978-3-12-316301-2']['toc_pages']) == [2, 3]
+    assert page_numbers(results['processed_isbns']['978-3-12-720420-9']['toc_pages']) == [1]
+    assert results['summary']['batch_api']['failed_requests'] == 0
+    manifest = BatchJob(job.manifest_path).manifest
+    assert [batch['status'] for batch in manifest['batches']] == ['completed']
+
+
+@pytest.fixture
+def tocs_dir(tmp_path):
+    tocs = tmp_path / "tocs"
+    for name in (TAXONOMY_DIR, SECOND_TAXONOMY_DIR):
+        book = tocs / name
+        book.mkdir(parents=True)
+        write_page(book / f"{name}_page_001.png", TOC_COLOR)
+        write_page(book / f"{name}_page_002.png", TOC_COLOR)
+    return tocs
+
+
+def taxonomy_answer(custom_id, body):
+    """Answer a taxonomy request with a minimal valid taxonomy."""
+    return json.dumps({
+        'country': "DE", 'grade': "5", 'subject': "Mathematics", 'ISBN': custom_id,
+        'taxonomy': [
+            {'name': "Zahlen", 'level': 0, 'keyterms': ["Zahl"], 'children': [
+                {'name': "Brüche", 'level': 1, 'keyterms': ["Bruch"], 'children': []}
+            ]}
+        ]
+    })
+
+
+def new_analyzer():
+    return TocTaxonomyAnalyzer()
+
+
+def test_taxonomy_offline_writes_taxonomy_files(tocs_dir, tmp_path):
+    output_dir = tmp_path / "taxonomies"
+
+    results = new_analyzer().process_all_toc_directories_offline(
+        str(tocs_dir), output_dir=str(output_dir), transport=ReplayBatchTransport(taxonomy_answer),
+        batch_dir=str(tmp_path / "batches"), poll_interval=0)
+
+    assert results['summary']['successful'] == 2
+    assert results['summary']['total_topics_extracted'] == 4
+    assert results['summary']['batch_api']['requests'] == 2
+    assert results['summary']['batch_api']['failed_requests'] == 0
+    taxonomy_file = output_dir / "taxonomy_DE_5_Mathematics_978-3-12-720420-9.json"
+    assert results['processed_books'][TAXONOMY_DIR]['output_file'] == str(taxonomy_file)
+    with open(taxonomy_file, encoding='utf-8') as f:
+        assert json.load(f)['taxonomy'][0]['children'][0]['name'] == "Brüche"
+    assert (output_dir / "taxonomy_DE_6_German Language_978-3-12-316302-9.json").exists()
+    assert (output_dir / "processing_report.json").exists()
+
+
+def test_taxonomy_offline_records_missing_responses_as_failed_books(tocs_dir, tmp_path):
+    output_dir = tmp_path / "taxonomies"
+    analyzer = new_analyzer()
+    job = analyzer.write_taxonomy_batch(str(tocs_dir), batch_dir=str(tmp_path / "batches"))
+    unanswered = job.context['books'][SECOND_TAXONOMY_DIR]['custom_id']
+
+    def answer(custom_id, body):
+        return None if custom_id == unanswered else taxonomy_answer(custom_id, body)
+
+    results = analyzer.ingest_taxonomy_batch(
+        job, BatchRunner(ReplayBatchTransport(answer), poll_interval=0).run(job), str(output_dir))
+
+    assert list(results['processed_books']) == [TAXONOMY_DIR]
+    assert f"No canned response for {unanswered}" in results['failed_books'][SECOND_TAXONOMY_DIR]['error']
+    assert results['summary']['failed'] == 1
+    assert results['summary']['batch_api']['failed_requests'] == 1
+    assert sorted(path.name for path in output_dir.glob("taxonomy_*.json")) == [
+        "taxonomy_DE_5_Mathematics_978-3-12-720420-9.json"
+    ]
+
+
+def test_taxonomy_offline_reports_batches_that_did_not_complete(tocs_dir, tmp_path):
+    output_dir = tmp_path / "taxonomies"
+
+    results = new_analyzer().process_all_toc_directories_offline(
+        str(tocs_dir), output_dir=str(output_dir), transport=ExpiringBatchTransport(taxonomy_answer),
+        batch_dir=str(tmp_path / "batches"), poll_interval=0)
+
+    assert results['summary']['successful'] == 0
+    assert results['summary']['failed'] == 2
+    assert [batch['status'] for batch in results['summary']['batch_api']['batches']] == ['expired']
+    assert not list(output_dir.glob("taxonomy_*.json"))
+
+
+def test_collect_taxonomy_batch_resumes_from_manifest(tocs_dir, tmp_path):
+    output_dir = tmp_path / "taxonomies"
+    transport = ReplayBatchTransport(taxonomy_answer, polls_until_complete=2)
+    job = new_analyzer().write_taxonomy_batch(str(tocs_dir), batch_dir=str(tmp_path / "batches"))
+    BatchRunner(transport, poll_interval=0).submit(job)
+
+    # Another process picks the job up from its manifest
+    results = new_analyzer().collect_taxonomy_batch(str(job.manifest_path), output_dir=str(output_dir),
+                                                    transport=transport, poll_interval=0)
+
+    assert results['summary']['successful'] == 2
+    assert (output_dir / "taxonomy_DE_5_Mathematics_978-3-12-720420-9.json").exists()
+    assert [batch['status'] for batch in BatchJob(job.manifest_path).manifest['batches']] == ['completed']
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Tests for the GCRA Rate Limiter
+===============================
+
+Runs RateLimiter and SharedRateLimiter on a fake clock, so the spacing of
+reservations can be checked exactly and without sleeping.
+
+Usage:
+    python -m pytest test_rate_limiter.py
+"""
+
+import pytest
+
+import rate_limiter
+from rate_limiter import RateLimiter, SharedRateLimiter
+
+
+class FakeClock:
+    """Stand-in for the time module: monotonic and wall time advance only through sleep."""
+
+    def __init__(self, start: float = 1000.0):
+        self.now = start
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter, 'time', fake)
+    return fake
+
+
+def max_calls_in_rolling_minute(start_times):
+    """Largest number of start times falling into any half-open 60 s window."""
+    start_times = sorted(start_times)
+    return max(sum(1 for t in start_times if first <= t < first + 60.0) for first in start_times)
+
+
+def test_reserve_spaces_calls_evenly_without_burst(clock):
+    limiter = RateLimiter(max_calls_per_minute=30)
+
+    delays = [limiter.reserve() for _ in range(5)]
+
+    assert delays == pytest.approx([0.0, 2.0, 4.0, 6.0, 8.0])
+
+
+def test_reserve_never_exceeds_calls_per_minute(clock):
+    limiter = RateLimiter(max_calls_per_minute=30)
+
+    # 100 callers arriving at once, as a thread pool would after an idle period
+    start_times = [clock.now + limiter.reserve() for _ in range(100)]
+
+    assert max_calls_in_rolling_minute(start_times) == 30
+
+
+def test_acquire_holds_steady_callers_to_calls_per_minute(clock):
+    limiter = RateLimiter(max_calls_per_minute=30)
+
+    start_times = []
+    for _ in range(90):
+        limiter.acquire()
+        start_times.append(clock.now)
+        clock.now += 0.1  # caller's own work between calls
+
+    assert max_calls_in_rolling_minute(start_times) <= 30
+    assert start_times[-1] - start_times[0] == pytest.approx(89 * 2.0)
+
+
+def test_acquire_sleeps_the_reserved_delay(clock):
+    limiter = RateLimiter(max_calls_per_minute=60)
+
+    assert limiter.acquire() == 0.0
+    assert limiter.acquire() == pytest.approx(1.0)
+    assert clock.sleeps == pytest.approx([1.0])
+    assert limiter.snapshot()['waited_calls'] == 1
+
+
+def test_idle_period_restores_the_budget(clock):
+    limiter = RateLimiter(max_calls_per_minute=30)
+    for _ in range(3):
+        limiter.acquire()
+
+    clock.now += 120.0
+
+    assert limiter.reserve() == 0.0
+
+
+def test_burst_is_opt_in(clock):
+    limiter = RateLimiter(max_calls_per_minute=30, burst_seconds=10.0)
+
+    delays = [limiter.reserve() for _ in range(7)]
+
+    # 10 s of a 2 s interval: five calls at once, then the regular spacing
+    assert delays[:5] == pytest.approx([0.0] * 5)
+    assert delays[5:] == pytest.approx([2.0, 4.0])
+
+
+def test_tokens_per_minute_budget(clock):
+    limiter = RateLimiter(max_calls_per_minute=600, max_tokens_per_minute=6000)
+
+    assert limiter.reserve(tokens=3000) == 0.0
+    # 3000 tokens at 100 tokens/s must drain before the next call
+    assert limiter.reserve(tokens=100) == pytest.approx(30.0)
+
+
+def test_record_usage_corrects_the_token_budget(clock):
+    limiter = RateLimiter(max_calls_per_minute=600, max_tokens_per_minute=6000)
+
+    limiter.reserve(tokens=3000)
+    limiter.record_usage(estimated_tokens=3000, actual_tokens=1000)
+
+    assert limiter.reserve(tokens=100) == pytest.approx(10.0)
+    assert limiter.snapshot()['tokens'] == 1100
+
+
+def test_no_calls_budget_leaves_only_the_token_budget(clock):
+    limiter = RateLimiter(max_calls_per_minute=None, max_tokens_per_minute=6000)
+
+    assert [limiter.reserve() for _ in range(50)] == [0.0] * 50
+    assert limiter.reserve(tokens=3000) == 0.0
+    assert limiter.reserve(tokens=100) == pytest.approx(30.0)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'max_calls_per_minute': 0},
+    {'max_calls_per_minute': 30, 'max_tokens_per_minute': 0},
+    {'max_calls_per_minute': 30, 'burst_seconds': -1.0},
+])
+def test_invalid_limits_are_rejected(kwargs):
+    with pytest.raises(ValueError):
+        RateLimiter(**kwargs)
+
+
+def test_shared_limiter_instances_draw_from_one_bucket(clock, tmp_path):
+    db_path = tmp_path / "rate_limit.sqlite3"
+    first = SharedRateLimiter(max_calls_per_minute=30, db_path=str(db_path))
+    second = SharedRateLimiter(max_calls_per_minute=30, db_path=str(db_path))
+
+    delays = [first.reserve(), second.reserve(), first.reserve()]
+
+    assert delays == pytest.approx([0.0, 2.0, 4.0])
@@ -46,6 +46,10 @@ except ImportError:
     print("❌ Pillow library not found. Install with: pip install Pillow")
     exit(1)
 
+from filter_toc_screenshots import find_screenshots, IMAGE_MIME_TYPES
+from rate_limiter import RateLimiter, RATE_LIMIT_DB_ENV, DEFAULT_MAX_CALLS_PER_MINUTE, create_rate_limiter, estimate_tokens
+from openai_batch import BatchAPIError, BatchJob, BatchRunner, OpenAIBatchTransport
+
 
 @dataclass
 class BookMetadata:
@@ -68,15 +72,29 @@ class TocTaxonomyAnalyzer:
     Analyzes TOC screenshots to create detailed educational taxonomies.
     """
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4.1"):
+    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4.1",
+                 rate_limiter: Optional[RateLimiter] = None, max_calls_per_minute: Optional[int] = None,
+                 max_tokens_per_minute: Optional[int] = None, shared_rate_limit_db: Optional[str] = None):
         """
         Initialize the taxonomy analyzer.
         
         Args:
             api_key: OpenAI API key (will try to get from environment if not provided)
             model: OpenAI model to use (default: gpt-4.1 for best vision analysis)
+            rate_limiter: Limiter shared with other clients of the same API account
+                (e.g. a TOCScreenshotFilter); overrides the limits below
+            max_calls_per_minute: Maximum API calls per minute (None: unlimited, unless
+                a shared database is configured)
+            max_tokens_per_minute: Maximum tokens per minute (None: only calls are limited)
+            shared_rate_limit_db: SQLite file through which all processes on this host
+                share the limits (default: $OPENAI_RATE_LIMIT_DB)
         """
         self.model = model
+        shared_rate_limit_db = shared_rate_limit_db or os.getenv(RATE_LIMIT_DB_ENV)
+        if rate_limiter is None and (max_calls_per_minute or shared_rate_limit_db):
+            rate_limiter = create_rate_limiter(max_calls_per_minute or DEFAULT_MAX_CALLS_PER_MINUTE,
+                                               max_tokens_per_minute, shared_db=shared_rate_limit_db)
+        self.rate_limiter = rate_limiter
         self.setup_logging()
         
         # Initialize OpenAI client
@@ -224,30 +242,29 @@ class TocTaxonomyAnalyzer:
         except Exception as e:
             raise TaxonomyAnalysisError(f"Failed to encode image {image_path}: {e}")
     
-    def analyze_toc_images(self, toc_dir: str, metadata: BookMetadata, max_depth: int = 3) -> Dict[str, Any]:
+    def build_taxonomy_request(self, toc_dir: str, metadata: BookMetadata, max_depth: int = 3,
+                               detail: str = "high") -> Tuple[Dict[str, Any], int]:
         """
-        Analyze all TOC images in a directory to create a detailed taxonomy.
+        Build the chat completion parameters for analyzing a book's TOC images.
         
         Args:
             toc_dir: Path to directory containing TOC screenshots
             metadata: Book metadata
             max_depth: Maximum taxonomy depth levels
+            detail: Image detail level ("high", or "low" to save context)
             
         Returns:
-            Complete taxonomy structure according to REQUIREMENTS.md format
+            Tuple of (keyword arguments for client.chat.completions.create, number of images)
         """
         toc_path = Path(toc_dir)
         if not toc_path.exists():
             raise TaxonomyAnalysisError(f"TOC directory not found: {toc_dir}")
         
-        # Find all PNG screenshots
-        screenshots = list(toc_path.glob("*.png"))
+        # Find all screenshots (sorted by page number via filename)
+        screenshots = find_screenshots(toc_path)
         if not screenshots:
             raise TaxonomyAnalysisError(f"No screenshots found in {toc_dir}")
         
-        # Sort screenshots by page number
-        screenshots.sort(key=lambda x: x.name)
-        
         self.logger.info(f"Analyzing {len(screenshots)} TOC screenshots for {metadata.subject} Grade {metadata.grade}")
         
         # Encode all images
@@ -257,7 +274,8 @@ class TocTaxonomyAnalyzer:
                 encoded_image = self.encode_image(str(screenshot))
                 encoded_images.append({
                     'filename': screenshot.name,
-                    'data': encoded_image
+                    'data': encoded_image,
+                    'mime_type': IMAGE_MIME_TYPES[screenshot.suffix.lower()]
                 })
             except Exception as e:
                 self.logger.warning(f"Failed to encode {screenshot.name}: {e}")
@@ -279,87 +297,125 @@ class TocTaxonomyAnalyzer:
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/png;base64,{img['data']}",
-                            "detail": "high"
+                            "url": f"data:{img['mime_type']};base64,{img['data']}",
+                            "detail": detail
                         }
                     } for img in encoded_images
                 ]
             }
         ]
         
+        request = {
+            'model': self.model,
+            'messages': messages,
+            # No max_tokens limit - let the model generate complete taxonomies
+            'temperature': 0.0  # Low temperature for consistent taxonomies
+        }
+        return request, len(encoded_images)
+    
+    def analyze_toc_images(self, toc_dir: str, metadata: BookMetadata, max_depth: int = 3) -> Dict[str, Any]:
+        """
+        Analyze all TOC images in a directory to create a detailed taxonomy.
+        
+        Args:
+            toc_dir: Path to directory containing TOC screenshots
+            metadata: Book metadata
+            max_depth: Maximum taxonomy depth levels
+            
+        Returns:
+            Complete taxonomy structure according to REQUIREMENTS.md format
+        """
+        request, image_count = self.build_taxonomy_request(toc_dir, metadata, max_depth)
+        
         try:
-            self.logger.info(f"Sending {len(encoded_images)} images to GPT-4 for taxonomy analysis...")
+            self.logger.info(f"Sending {image_count} images to GPT-4 for taxonomy analysis...")
+            
+            # Taxonomies are long: budget for a generous completion until the real usage is known
+            prompt = request['messages'][0]['content'][0]['text']
+            estimated_tokens = estimate_tokens(prompt, images=image_count, max_output_tokens=4000)
             
             # Allow full output generation without token restrictions
             try:
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=messages,
-                    # No max_tokens limit - let the model generate complete taxonomies
-                    temperature=0.0  # Low temperature for consistent taxonomies
-                )
+                self._wait_for_rate_limit(estimated_tokens)
+                response = self.client.chat.completions.create(**request)
             except Exception as e:
                 if "maximum context length" in str(e).lower():
                     # If context is too large, try with fewer images or smaller detail
                     self.logger.warning("Context length exceeded - retrying with reduced detail")
                     # Retry with standard detail instead of high detail
-                    messages[0]["content"] = [
-                        {"type": "text", "text": prompt}
-                    ] + [
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/png;base64,{img['data']}",
-                                "detail": "low"  # Reduced detail to save context
-                            }
-                        } for img in encoded_images
-                    ]
-                    response = self.client.chat.completions.create(
-                        model=self.model,
-                        messages=messages,
-                        temperature=0.0
-                    )
+                    for part in request['messages'][0]['content']:
+                        if part['type'] == 'image_url':
+                            part['image_url']['detail'] = "low"  # Reduced detail to save context
+                    self._wait_for_rate_limit(estimated_tokens)
+                    response = self.client.chat.completions.create(**request)
                 else:
                     raise
             
-            content = response.choices[0].message.content.strip()
+            if self.rate_limiter:
+                usage = getattr(response, 'usage', None)
+                self.rate_limiter.record_usage(estimated_tokens, getattr(usage, 'total_tokens', None))
             
-            # Log response details to detect potential truncation
-            self.logger.info(f"Received response: {len(content)} characters")
-            if response.choices[0].finish_reason != "stop":
-                self.logger.warning(f"Response may be truncated - finish_reason: {response.choices[0].finish_reason}")
-            
-            # Parse the JSON response with enhanced error handling
-            try:
-                # Clean up the response
-                cleaned_content = self._clean_json_response(content)
-                
-                taxonomy_data = json.loads(cleaned_content)
-                
-                # Validate the structure
-                self._validate_taxonomy_structure(taxonomy_data)
-                
-                topic_count = self._count_topics(taxonomy_data.get('taxonomy', []))
-                self.logger.info(f"Successfully analyzed taxonomy with {len(taxonomy_data.get('taxonomy', []))} top-level topics, {topic_count} total topics")
-                return taxonomy_data
-                
-            except (json.JSONDecodeError, ValueError) as e:
-                self.logger.error(f"Failed to parse taxonomy JSON: {e}")
-                self.logger.error(f"Raw response length: {len(content)} chars")
-                self.logger.debug(f"Raw response: {content}")
-                
-                # Try to repair the JSON
-                repaired_data = self._attempt_json_repair(content, metadata)
-                if repaired_data:
-                    self.logger.warning("Used fallback JSON repair - results may be incomplete")
-                    return repaired_data
-                
-                raise TaxonomyAnalysisError(f"Invalid JSON response from AI: {e}")
+            return self.parse_taxonomy_response(response.choices[0].message.content,
+                                                response.choices[0].finish_reason, metadata)
                 
         except Exception as e:
             self.logger.error(f"Failed to analyze TOC images: {e}")
             raise TaxonomyAnalysisError(f"AI analysis failed: {e}")
     
+    def parse_taxonomy_response(self, content: str, finish_reason: Optional[str],
+                                metadata: BookMetadata) -> Dict[str, Any]:
+        """
+        Parse and validate the model's taxonomy answer, repairing truncated JSON if possible.
+        
+        Args:
+            content: Message content returned by the model
+            finish_reason: Finish reason of the completion ("stop" unless truncated)
+            metadata: Book metadata (used for repaired taxonomies)
+            
+        Returns:
+            Complete taxonomy structure according to REQUIREMENTS.md format
+        """
+        content = content.strip()
+        
+        # Log response details to detect potential truncation
+        self.logger.info(f"Received response: {len(content)} characters")
+        if finish_reason != "stop":
+            self.logger.warning(f"Response may be truncated - finish_reason: {finish_reason}")
+        
+        # Parse the JSON response with enhanced error handling
+        try:
+            # Clean up the response
+            cleaned_content = self._clean_json_response(content)
+            
+            taxonomy_data = json.loads(cleaned_content)
+            
+            # Validate the structure
+            self._validate_taxonomy_structure(taxonomy_data)
+            
+            topic_count = self._count_topics(taxonomy_data.get('taxonomy', []))
+            self.logger.info(f"Successfully analyzed taxonomy with {len(taxonomy_data.get('taxonomy', []))} top-level topics, {topic_count} total topics")
+            return taxonomy_data
+            
+        except (json.JSONDecodeError, ValueError) as e:
+            self.logger.error(f"Failed to parse taxonomy JSON: {e}")
+            self.logger.error(f"Raw response length: {len(content)} chars")
+            self.logger.debug(f"Raw response: {content}")
+            
+            # Try to repair the JSON
+            repaired_data = self._attempt_json_repair(content, metadata)
+            if repaired_data:
+                self.logger.warning("Used fallback JSON repair - results may be incomplete")
+                return repaired_data
+            
+            raise TaxonomyAnalysisError(f"Invalid JSON response from AI: {e}")
+    
+    def _wait_for_rate_limit(self, estimated_tokens: int) -> None:
+        """Wait for the shared rate limiter, if one is configured."""
+        if self.rate_limiter:
+            waited = self.rate_limiter.acquire(estimated_tokens)
+            if waited > 0:
+                self.logger.info(f"Rate limit: waited {waited:.1f}s before the API call")
+    
     def _create_analysis_prompt(self, metadata: BookMetadata, max_depth: int) -> str:
         """Create detailed analysis prompt for GPT-4."""
         return f"""
@@ -462,30 +518,13 @@ You are an educational taxonomy generator. Analyze table of contents images and
         Returns:
             Summary of processing results
         """
-        tocs_path = Path(tocs_dir)
-        if not tocs_path.exists():
-            raise TaxonomyAnalysisError(f"TOCs directory not found: {tocs_dir}")
-        
+        toc_dirs = self._find_toc_directories(tocs_dir)
         output_path = Path(output_dir)
         output_path.mkdir(exist_ok=True)
         
-        # Find all TOC directories
-        toc_dirs = [d for d in tocs_path.iterdir() if d.is_dir()]
-        if not toc_dirs:
-            raise TaxonomyAnalysisError(f"No TOC directories found in {tocs_dir}")
-        
         self.logger.info(f"Found {len(toc_dirs)} TOC directories to process")
         
-        results = {
-            'processed_books': {},
-            'failed_books': {},
-            'summary': {
-                'total_books': len(toc_dirs),
-                'successful': 0,
-                'failed': 0,
-                'total_topics_extracted': 0
-            }
-        }
+        results = self._new_processing_results(len(toc_dirs))
         
         for i, toc_dir in enumerate(toc_dirs, 1):
             dir_name = toc_dir.name
@@ -498,39 +537,78 @@ You are an educational taxonomy generator. Analyze table of contents images and
                 # Analyze TOC images
                 taxonomy_data = self.analyze_toc_images(str(toc_dir), metadata, max_depth)
                 
-                # Save taxonomy to file
-                output_filename = f"taxonomy_{metadata.country}_{metadata.grade}_{metadata.subject}_{metadata.isbn}.json"
-                output_file = output_path / output_filename
-                
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(taxonomy_data, f, indent=2, ensure_ascii=False)
-                
-                # Track results
-                topic_count = self._count_topics(taxonomy_data['taxonomy'])
-                results['processed_books'][dir_name] = {
-                    'metadata': metadata.__dict__,
-                    'output_file': str(output_file),
-                    'topic_count': topic_count,
-                    'success': True
-                }
-                
-                results['summary']['successful'] += 1
-                results['summary']['total_topics_extracted'] += topic_count
-                
-                self.logger.info(f"✅ {dir_name}: {topic_count} topics extracted → {output_filename}")
+                self._save_taxonomy(results, dir_name, metadata, taxonomy_data, output_path)
                 
                 # Small delay to avoid overwhelming the API
                 time.sleep(1)
                 
             except Exception as e:
-                self.logger.error(f"❌ {dir_name}: Failed - {e}")
-                results['failed_books'][dir_name] = {
-                    'error': str(e),
-                    'error_type': type(e).__name__
-                }
-                results['summary']['failed'] += 1
+                self._record_failure(results, dir_name, e)
+        
+        self._save_processing_report(results, output_path)
+        return results
+    
+    def _find_toc_directories(self, tocs_dir: str) -> List[Path]:
+        """Find the book directories below a TOCs directory."""
+        tocs_path = Path(tocs_dir)
+        if not tocs_path.exists():
+            raise TaxonomyAnalysisError(f"TOCs directory not found: {tocs_dir}")
         
-        # Save processing report
+        # Find all TOC directories
+        toc_dirs = [d for d in tocs_path.iterdir() if d.is_dir()]
+        if not toc_dirs:
+            raise TaxonomyAnalysisError(f"No TOC directories found in {tocs_dir}")
+        return toc_dirs
+    
+    @staticmethod
+    def _new_processing_results(total_books: int) -> Dict[str, Any]:
+        """Create the results structure of a multi-book run."""
+        return {
+            'processed_books': {},
+            'failed_books': {},
+            'summary': {
+                'total_books': total_books,
+                'successful': 0,
+                'failed': 0,
+                'total_topics_extracted': 0
+            }
+        }
+    
+    def _save_taxonomy(self, results: Dict[str, Any], dir_name: str, metadata: BookMetadata,
+                       taxonomy_data: Dict[str, Any], output_path: Path) -> None:
+        """Save a book's taxonomy to its JSON file and record it in the run results."""
+        # Save taxonomy to file
+        output_filename = f"taxonomy_{metadata.country}_{metadata.grade}_{metadata.subject}_{metadata.isbn}.json"
+        output_file = output_path / output_filename
+        
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(taxonomy_data, f, indent=2, ensure_ascii=False)
+        
+        # Track results
+        topic_count = self._count_topics(taxonomy_data['taxonomy'])
+        results['processed_books'][dir_name] = {
+            'metadata': metadata.__dict__,
+            'output_file': str(output_file),
+            'topic_count': topic_count,
+            'success': True
+        }
+        
+        results['summary']['successful'] += 1
+        results['summary']['total_topics_extracted'] += topic_count
+        
+        self.logger.info(f"✅ {dir_name}: {topic_count} topics extracted → {output_filename}")
+    
+    def _record_failure(self, results: Dict[str, Any], dir_name: str, error: Exception) -> None:
+        """Record a book whose taxonomy could not be created in the run results."""
+        self.logger.error(f"❌ {dir_name}: Failed - {error}")
+        results['failed_books'][dir_name] = {
+            'error': str(error),
+            'error_type': type(error).__name__
+        }
+        results['summary']['failed'] += 1
+    
+    def _save_processing_report(self, results: Dict[str, Any], output_path: Path) -> None:
+        """Save the processing report of a multi-book run."""
         report_file = output_path / "processing_report.json"
         with open(report_file, 'w', encoding='utf-8') as f:
             json.dump(results, f, indent=2, ensure_ascii=False)
@@ -538,8 +616,130 @@ You are an educational taxonomy generator. Analyze table of contents images and
         self.logger.info(f"Processing complete: {results['summary']['successful']}/{results['summary']['total_books']} successful")
         self.logger.info(f"Total topics extracted: {results['summary']['total_topics_extracted']}")
         self.logger.info(f"Report saved: {report_file}")
+    
+    def write_taxonomy_batch(self, tocs_dir: str = "tocs", max_depth: int = 3,
+                             batch_dir: str = "batches") -> BatchJob:
+        """
+        Write one taxonomy request per TOC directory to Batch API JSONL files.
         
-        return results
+        Books whose metadata or images cannot be read are recorded as failed in the
+        job manifest instead of getting a request.
+        
+        Args:
+            tocs_dir: Directory containing all TOC subdirectories
+            max_depth: Maximum taxonomy depth
+            batch_dir: Directory for the request files and the job manifest
+            
+        Returns:
+            The job, ready for BatchRunner.submit
+        """
+        toc_dirs = self._find_toc_directories(tocs_dir)
+        context: Dict[str, Any] = {'kind': 'toc_taxonomy', 'model': self.model, 'max_depth': max_depth, 'books': {}}
+        
+        def requests():
+            # Filled in while the requests are written, so only one book's images are in memory
+            for i, toc_dir in enumerate(toc_dirs, 1):
+                try:
+                    metadata = self.parse_directory_name(toc_dir.name)
+                    request, _ = self.build_taxonomy_request(str(toc_dir), metadata, max_depth)
+                except Exception as e:
+                    self.logger.error(f"❌ {toc_dir.name}: Failed - {e}")
+                    context['books'][toc_dir.name] = {'error': str(e), 'error_type': type(e).__name__}
+                    continue
+                custom_id = f"taxonomy-{i:05d}"
+                context['books'][toc_dir.name] = {'custom_id': custom_id}
+                yield {'custom_id': custom_id, 'body': request}
+        
+        job = BatchJob.create(requests(), name="toc_taxonomy", batch_dir=batch_dir, context=context)
+        self.logger.info(f"📝 Batch job written: {job.manifest['request_count']} taxonomy requests → {job.manifest_path}")
+        return job
+    
+    def ingest_taxonomy_batch(self, job: BatchJob, results: Dict[str, Dict[str, Any]],
+                              output_dir: str = "taxonomies") -> Dict[str, Any]:
+        """
+        Parse Batch API taxonomy answers and save them like process_all_toc_directories.
+        
+        Args:
+            job: Job written by write_taxonomy_batch
+            results: Results by custom_id from BatchRunner.collect
+            output_dir: Directory to save taxonomy JSON files
+            
+        Returns:
+            Summary of processing results (as process_all_toc_directories)
+        """
+        context = job.context
+        if context.get('kind') != 'toc_taxonomy':
+            raise TaxonomyAnalysisError(f"Not a taxonomy job: {job.manifest_path}")
+        
+        output_path = Path(output_dir)
+        output_path.mkdir(exist_ok=True)
+        processing_results = self._new_processing_results(len(context['books']))
+        
+        for dir_name, book in context['books'].items():
+            if 'error' in book:
+                processing_results['failed_books'][dir_name] = dict(book)
+                processing_results['summary']['failed'] += 1
+                continue
+            try:
+                metadata = self.parse_directory_name(dir_name)
+                output = results.get(book['custom_id'])
+                if output is None or 'error' in output:
+                    raise BatchAPIError(output['error'] if output else "No result for request")
+                taxonomy_data = self.parse_taxonomy_response(output['content'], output.get('finish_reason'), metadata)
+                self._save_taxonomy(processing_results, dir_name, metadata, taxonomy_data, output_path)
+            except Exception as e:
+                self._record_failure(processing_results, dir_name, e)
+        
+        processing_results['summary']['batch_api'] = job.summary(results)
+        self._save_processing_report(processing_results, output_path)
+        return processing_results
+    
+    def collect_taxonomy_batch(self, manifest_path: str, output_dir: str = "taxonomies",
+                               transport: Optional[Any] = None, poll_interval: float = 60.0) -> Dict[str, Any]:
+        """
+        Wait for a submitted taxonomy job (e.g. from an earlier process) and ingest it.
+        
+        Args:
+            manifest_path: Manifest of the job
+            output_dir: Directory to save taxonomy JSON files
+            transport: Batch transport (default: the OpenAI Batch API with this analyzer's client)
+            poll_interval: Seconds between status checks
+            
+        Returns:
+            Summary of processing results (as process_all_toc_directories)
+        """
+        job = BatchJob(manifest_path)
+        runner = BatchRunner(transport or OpenAIBatchTransport(self.client), poll_interval=poll_interval)
+        return self.ingest_taxonomy_batch(job, runner.collect(job), output_dir)
+    
+    def process_all_toc_directories_offline(self, tocs_dir: str = "tocs", output_dir: str = "taxonomies",
+                                            max_depth: int = 3, transport: Optional[Any] = None,
+                                            batch_dir: str = "batches", poll_interval: float = 60.0) -> Dict[str, Any]:
+        """
+        Generate taxonomies for all TOC directories through the Batch API: write, submit, poll and ingest.
+        
+        Lower cost per call and no per-minute limits, with results within 24 hours.
+        Unlike analyze_toc_images, a request rejected for its context length is not
+        retried at low image detail; the book is reported as failed.
+        
+        Args:
+            tocs_dir: Directory containing all TOC subdirectories
+            output_dir: Directory to save taxonomy JSON files
+            max_depth: Maximum taxonomy depth
+            transport: Batch transport (default: the OpenAI Batch API with this analyzer's client;
+                openai_batch.ReplayBatchTransport for offline tests)
+            batch_dir: Directory for request files, manifest and downloaded output
+            poll_interval: Seconds between status checks
+            
+        Returns:
+            Summary of processing results (as process_all_toc_directories)
+        """
+        job = self.write_taxonomy_batch(tocs_dir, max_depth, batch_dir)
+        results: Dict[str, Dict[str, Any]] = {}
+        if job.manifest['request_count']:
+            runner = BatchRunner(transport or OpenAIBatchTransport(self.client), poll_interval=poll_interval)
+            results = runner.run(job)
+        return self.ingest_taxonomy_batch(job, results, output_dir)
     
     def _clean_json_response(self, content: str) -> str:
         """Clean and prepare JSON response for parsing."""
@@ -674,9 +874,12 @@ def main():
         except ValueError:
             max_depth = 3
         
+        use_batch_api = input("Use the Batch API (offline, lower cost, results within 24 hours)? (y/N): ").strip().lower() == 'y'
+        
         print(f"\n📊 Configuration:")
         print(f"   • Model: {analyzer.model}")
         print(f"   • Max depth: {max_depth} levels")
+        print(f"   • Mode: {'Batch API' if use_batch_api else 'Interactive'}")
         print(f"   • Output: taxonomies/ directory")
         print()
         
@@ -684,7 +887,11 @@ def main():
         print("🚀 Starting batch taxonomy analysis...")
         start_time = time.time()
         
-        results = analyzer.process_all_toc_directories(max_depth=max_depth)
+        if use_batch_api:
+            print("📤 Submitting to the Batch API and waiting for the results (polling every minute)...")
+            results = analyzer.process_all_toc_directories_offline(max_depth=max_depth)
+        else:
+            results = analyzer.process_all_toc_directories(max_depth=max_depth)
         
         total_time = time.time() - start_time
         